@@ -0,0 +1,291 @@
+"""Write the order, payment and stock changes of checked out carts.
+
+Every checkout is keyed by cart uuid and payment intent, stored in
+``order.checkout_key``, so a retried task never creates a second order.
+When the queue is backed up a worker drains other pending checkouts from
+``CHECKOUT_QUEUE_KEY`` and writes them all in one transaction. A checkout
+without stock is written as a cancelled order whose out of stock lines
+are flagged, so retries report the same failure instead of selling it.
+"""
+from collections import Counter, defaultdict
+from typing import TypeVar
+
+from loguru import logger
+from pydantic import BaseModel
+from redis import Redis
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.cart import codec
+from app.entities.cart import CartPayment
+from app.entities.money import to_cents
+from app.infra.models.order import Order, OrderItems, OrderStatusSteps
+from app.infra.models.transaction import Payment, Transaction
+from app.product.inventory import OutOfStockError, reserve_stock
+from config import settings
+from constants import StepsOrder
+
+Self = TypeVar('Self')
+
+CHECKOUT_QUEUE_KEY = settings.get('CHECKOUT_QUEUE_KEY', 'checkout:pending')
+CHECKOUT_BATCH_SIZE = int(settings.get('CHECKOUT_BATCH_SIZE', 50))
+CANCELLED_STATUS = 'cancelled'
+OUT_OF_STOCK_STATUS = 'out_of_stock'
+
+
+class CheckoutRequest(BaseModel):
+    """One cart waiting to be written as an order."""
+
+    cart_uuid: str
+    payment_intent: str
+    user_id: int
+    payment_status: str = 'pending'
+
+    @property
+    def key(self: Self) -> str:
+        """Return the idempotency key of the checkout."""
+        return f'{self.cart_uuid}:{self.payment_intent}'
+
+
+class CheckoutResult(BaseModel):
+    """Orders written by ``write_checkouts``, by checkout key.
+
+    ``out_of_stock`` holds the product ids that made a checkout fail; its
+    order is cancelled and the payment must be refunded.
+    """
+
+    orders: dict[str, int] = {}
+    out_of_stock: dict[str, list[int]] = {}
+
+    def merge(self: Self, other: 'CheckoutResult') -> None:
+        """Add the checkouts of ``other``."""
+        self.orders |= other.orders
+        self.out_of_stock |= other.out_of_stock
+
+
+def enqueue_checkout(redis: Redis, request: CheckoutRequest) -> None:
+    """Must add the checkout to the pending queue."""
+    redis.rpush(CHECKOUT_QUEUE_KEY, request.model_dump_json())
+
+
+def pending_checkouts(
+    redis: Redis,
+    request: CheckoutRequest,
+    batch_size: int = CHECKOUT_BATCH_SIZE,
+) -> list[CheckoutRequest]:
+    """Return ``request`` and up to ``batch_size - 1`` queued checkouts.
+
+    Requests popped here that were already written are skipped later by
+    their key, so draining the queue from several workers is safe.
+    """
+    batch = {request.key: request}
+    if batch_size > 1:
+        for payload in redis.lpop(CHECKOUT_QUEUE_KEY, batch_size - 1) or []:
+            queued = CheckoutRequest.model_validate_json(payload)
+            batch.setdefault(queued.key, queued)
+    return list(batch.values())
+
+
+def load_carts(
+    redis: Redis,
+    requests: list[CheckoutRequest],
+) -> list[tuple[CheckoutRequest, CartPayment]]:
+    """Return the cached cart of every request in one ``MGET``."""
+    payloads = redis.mget([request.cart_uuid for request in requests])
+    checkouts = []
+    for request, payload in zip(requests, payloads, strict=True):
+        if payload is None:
+            logger.error(f'Cart {request.cart_uuid} not found for checkout')
+            continue
+        checkouts.append((request, codec.loads(payload, CartPayment)))
+    return checkouts
+
+
+def write_checkouts(
+    db: Session,
+    checkouts: list[tuple[CheckoutRequest, CartPayment]],
+) -> CheckoutResult:
+    """Must write every checkout once and return its order ids by key.
+
+    Orders, payments, items, transactions and status steps are bulk
+    inserted and stock is reserved for the whole batch, all in one
+    transaction. If a concurrent worker wrote one of the keys first, or
+    some product is out of stock, the batch is retried one checkout at a
+    time; a checkout without stock is then written cancelled and reported
+    in ``out_of_stock``.
+    """
+    checkouts = list(
+        {request.key: (request, cart) for request, cart in checkouts}.values(),
+    )
+    try:
+        result = _write_batch(db, checkouts)
+        db.commit()
+    except (IntegrityError, OutOfStockError) as error:
+        db.rollback()
+        if len(checkouts) > 1:
+            logger.warning(
+                f'Checkout batch failed, writing one by one: {error}',
+            )
+            result = CheckoutResult()
+            for checkout in checkouts:
+                result.merge(write_checkouts(db, [checkout]))
+            return result
+        if isinstance(error, IntegrityError):
+            raise
+        logger.error(f'Checkout {checkouts[0][0].key}: {error}')
+        result = _write_batch(db, checkouts, out_of_stock=error.product_ids)
+        db.commit()
+    return result
+
+
+def _out_of_stock(db: Session, keys: list[str]) -> dict[str, list[int]]:
+    """Return the out of stock products of cancelled checkouts."""
+    out_of_stock = defaultdict(list)
+    for key, product_id in db.execute(
+        select(Order.checkout_key, Transaction.product_id)
+        .join(Transaction, Transaction.order_id == Order.order_id)
+        .where(
+            Order.checkout_key.in_(keys),
+            Transaction.status == OUT_OF_STOCK_STATUS,
+        )
+        .order_by(Transaction.product_id),
+    ):
+        out_of_stock[key].append(product_id)
+    return dict(out_of_stock)
+
+
+def _write_batch(
+    db: Session,
+    checkouts: list[tuple[CheckoutRequest, CartPayment]],
+    out_of_stock: list[int] | None = None,
+) -> CheckoutResult:
+    keys = [request.key for request, _ in checkouts]
+    orders = dict(
+        db.execute(
+            select(Order.checkout_key, Order.order_id).where(
+                Order.checkout_key.in_(keys),
+            ),
+        ).all(),
+    )
+    result = CheckoutResult(
+        orders=orders,
+        out_of_stock=_out_of_stock(db, list(orders)) if orders else {},
+    )
+    new = [
+        (request, cart)
+        for request, cart in checkouts
+        if request.key not in orders
+    ]
+    if not new:
+        return result
+    cancelled = out_of_stock is not None
+    step = (
+        StepsOrder.ORDER_CANCELLED if cancelled else StepsOrder.PAYMENT_PENDING
+    )
+
+    payment_ids = db.scalars(
+        insert(Payment).returning(
+            Payment.payment_id,
+            sort_by_parameter_order=True,
+        ),
+        [
+            {
+                'user_id': request.user_id,
+                'amount': to_cents(cart.subtotal),
+                'token': request.payment_intent,
+                'gateway_id': 0,
+                'status': (
+                    CANCELLED_STATUS if cancelled else request.payment_status
+                ),
+                'authorization': '',
+                'payment_method': cart.payment_method,
+                'payment_gateway': 'STRIPE',
+                'installments': 1,
+            }
+            for request, cart in new
+        ],
+    ).all()
+    order_ids = db.scalars(
+        insert(Order)
+        .values(order_date=func.now(), last_updated=func.now())
+        .returning(Order.order_id, sort_by_parameter_order=True),
+        [
+            {
+                'customer_id': request.user_id,
+                'payment_id': payment_id,
+                'order_status': (
+                    CANCELLED_STATUS if cancelled else request.payment_status
+                ),
+                'checkout_key': request.key,
+            }
+            for (request, _), payment_id in zip(new, payment_ids, strict=True)
+        ],
+    ).all()
+
+    items, transactions, steps = [], [], []
+    stock = Counter()
+    for (request, cart), order_id, payment_id in zip(
+        new,
+        order_ids,
+        payment_ids,
+        strict=True,
+    ):
+        result.orders[request.key] = order_id
+        if cancelled:
+            result.out_of_stock[request.key] = sorted(out_of_stock)
+        steps.append(
+            {
+                'order_id': order_id,
+                'status': step.value,
+                'sending': False,
+                'active': True,
+            },
+        )
+        for item in cart.cart_items:
+            stock[item.product_id] += item.quantity
+            items.append(
+                {
+                    'order_id': order_id,
+                    'product_id': item.product_id,
+                    'quantity': item.quantity,
+                },
+            )
+            transactions.append(
+                {
+                    'user_id': request.user_id,
+                    'amount': to_cents(item.price) * item.quantity,
+                    'order_id': order_id,
+                    'qty': item.quantity,
+                    'payment_id': payment_id,
+                    'status': transaction_status(
+                        request,
+                        item.product_id,
+                        out_of_stock,
+                    ),
+                    'product_id': item.product_id,
+                },
+            )
+    if items:
+        db.execute(insert(OrderItems), items)
+        db.execute(insert(Transaction), transactions)
+    db.execute(
+        insert(OrderStatusSteps).values(last_updated=func.now()),
+        steps,
+    )
+    if not cancelled and (failed := reserve_stock(db, stock)):
+        raise OutOfStockError(failed)
+    return result
+
+
+def transaction_status(
+    request: CheckoutRequest,
+    product_id: int,
+    out_of_stock: list[int] | None,
+) -> str:
+    """Return the status of a line, flagging the ones without stock."""
+    if out_of_stock is None:
+        return request.payment_status
+    if product_id in out_of_stock:
+        return OUT_OF_STOCK_STATUS
+    return CANCELLED_STATUS
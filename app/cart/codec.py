@@ -0,0 +1,141 @@
+"""Serialization of carts stored in the cart cache.
+
+Two formats are supported:
+
+- ``json``: the pydantic ``model_dump_json`` payload used so far.
+- ``msgpack``: one schema version byte followed by a positional msgpack
+  array. Money values are their integer cents and cart lines are flat
+  arrays, so neither field names nor decimal strings are repeated per item.
+
+``loads`` detects the format from the payload itself, so carts written
+before the format was switched keep working until they expire.
+"""
+from typing import TypeVar
+from uuid import UUID
+
+import msgpack
+from pydantic import BaseModel
+
+from app.entities.cart import CartBase
+from app.entities.money import Money, to_cents
+from app.entities.product import ProductCart
+from config import settings
+
+
+Model = TypeVar('Model', bound=CartBase)
+
+CODEC_VERSION = 1
+JSON_CODEC = 'json'
+MSGPACK_CODEC = 'msgpack'
+
+_JSON_PREFIXES = (ord('{'), ord('['))
+_BASE_FIELDS = frozenset(CartBase.model_fields)
+
+
+class UnknownCartCodecError(Exception):
+    """Raise when a payload was written by an unknown codec version."""
+
+    def __init__(self: 'UnknownCartCodecError', version: int) -> None:
+        super().__init__(f'Unknown cart codec version {version}')
+
+
+def _to_cents(value: Money | None) -> int | None:
+    return None if value is None else to_cents(value)
+
+
+def _from_cents(value: int | str | None) -> Money | None:
+    """Return Money from cents, or from the decimal string of old payloads."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return Money.from_decimal(value)
+    return Money(value)
+
+
+def current_codec() -> str:
+    """Return the codec configured in ``CART_SERIALIZER``."""
+    return settings.get('CART_SERIALIZER', JSON_CODEC)
+
+
+def _pack(cart: CartBase) -> bytes:
+    extra = None
+    if type(cart) is not CartBase:
+        extra = cart.model_dump(exclude=_BASE_FIELDS, mode='json')
+    body = [
+        cart.uuid.bytes,
+        [
+            (
+                item.product_id,
+                item.quantity,
+                _to_cents(item.price),
+                _to_cents(item.discount_price),
+            )
+            for item in cart.cart_items
+        ],
+        cart.coupon,
+        _to_cents(cart.discount),
+        _to_cents(cart.freight),
+        cart.zipcode,
+        _to_cents(cart.subtotal),
+        extra,
+    ]
+    return bytes((CODEC_VERSION,)) + msgpack.packb(body, use_bin_type=True)
+
+
+def _unpack(payload: bytes, model: type[Model]) -> Model:
+    (
+        uuid,
+        items,
+        coupon,
+        discount,
+        freight,
+        zipcode,
+        subtotal,
+        extra,
+    ) = msgpack.unpackb(payload[1:], raw=False, use_list=False)
+    uuid = UUID(bytes=uuid)
+    data = {}
+    if model is not CartBase:
+        step = model.model_validate(
+            {'uuid': uuid, 'subtotal': 0, **(extra or {})},
+        )
+        data = {
+            name: getattr(step, name)
+            for name in model.model_fields
+            if name not in _BASE_FIELDS
+        }
+    return model.model_construct(
+        uuid=uuid,
+        cart_items=[
+            ProductCart.model_construct(
+                product_id=product_id,
+                quantity=quantity,
+                price=_from_cents(price),
+                discount_price=_from_cents(discount_price),
+            )
+            for product_id, quantity, price, discount_price in items
+        ],
+        coupon=coupon,
+        discount=_from_cents(discount),
+        freight=_from_cents(freight),
+        zipcode=zipcode,
+        subtotal=_from_cents(subtotal),
+        **data,
+    )
+
+
+def dumps(cart: BaseModel, codec: str | None = None) -> str | bytes:
+    """Serialize a cart with the configured codec."""
+    codec = codec or current_codec()
+    if codec == MSGPACK_CODEC:
+        return _pack(cart)
+    return cart.model_dump_json()
+
+
+def loads(payload: str | bytes, model: type[Model]) -> Model:
+    """Deserialize a cart written by any supported codec."""
+    if isinstance(payload, str) or payload[0] in _JSON_PREFIXES:
+        return model.model_validate_json(payload)
+    if payload[0] != CODEC_VERSION:
+        raise UnknownCartCodecError(payload[0])
+    return _unpack(payload, model)
@@ -1,4 +1,5 @@
 from fastapi import HTTPException
+from app.cart import codec
 from app.entities.address import CreateAddress
 from app.entities.cart import (
     CartBase,
@@ -10,8 +11,10 @@ from app.entities.cart import (
     generate_empty_cart,
     generate_new_cart,
 )
+from app.entities.money import Money
 from app.entities.product import ProductCart
 from app.entities.user import UserData
+from app.freight.freight_gateway import FreightUnavailableError
 from app.infra.bootstrap import Command
 
 
@@ -19,7 +22,7 @@ class UserAddressNotFoundError(Exception):
     """User address not found."""
 
 
-def create_or_get_cart(
+async def create_or_get_cart(
     uuid: str | None,
     token: str | None,
     bootstrap: Command,
@@ -28,13 +31,19 @@ def create_or_get_cart(
     cart = None
     cache = bootstrap.cache
     if token:
-        cart = cache.get(token)
+        cart = await cache.get(token)
     elif uuid:
-        cart = cache.get(uuid)
+        cart = await cache.get(uuid)
     else:
         cart = generate_empty_cart()
-        cache.set(str(cart.uuid), cart.model_dump_json())
-    return cart
+        await cache.set(str(cart.uuid), codec.dumps(cart))
+        return cart
+    if not cart:
+        raise HTTPException(
+            status_code=404,
+            detail='Cart not found',
+        )
+    return codec.loads(cart, CartBase)
 
 
 async def add_product_to_cart(
@@ -46,22 +55,81 @@ async def add_product_to_cart(
     cache = bootstrap.cache
     product_db = await bootstrap.uow.get_product_by_id(product.product_id)
     cart = None
+
+    def add_product(payload: str | bytes | None) -> str | bytes | None:
+        nonlocal cart
+        if not payload:
+            return None
+        cart = codec.loads(payload, CartBase)
+        cart.add_product(
+            product_id=product.product_id,
+            quantity=product.quantity,
+        )
+        return codec.dumps(cart)
+
     if cart_uuid:
-        cart = cache.get(cart_uuid)
-    if None or not cart:
+        await cache.update(cart_uuid, add_product)
+    if not cart:
         cart = generate_new_cart(
             product=product,
             price=product_db.price,
             quantity=product.quantity,
         )
-    else:
-        cart = cache.get(cart_uuid)
-        cart = CartBase.model_validate_json(cart)
-        cart.add_product(
-            product_id=product.product_id,
-            quantity=product.quantity,
+        await cache.set(str(cart.uuid), codec.dumps(cart))
+    return cart
+
+
+async def update_cart_items(
+    uuid: str,
+    items: list[ProductCart],
+    bootstrap: Command,
+) -> CartBase:
+    """Must set the quantity of many lines with one cache write.
+
+    A quantity of zero removes the line; unknown products are added. The
+    lines of the cart being written are checked against the catalog with
+    a single query and repriced in the same update, which the store runs
+    again if the cart changed meanwhile.
+    """
+    quantities = {item.product_id: item.quantity for item in items}
+    cart = None
+
+    async def update_items(payload: str | bytes | None) -> str | bytes | None:
+        nonlocal cart
+        if not payload:
+            return None
+        cart = codec.loads(payload, CartBase)
+        cart.update_items(quantities)
+        product_ids = {item.product_id for item in cart.cart_items}
+        products = [
+            product
+            for product in await bootstrap.uow.get_products(cart.cart_items)
+            if product.product_id in product_ids
+        ]
+        if missing := sorted(
+            product_ids - {product.product_id for product in products},
+        ):
+            raise HTTPException(
+                status_code=404,
+                detail=f'Products not found: {missing}',
+            )
+        cart.get_products_price_and_discounts(products)
+        if not cart.cart_items:
+            cart.subtotal = cart.discount = Money()
+        elif cart.coupon and (
+            coupon := await bootstrap.uow.get_coupon_by_code(cart.coupon)
+        ):
+            cart.calculate_subtotal(discount=coupon.coupon_fee)
+        else:
+            cart.calculate_subtotal()
+        return codec.dumps(cart)
+
+    await bootstrap.cache.update(uuid, update_items)
+    if not cart:
+        raise HTTPException(
+            status_code=404,
+            detail='Cart not found',
         )
-    cache.set(str(cart.uuid), cart.model_dump_json())
     return cart
 
 
@@ -72,8 +140,8 @@ async def calculate_cart(
 ) -> CartBase:
     """Must calculate cart and return cart."""
     cache = bootstrap.cache
-    cache_cart = cache.get(uuid)
-    cache_cart = CartBase.model_validate_json(cache_cart)
+    cache_cart = await cache.get(uuid)
+    cache_cart = codec.loads(cache_cart, CartBase)
     if cache_cart.uuid != cart.uuid:
         raise HTTPException(
             status_code=400,
@@ -90,15 +158,23 @@ async def calculate_cart(
         )
     if cart.zipcode:
         freight_cart = await bootstrap.freight.calculate_volume_weight(
-            cart.zipcode,
             products=products_db,
+            cart_items=cart.cart_items,
         )
-        cart.freight_price = await bootstrap.freight.get_freight(
-            freight_cart=freight_cart,
-            zipcode=cart.zipcode,
-        )
+        try:
+            cart.freight = Money.from_decimal(
+                await bootstrap.freight.get_freight(
+                    freight_cart=freight_cart,
+                    zipcode=cart.zipcode,
+                ),
+            )
+        except FreightUnavailableError as error:
+            raise HTTPException(
+                status_code=503,
+                detail='Freight unavailable, try again later',
+            ) from error
     cart.calculate_subtotal(discount=coupon.coupon_fee if cart.coupon else 0)
-    cache.set(str(cart.uuid), cart.model_dump_json())
+    await cache.set(str(cart.uuid), codec.dumps(cart))
     return cart
 
 
@@ -109,12 +185,11 @@ async def add_user_to_cart(
     bootstrap: Command,
 ) -> CartUser:
     """Must validate token user if is valid add user id in cart."""
-    user = bootstrap.user.get_current_user(token)
+    user = await bootstrap.user.get_current_user(token)
     user_data = UserData.model_validate(user)
     cart_user = CartUser(**cart.model_dump(), user_data=user_data)
-    cache = bootstrap.cache
-    cache.get(uuid)
-    cache.set(str(cart.uuid), cart_user.model_dump_json())
+    _ = uuid
+    await bootstrap.cache.set(str(cart.uuid), codec.dumps(cart_user))
     return cart_user
 
 
@@ -126,9 +201,9 @@ async def add_address_to_cart(
     bootstrap: Command,
 ) -> CartShipping:
     """Must add addresss information to shipping and payment."""
-    user = bootstrap.user.get_current_user(token)
-    cache_cart = bootstrap.cache.get(uuid)
-    cache_cart = CartUser.model_validate_json(cache_cart)
+    user = await bootstrap.user.get_current_user(token)
+    cache_cart = await bootstrap.cache.get(uuid)
+    cache_cart = codec.loads(cache_cart, CartUser)
     if cache_cart.uuid != cart.uuid:
         raise HTTPException(
             status_code=400,
@@ -161,7 +236,7 @@ async def add_address_to_cart(
         user_address_id=user_address_id,
         shipping_address_id=shipping_address_id,
     )
-    bootstrap.cache.set(str(cart.uuid), cart.model_dump_json())
+    await bootstrap.cache.set(str(cart.uuid), codec.dumps(cart))
     return cart
 
 
@@ -174,25 +249,26 @@ async def add_payment_information(  # noqa: PLR0913
     payment_method: str = 'card',
 ) -> CartPayment:
     """Must add payment information and create token in payment gateway."""
-    user = bootstrap.user.get_current_user(token)
-    cache_cart = bootstrap.cache.get(uuid)
-    cache_cart = CartShipping.model_validate_json(cache_cart)
+    user = await bootstrap.user.get_current_user(token)
+    cache_cart = await bootstrap.cache.get(uuid)
+    cache_cart = codec.loads(cache_cart, CartShipping)
     if cache_cart.uuid != cart.uuid:
         raise HTTPException(
             status_code=400,
             detail='Cart uuid is not the same as the cache uuid',
         )
-    payment = bootstrap.payment.create_payment_method(payment)
+    payment = await bootstrap.payment.create_payment_method(payment)
     cart = CartPayment(
         **cache_cart.model_dump(),
         payment_method=payment_method,
         payment_method_id=payment.get('id'),
     )
-    bootstrap.cache.set(str(cart.uuid), cart.model_dump_json())
+    await bootstrap.cache.set(str(cart.uuid), codec.dumps(cart))
     await bootstrap.uow.update_payment_method_to_user(
         user.user_id,
         payment.get('id'),
     )
+    bootstrap.user.invalidate_user(user.document)
     return cart
 
 
@@ -202,9 +278,9 @@ async def preview(
     bootstrap: Command,
 ) -> CartPayment:
     """Must get address id and payment token to show in cart."""
-    bootstrap.user.get_current_user(token)
-    cart = bootstrap.cache.get(uuid)
-    return CartPayment.model_validate_json(cart)
+    await bootstrap.user.get_current_user(token)
+    cart = await bootstrap.cache.get(uuid)
+    return codec.loads(cart, CartPayment)
 
 
 async def checkout(
@@ -215,27 +291,25 @@ async def checkout(
 ) -> CreateCheckoutResponse:
     """Process payment to specific cart."""
     _ = cart
-    user = bootstrap.user.get_current_user(token)
-    cache_cart = bootstrap.cache.get(uuid)
+    user = await bootstrap.user.get_current_user(token)
+    cache_cart = await bootstrap.cache.get(uuid)
     if not cache_cart:
         raise HTTPException(
             status_code=400,
             detail='Cart not found',
         )
-    cache_cart = CartPayment.model_validate_json(cache_cart)
-
-    async def dummy():   # noqa: ANN202
-        pass
+    cache_cart = codec.loads(cache_cart, CartPayment)
 
-    await dummy()
-    payment_intent = bootstrap.payment.create_payment_intent(
-        amount=cache_cart.subtotal,
+    payment_intent = await bootstrap.payment.create_payment_intent(
+        amount=cache_cart.subtotal.cents,
         currency='brl',
         customer_id=user.customer_id,
         payment_method=user.payment_method,
     )
-    checkout_id = bootstrap.publish.checkout.apply_async(
-        args=[cache_cart.uuid, payment_intent],
+    checkout_id = bootstrap.publish.enqueue(
+        str(cache_cart.uuid),
+        payment_intent['id'],
+        user.user_id,
     )
     return CreateCheckoutResponse(
         message=str(checkout_id),
@@ -1,25 +1,63 @@
-# ruff:  noqa: D202 D205 T201 D212
+from loguru import logger
+
+from app.cart.checkout import (
+    CheckoutRequest,
+    enqueue_checkout,
+    load_carts,
+    pending_checkouts,
+    write_checkouts,
+)
+from app.infra import stripe
+from app.infra.database import get_session
+from app.infra.redis import sync_client
 from app.worker import celery
-from uuid import uuid4
 
 
-@celery.task
-def checkout(cart_uuid: uuid4, payment_intent: str) -> None:
-    """
-    - Get cart from redis
-    - Set affiliate if exists
-    - Set coupon if exists
-    - Calculate cart
-    - Accept Payment Intent
-    - uow
-        - Create order
-        - Create payment
-        - Create transaction
-        - Create order_status_step
-        - Decrease inventory
-    - Send email
-    - return order.
+def enqueue(
+    cart_uuid: str,
+    payment_intent: str,
+    user_id: int,
+) -> str:
+    """Must queue the checkout and schedule a worker for it."""
+    request = CheckoutRequest(
+        cart_uuid=cart_uuid,
+        payment_intent=payment_intent,
+        user_id=user_id,
+    )
+    enqueue_checkout(sync_client(), request)
+    return checkout.apply_async(args=[cart_uuid, payment_intent, user_id])
+
+
+@celery.task(
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    max_retries=5,
+)
+def checkout(cart_uuid: str, payment_intent: str, user_id: int) -> dict:
+    """Write the order, payment, transactions, status step and stock.
+
+    Checkouts still queued are written in the same transaction. Retries
+    are safe: a checkout already written returns its existing order. When
+    some product is out of stock the order is written cancelled, the
+    payment intent is refunded and the failed product ids are returned in
+    ``out_of_stock``.
     """
-    _ = payment_intent
-    _ = cart_uuid
-    print('checkout')
+    request = CheckoutRequest(
+        cart_uuid=cart_uuid,
+        payment_intent=payment_intent,
+        user_id=user_id,
+    )
+    redis = sync_client()
+    checkouts = load_carts(redis, pending_checkouts(redis, request))
+    with get_session()() as db:
+        result = write_checkouts(db, checkouts)
+    out_of_stock = result.out_of_stock.get(request.key, [])
+    if out_of_stock:
+        logger.error(
+            f'Checkout {request.key} cancelled, out of stock: {out_of_stock}',
+        )
+        stripe.refund_payment_intent(payment_intent)
+    return {
+        'order_id': result.orders.get(request.key),
+        'out_of_stock': out_of_stock,
+    }
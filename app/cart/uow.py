@@ -3,21 +3,20 @@ from __future__ import annotations
 import abc
 from decimal import Decimal
 from typing import TypeVar, TYPE_CHECKING
-from sqlalchemy.ext.asyncio import (
-    AsyncEngine,
-    AsyncSession,
-    create_async_engine,
-)
-from sqlalchemy.orm import sessionmaker
 from app.entities.coupon import CouponBase
 
 from app.entities.product import ProductCart, ProductInDB
 from app.cart import repository
-
-
-from config import settings
+from app.infra import database
+from app.product.cache import (
+    ProductCache,
+    product_cache,
+    product_id_key,
+    product_to_dict,
+)
 
 if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
     from app.entities.user import UserData
     from app.entities.address import AddressBase
 
@@ -114,31 +113,26 @@ class AbstractUnitOfWork(abc.ABC):
 
 
 def get_engine() -> AsyncEngine:
-    """Create a new engine."""
-    return create_async_engine(
-        settings.DATABASE_URI,
-        pool_size=10,
-        max_overflow=0,
-        echo=True,
-    )
+    """Return the shared async engine."""
+    return database.get_async_engine()
 
 
-def get_session() -> sessionmaker:
-    """Create a new session."""
-    return sessionmaker(
-        bind=get_engine(),
-        expire_on_commit=False,
-        class_=AsyncSession,
-    )
+def get_session() -> async_sessionmaker:
+    """Return the shared async session factory."""
+    return database.get_async_session()
 
 
 class SqlAlchemyUnitOfWork(AbstractUnitOfWork):
     def __init__(
         self: Self,
-        session_factory: sessionmaker = get_session(),  # noqa: B008
+        session_factory: async_sessionmaker | None = None,
+        products_cache: ProductCache = product_cache,
     ) -> None:
+        if session_factory is None:
+            session_factory = get_session()
         self.session = session_factory
         self.cart = repository.SqlAlchemyRepository(session_factory)
+        self.products_cache = products_cache
 
     async def get(self: Self) -> None:
         async with self._session() as session, session.begin():
@@ -146,14 +140,43 @@ class SqlAlchemyUnitOfWork(AbstractUnitOfWork):
 
     async def _get_product_by_id(self: Self, product_id: int) -> ProductInDB:
         """Must return a product by id."""
-        product_db = await self.cart.get_product_by_id(product_id=product_id)
-        return ProductInDB.model_validate(product_db)
+        key = product_id_key(product_id)
+        product = await self.products_cache.get(key)
+        if product is None:
+            product_db = await self.cart.get_product_by_id(
+                product_id=product_id,
+            )
+            product = product_to_dict(product_db)
+            await self.products_cache.set(key, product)
+        return ProductInDB.model_validate(product)
 
     async def _get_products(self: Self, products: list) -> list[ProductCart]:
-        """Must return a products in list."""
+        """Must return a products in list.
+
+        Products already cached are served from the cache; only the
+        missing ids are queried, in a single IN query.
+        """
         product_ids: list[int] = [item.product_id for item in products]
-        products_db = await self.cart.get_products(products=product_ids)
-        return [ProductInDB.model_validate(product) for product in products_db]
+        cached = await self.products_cache.get_many(
+            product_id_key(product_id) for product_id in product_ids
+        )
+        missing = [
+            product_id
+            for product_id in product_ids
+            if product_id_key(product_id) not in cached
+        ]
+        if missing:
+            products_db = await self.cart.get_products(products=missing)
+            for product_db in products_db:
+                product = product_to_dict(product_db)
+                key = product_id_key(product_db.product_id)
+                cached[key] = product
+                await self.products_cache.set(key, product)
+        return [
+            ProductInDB.model_validate(cached[product_id_key(product_id)])
+            for product_id in product_ids
+            if product_id_key(product_id) in cached
+        ]
 
     async def _get_coupon_by_code(self: Self, code: str) -> CouponBase:
         """Must return a coupon by code."""
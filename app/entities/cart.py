@@ -1,13 +1,15 @@
 from decimal import Decimal
+from fractions import Fraction
 from typing import TypeVar
 from uuid import UUID, uuid4
 from loguru import logger
 
 
 from app.entities.freight import ShippingAddress
+from app.entities.money import Money
 from app.entities.product import ProductCart
 from app.entities.user import UserAddress, UserData
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
 Self = TypeVar('Self')
 
@@ -44,25 +46,60 @@ class CartBase(BaseModel):
     uuid: UUID
     cart_items: list[ProductCart] = []
     coupon: str | None = None
-    discount: Decimal = Decimal(0)
-    freight: Decimal = Decimal(0)
+    discount: Money = Money()
+    freight: Money = Money()
     zipcode: str | None = None
-    subtotal: Decimal
+    subtotal: Money
+
+    _index: dict[int, int] = PrivateAttr(default_factory=dict)
+    _indexed: list | None = PrivateAttr(default=None)
+
+    def __eq__(self: Self, other: object) -> bool:
+        """Compare fields only, the line index is a cache."""
+        if not isinstance(other, BaseModel):
+            return NotImplemented
+        return type(self) is type(other) and self.__dict__ == other.__dict__
+
+    __hash__ = None
+
+    def _reindex(self: Self, start: int = 0) -> None:
+        if self._indexed is not self.cart_items or start == 0:
+            self._index = {}
+            start = 0
+        for position in range(start, len(self.cart_items)):
+            self._index[self.cart_items[position].product_id] = position
+        self._indexed = self.cart_items
+
+    def _position(self: Self, product_id: int) -> int | None:
+        """Return the line of ``product_id`` in O(1).
+
+        The index is rebuilt when ``cart_items`` was replaced or changed
+        behind the cart's back.
+        """
+        if self._indexed is not self.cart_items or len(self._index) != len(
+            self.cart_items,
+        ):
+            self._reindex()
+        position = self._index.get(product_id)
+        if position is not None and (
+            self.cart_items[position].product_id != product_id
+        ):
+            self._reindex()
+            position = self._index.get(product_id)
+        return position
 
     def increase_quantity(self: Self, product_id: int) -> Self:
         """Increase quantity in a product."""
-        for item in self.cart_items:
-            if item.product_id == product_id:
-                item.quantity += 1
-            return self
+        position = self._position(product_id)
+        if position is not None:
+            self.cart_items[position].quantity += 1
         return self
 
     def decrease_quantity(self: Self, product_id: int) -> Self:
         """Decrease quantity in a product."""
-        for item in self.cart_items:
-            if item.product_id == product_id:
-                item.quantity -= 1
-            return self
+        position = self._position(product_id)
+        if position is not None:
+            self.cart_items[position].quantity -= 1
         return self
 
     def set_product_quantity(
@@ -71,19 +108,18 @@ class CartBase(BaseModel):
         quantity: int,
     ) -> Self:
         """Set quantity in a product."""
-        for item in self.cart_items:
-            if item.product_id == product_id:
-                item.quantity = quantity
-            return self
+        position = self._position(product_id)
+        if position is not None:
+            self.cart_items[position].quantity = quantity
         return self
 
     def add_product(self: Self, product_id: int, quantity: int) -> Self:
         """Add a product to the cart."""
-        for item in self.cart_items:
-            if item.product_id == product_id:
-                item.quantity += quantity
-                return self
-
+        position = self._position(product_id)
+        if position is not None:
+            self.cart_items[position].quantity += quantity
+            return self
+        self._index[product_id] = len(self.cart_items)
         self.cart_items.append(
             ProductCart(product_id=product_id, quantity=quantity),
         )
@@ -91,42 +127,65 @@ class CartBase(BaseModel):
 
     def remove_product(self: Self, product_id: int) -> Self:
         """Remove a product from the cart based on its product_id."""
-        for i, item in enumerate(self.cart_items):
-            if item.product_id == product_id:
-                del self.cart_items[i]
-                return self
-        msg = f"Product id {product_id} don't exists in cart"
-        logger.error(msg)
-        raise IndexError(msg)
+        position = self._position(product_id)
+        if position is None:
+            msg = f"Product id {product_id} don't exists in cart"
+            logger.error(msg)
+            raise IndexError(msg)
+        del self.cart_items[position]
+        del self._index[product_id]
+        self._reindex(start=position)
+        return self
+
+    def update_items(self: Self, quantities: dict[int, int]) -> Self:
+        """Set the quantity of many products at once.
+
+        Products not in the cart are appended and a quantity of zero or
+        less removes the line; the index is rebuilt once at the end.
+        """
+        removed = False
+        for product_id, quantity in quantities.items():
+            position = self._position(product_id)
+            if quantity <= 0:
+                if position is not None:
+                    self.cart_items[position].quantity = 0
+                    removed = True
+            elif position is None:
+                self._index[product_id] = len(self.cart_items)
+                self.cart_items.append(
+                    ProductCart(product_id=product_id, quantity=quantity),
+                )
+            else:
+                self.cart_items[position].quantity = quantity
+        if removed:
+            self.cart_items[:] = [
+                item for item in self.cart_items if item.quantity > 0
+            ]
+            self._reindex()
+        return self
 
     def add_product_price(self: Self, products: list[ProductCart]) -> Self:
         """Add a product price to cart."""
         product_prices = {
             product.product_id: product.price for product in products
         }
-
-        self.cart_items = [
-            item.update_price(new_price=product_prices.get(item.product_id))
-            for item in self.cart_items
-        ]
+        for item in self.cart_items:
+            item.price = product_prices.get(item.product_id)
+        return self
 
     def calculate_subtotal(self: Self, discount: Decimal = 0) -> None:
         """Calculate subtotal of cart."""
-        subtotal = Decimal(0)
         if not self.cart_items:
             msg = 'Cart items is empty'
             logger.error(msg)
             raise ValueError(msg)
-        try:
+        subtotal, discount_total = calculate_totals(self.cart_items, discount)
+        if discount > 0:
+            rate = Fraction(discount)
             for item in self.cart_items:
-                subtotal += item.price * item.quantity
-                if discount > 0:
-                    item.discount_price = item.price * discount
-                    self.discount += item.discount_price * item.quantity
-            self.subtotal = subtotal
-        except TypeError as err:
-            logger.error('Price or quantity not found in cart item')
-            raise CartNotFoundPriceError from err
+                item.discount_price = item.price * rate
+        self.subtotal = Money(subtotal)
+        self.discount = Money(discount_total)
 
     def get_products_price_and_discounts(self: Self, products: list) -> None:
         """Get products price and discounts."""
@@ -142,10 +201,37 @@ class CartBase(BaseModel):
             product_id = cart_item.product_id
             if product_id in product_dict:
                 product = product_dict[product_id]
-                self.cart_items[index].price = product.price
-                self.cart_items[index].discount_price = (
-                    product.discount if product.discount else Decimal('0')
+                self.cart_items[index].price = Money.from_cents(
+                    product.price,
                 )
+                self.cart_items[index].discount_price = Money.from_cents(
+                    product.discount or 0,
+                )
+
+
+def calculate_totals(
+    items: list[ProductCart],
+    discount: Decimal | int = 0,
+) -> tuple[int, int]:
+    """Return the ``(subtotal, discount)`` of the cart lines in cents.
+
+    The discount rate is turned into an integer fraction once, so the loop
+    only does int arithmetic; each unit discount is rounded half up.
+    """
+    numerator, denominator = discount.as_integer_ratio()
+    subtotal = discount_total = 0
+    try:
+        for item in items:
+            cents = item.price.cents
+            subtotal += cents * item.quantity
+            if numerator > 0:
+                discount_total += (
+                    (2 * cents * numerator + denominator) // (2 * denominator)
+                ) * item.quantity
+    except (AttributeError, TypeError) as err:
+        logger.error('Price or quantity not found in cart item')
+        raise CartNotFoundPriceError from err
+    return subtotal, discount_total
 
 
 class CartUser(CartBase):
@@ -194,26 +280,21 @@ class CreateCheckoutResponse(BaseModel):
     message: str
 
 
-def convert_price_to_decimal(price: int) -> Decimal:
-    """Convert price to decimal."""
-    return Decimal(price / 100)
-
-
 def generate_empty_cart() -> CartBase:
     """Generate empty cart."""
     return CartBase(
         uuid=generate_cart_uuid(),
         cart_items=[],
-        subtotal=Decimal(0),
+        subtotal=Money(),
     )
 
 
 def generate_new_cart(
     product: ProductCart,
-    price: int,
+    price: Money | int,
     quantity: int,
 ) -> CartBase:
-    """Generate new cart."""
+    """Generate new cart, ``price`` in cents as stored for products."""
     if not product:
         logger.error('Product not found in database')
         raise ProductNotFoundError
@@ -221,5 +302,5 @@ def generate_new_cart(
     return CartBase(
         uuid=generate_cart_uuid(),
         cart_items=[product],
-        subtotal=convert_price_to_decimal(price * quantity),
+        subtotal=Money.from_cents(price) * quantity,
     )
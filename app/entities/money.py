@@ -0,0 +1,164 @@
+from decimal import ROUND_HALF_UP, Decimal
+from fractions import Fraction
+from functools import total_ordering
+from typing import Any, TypeVar
+
+from pydantic import GetCoreSchemaHandler, GetJsonSchemaHandler
+from pydantic_core import core_schema
+
+Self = TypeVar('Self')
+
+CENT = Decimal('0.01')
+
+
+class InvalidMoneyError(ValueError):
+    """Raise when a value can not be read as an amount of money."""
+
+    def __init__(self: Self, value: Any) -> None:  # noqa: ANN401
+        super().__init__(f'Invalid money amount: {value!r}')
+
+
+@total_ordering
+class Money:
+    """Amount in integer cents.
+
+    Plain numbers (Decimal, int, str) are read as reais and rounded half
+    up to the cent; ``Money`` compares equal to the same amount given as
+    a number. Arithmetic between amounts stays in ints.
+    """
+
+    __slots__ = ('cents',)
+
+    def __init__(self: Self, cents: int = 0) -> None:
+        self.cents = cents
+
+    @classmethod
+    def from_decimal(cls: type['Money'], value: Any) -> 'Money':  # noqa: ANN401
+        """Must return ``value`` reais as Money."""
+        if isinstance(value, Money):
+            return value
+        if isinstance(value, bool):
+            raise InvalidMoneyError(value)
+        if isinstance(value, int):
+            return cls(value * 100)
+        try:
+            amount = Decimal(str(value) if isinstance(value, float) else value)
+            return cls(int(amount.quantize(CENT, ROUND_HALF_UP).scaleb(2)))
+        except (ArithmeticError, TypeError, ValueError) as error:
+            raise InvalidMoneyError(value) from error
+
+    @classmethod
+    def from_cents(cls: type['Money'], value: Any) -> 'Money':  # noqa: ANN401
+        """Must return ``value`` cents as Money, as ``product.price`` is."""
+        if isinstance(value, Money):
+            return value
+        if isinstance(value, bool):
+            raise InvalidMoneyError(value)
+        try:
+            return cls(int(Decimal(value).quantize(Decimal(1), ROUND_HALF_UP)))
+        except (ArithmeticError, TypeError, ValueError) as error:
+            raise InvalidMoneyError(value) from error
+
+    def to_decimal(self: Self) -> Decimal:
+        """Return the amount in reais."""
+        return Decimal(self.cents).scaleb(-2)
+
+    def __add__(self: Self, other: 'Money') -> 'Money':
+        """Return the sum; ``0`` is accepted so ``sum`` works."""
+        if isinstance(other, Money):
+            return Money(self.cents + other.cents)
+        if other == 0:
+            return self
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self: Self, other: 'Money') -> 'Money':
+        """Return the difference of two amounts."""
+        if isinstance(other, Money):
+            return Money(self.cents - other.cents)
+        return NotImplemented
+
+    def __neg__(self: Self) -> 'Money':
+        """Return the amount with the opposite sign."""
+        return Money(-self.cents)
+
+    def __mul__(self: Self, other: int | Decimal) -> 'Money':
+        """Return the amount times a quantity or rate, rounded half up."""
+        if isinstance(other, int) and not isinstance(other, bool):
+            return Money(self.cents * other)
+        if isinstance(other, Decimal | Fraction | float):
+            return Money(round_half_up(self.cents * Fraction(other)))
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __bool__(self: Self) -> bool:
+        """Return whether the amount is not zero."""
+        return bool(self.cents)
+
+    def __eq__(self: Self, other: object) -> bool:
+        """Compare with Money or with a number of reais."""
+        if isinstance(other, Money):
+            return self.cents == other.cents
+        if isinstance(other, int | Decimal):
+            return self.to_decimal() == other
+        return NotImplemented
+
+    def __lt__(self: Self, other: object) -> bool:
+        """Order with Money or with a number of reais."""
+        if isinstance(other, Money):
+            return self.cents < other.cents
+        if isinstance(other, int | Decimal):
+            return self.to_decimal() < other
+        return NotImplemented
+
+    def __hash__(self: Self) -> int:
+        """Hash like the equal Decimal amount."""
+        return hash(self.to_decimal())
+
+    def __repr__(self: Self) -> str:
+        """Return ``Money(<cents>)``."""
+        return f'Money({self.cents})'
+
+    def __str__(self: Self) -> str:
+        """Return the amount in reais, e.g. ``10.50``."""
+        return str(self.to_decimal())
+
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls: type['Money'],
+        source: Any,  # noqa: ANN401
+        handler: GetCoreSchemaHandler,
+    ) -> core_schema.CoreSchema:
+        """Validate numbers as reais and serialise to a decimal string."""
+        return core_schema.no_info_plain_validator_function(
+            cls.from_decimal,
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                str,
+                when_used='json',
+            ),
+        )
+
+    @classmethod
+    def __get_pydantic_json_schema__(
+        cls: type['Money'],
+        schema: core_schema.CoreSchema,
+        handler: GetJsonSchemaHandler,
+    ) -> dict:
+        """Describe the amount as a decimal string."""
+        return {'type': 'string', 'format': 'decimal'}
+
+
+def round_half_up(value: Fraction) -> int:
+    """Return ``value`` rounded to the nearest int, halves away from 0."""
+    if value < 0:
+        return -round_half_up(-value)
+    return int(value + Fraction(1, 2))
+
+
+def to_cents(value: Any) -> int:  # noqa: ANN401
+    """Return any amount (Money or reais) as integer cents, None as 0."""
+    if value is None:
+        return 0
+    return Money.from_decimal(value).cents
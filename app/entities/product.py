@@ -1,7 +1,9 @@
 from decimal import Decimal
 
 from typing import TypeVar
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, field_validator
+
+from app.entities.money import Money
 
 Self = TypeVar('Self')
 
@@ -11,10 +13,10 @@ class ProductCart(BaseModel):
 
     product_id: int
     quantity: int
-    price: Decimal | None = None
-    discount_price: Decimal = Decimal(0)
+    price: Money | None = None
+    discount_price: Money = Money()
 
-    def update_price(self: Self, new_price: Decimal) -> 'ProductCart':
+    def update_price(self: Self, new_price: Money | None) -> 'ProductCart':
         return ProductCart(
             product_id=self.product_id,
             quantity=self.quantity,
@@ -29,7 +31,7 @@ class ProductInDB(BaseModel):
     product_id: int
     name: str
     uri: str
-    price: int
+    price: Money
     active: bool
     direct_sales: bool
     description: str
@@ -48,3 +50,9 @@ class ProductInDB(BaseModel):
     sku: str | None
 
     model_config = ConfigDict(from_attributes=True)
+
+    @field_validator('price', mode='before')
+    @classmethod
+    def price_in_cents(cls: type['ProductInDB'], value: object) -> Money:
+        """Read the stored price as cents, not reais."""
+        return Money.from_cents(value)
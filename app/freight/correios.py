@@ -0,0 +1,168 @@
+import asyncio
+import math
+from typing import ClassVar, TypeVar
+
+import httpx
+from loguru import logger
+from pydantic import BaseModel
+
+from app.infra.local_cache import LocalCache
+from config import settings
+from zipcode.adapter import Adapter, InvalidCorreiosResponseError
+from zipcode.zip_code import correios_shipping
+
+
+Self = TypeVar('Self')
+
+SERVICES = {'4510': 'PAC', '4014': 'SEDEX'}
+HEADERS = {'content-type': 'text/xml; charset=utf-8'}
+
+
+class Package(BaseModel):
+    """Weight in kg and dimensions in cm of a shipment."""
+
+    weight: float
+    length: float
+    height: float
+    width: float
+
+    def bucket(self: Self) -> 'Package':
+        """Round weight up to whole kg and dimensions up to 5 cm.
+
+        Packages in the same bucket share one quote, and quoting the
+        rounded package never undercharges any package in it.
+        """
+        return Package(
+            weight=math.ceil(self.weight),
+            length=5 * math.ceil(self.length / 5),
+            height=5 * math.ceil(self.height / 5),
+            width=5 * math.ceil(self.width / 5),
+        )
+
+
+class CorreiosClient:
+    """Async Correios price quotes on a shared HTTP client.
+
+    Every service is quoted concurrently and each call, as a whole, is
+    bounded by ``CORREIOS_TIMEOUT`` seconds. Complete quotes are cached
+    for ``CORREIOS_CACHE_TTL`` seconds by origin, destination CEP prefix
+    and package bucket.
+    """
+
+    http: ClassVar[httpx.AsyncClient | None] = None
+
+    def __init__(
+        self: Self,
+        url: str | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+        cache: LocalCache | None = None,
+        timeout: float | None = None,
+    ) -> None:
+        self.url = url or correios_shipping()
+        self.timeout = timeout or float(settings.get('CORREIOS_TIMEOUT', 5))
+        self.cache = cache or LocalCache(
+            maxsize=int(settings.get('CORREIOS_CACHE_SIZE', 4096)),
+            ttl=float(settings.get('CORREIOS_CACHE_TTL', 3600)),
+        )
+        self._http = None
+        if transport is not None:
+            self._http = httpx.AsyncClient(transport=transport)
+
+    @property
+    def client(self: Self) -> httpx.AsyncClient:
+        """Return the HTTP client, shared by every instance by default."""
+        if self._http is not None:
+            return self._http
+        if CorreiosClient.http is None:
+            CorreiosClient.http = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=int(
+                        settings.get('CORREIOS_MAX_CONNECTIONS', 20),
+                    ),
+                ),
+            )
+        return CorreiosClient.http
+
+    @classmethod
+    async def close(cls: type['CorreiosClient']) -> None:
+        """Close the shared HTTP client."""
+        if cls.http is not None:
+            await cls.http.aclose()
+            cls.http = None
+
+    async def quote(
+        self: Self,
+        zip_code_source: str,
+        zip_code_target: str,
+        package: Package,
+    ) -> list[dict]:
+        """Return the price and delivery time of every service."""
+        package = package.bucket()
+        key = (
+            zip_code_source,
+            zip_code_target[:5],
+            package.weight,
+            package.length,
+            package.height,
+            package.width,
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        results = await asyncio.gather(
+            *(
+                self._quote_service(
+                    service,
+                    zip_code_source,
+                    zip_code_target,
+                    package,
+                )
+                for service in SERVICES
+            ),
+        )
+        quotes = [result for result in results if result is not None]
+        if len(quotes) == len(SERVICES):
+            self.cache.set(key, quotes)
+        return quotes
+
+    async def _quote_service(
+        self: Self,
+        service: str,
+        zip_code_source: str,
+        zip_code_target: str,
+        package: Package,
+    ) -> dict | None:
+        body = Adapter.body_shipping(
+            service,
+            zip_code_source,
+            zip_code_target,
+            f'{package.weight:g}',
+            f'{package.length:g}',
+            f'{package.height:g}',
+            f'{package.width:g}',
+        )
+        try:
+            async with asyncio.timeout(self.timeout):
+                response = await self.client.post(
+                    self.url,
+                    headers=HEADERS,
+                    content=body,
+                    timeout=self.timeout,
+                )
+            response.raise_for_status()
+        except (httpx.HTTPError, TimeoutError) as error:
+            logger.warning(f'Correios service {service} failed: {error!r}')
+            return None
+        try:
+            result = Adapter.xmltojson_shipping(
+                response.content,
+                SERVICES[service],
+            )
+        except InvalidCorreiosResponseError as error:
+            logger.warning(f'Correios service {service} failed: {error}')
+            return None
+        result['frete'] = int(result['frete'].replace(',', ''))
+        return result
+
+
+correios = CorreiosClient()
@@ -1,18 +1,75 @@
 from abc import ABC, abstractmethod
+from collections.abc import Iterable
 from decimal import Decimal
 from typing import TypeVar
 
 from pydantic import BaseModel
 
+from app.entities.product import ProductCart, ProductInDB
+from app.freight.correios import CorreiosClient, Package, correios
+from config import settings
+
 
 Self = TypeVar('Self')
 
+CUBIC_WEIGHT_DIVISOR = 6000
+MAX_WEIGHT = 29
+HEIGHT_RANGE = (1, 99)
+WIDTH_RANGE = (10, 99)
+LENGTH_RANGE = (15, 99)
+
+
+class FreightUnavailableError(Exception):
+    """Raise when no carrier service could quote the freight."""
+
+    def __init__(self: Self) -> None:
+        super().__init__('Freight unavailable')
+
 
 class FreightCart(BaseModel):
     """Freight cart."""
 
     volume: float
     weight: float
+    length: float = 0.0
+    height: float = 0.0
+    width: float = 0.0
+
+
+def _clamp(value: float, limits: tuple[int, int]) -> float:
+    low, high = limits
+    return min(max(value, low), high)
+
+
+def consolidate_package(
+    products: Iterable,
+    quantities: dict[int, int],
+) -> FreightCart:
+    """Pack every cart item in one box and return its billable size.
+
+    Items are stacked: the box takes the longest length and widest width
+    and the sum of the heights. Dimensions are clamped to the carrier
+    limits and the weight is the larger of the real and the cubic weight.
+    Missing dimensions count as 1 cm and missing weights as 1 kg.
+    """
+    length = width = height = weight = 0.0
+    for product in products:
+        quantity = quantities.get(product.product_id, 1)
+        length = max(length, float(product.length or 1))
+        width = max(width, float(product.width or 1))
+        height += float(product.height or 1) * quantity
+        weight += float(product.weight or 1) * quantity
+    length = _clamp(length, LENGTH_RANGE)
+    width = _clamp(width, WIDTH_RANGE)
+    height = _clamp(height, HEIGHT_RANGE)
+    volume = length * width * height
+    return FreightCart(
+        volume=volume,
+        weight=min(max(weight, volume / CUBIC_WEIGHT_DIVISOR), MAX_WEIGHT),
+        length=length,
+        height=height,
+        width=width,
+    )
 
 
 class AbstractFreight(ABC):
@@ -20,24 +77,25 @@ class AbstractFreight(ABC):
 
     async def calculate_volume_weight(
         self: Self,
-        products: list,
+        products: list[ProductInDB],
+        cart_items: list[ProductCart],
     ) -> FreightCart:
         """Calculate volume and weight from cart."""
-        return await self._calculate_volume_weight(products)
+        return await self._calculate_volume_weight(products, cart_items)
 
     async def get_freight(
         self: Self,
-        volume: float,
-        weight: float,
+        freight_cart: FreightCart,
         zipcode: str,
     ) -> Decimal:
         """Get freight from zip code."""
-        return await self._get_freight(volume, weight, zipcode)
+        return await self._get_freight(freight_cart, zipcode)
 
     @abstractmethod
     async def _calculate_volume_weight(
         self: Self,
-        products: list,
+        products: list[ProductInDB],
+        cart_items: list[ProductCart],
     ) -> FreightCart:
         """Calculate volume and weight from cart."""
         ...
@@ -45,23 +103,65 @@ class AbstractFreight(ABC):
     @abstractmethod
     async def _get_freight(
         self: Self,
-        volume: float,
-        weight: float,
+        freight_cart: FreightCart,
         zipcode: str,
     ) -> Decimal:
         """Get freight from zip code."""
         ...
 
 
+class CorreiosFreight(AbstractFreight):
+    """Freight quoted by Correios for the whole cart in one package."""
+
+    def __init__(
+        self: Self,
+        client: CorreiosClient = correios,
+        zip_code_source: str | None = None,
+    ) -> None:
+        self.client = client
+        self.zip_code_source = zip_code_source
+
+    async def _calculate_volume_weight(
+        self: Self,
+        products: list[ProductInDB],
+        cart_items: list[ProductCart],
+    ) -> FreightCart:
+        """Consolidate the cart items in a single package."""
+        quantities = {item.product_id: item.quantity for item in cart_items}
+        return consolidate_package(products, quantities)
+
+    async def _get_freight(
+        self: Self,
+        freight_cart: FreightCart,
+        zipcode: str,
+    ) -> Decimal:
+        """Return the cheapest service quoted for the package."""
+        quotes = await self.client.quote(
+            zip_code_source=self.zip_code_source
+            or str(settings.ZIP_CODE_SOURCE),
+            zip_code_target=zipcode,
+            package=Package(
+                weight=freight_cart.weight,
+                length=freight_cart.length,
+                height=freight_cart.height,
+                width=freight_cart.width,
+            ),
+        )
+        if not quotes:
+            raise FreightUnavailableError
+        return Decimal(min(quote['frete'] for quote in quotes)).scaleb(-2)
+
+
 class MemoryFreight(AbstractFreight):
     """Memory implementation of freight gateway."""
 
     async def _calculate_volume_weight(
         self: Self,
-        products: list,
+        products: list[ProductInDB],
+        cart_items: list[ProductCart],
     ) -> FreightCart:
         """Calculate volume and weight from cart."""
-        _ = products
+        _ = products, cart_items
         return FreightCart(
             volume=0.0,
             weight=0.0,
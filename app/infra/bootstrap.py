@@ -1,7 +1,5 @@
 from pydantic import BaseModel
 
-import redis as cache_client
-from app.infra import stripe
 from app.cart import uow
 from app.cart.uow import SqlAlchemyUnitOfWork
 from app.infra import redis
@@ -9,17 +7,18 @@ from app.freight import freight_gateway as freight
 from app.user import gateway as user_gateway
 from typing import Any
 from app.cart import tasks
+from app.payment.provider import AbstractPaymentProvider, stripe_provider
 
 
 class Command(BaseModel):
     """Command to use in the application."""
 
     uow: uow.AbstractUnitOfWork
-    cache: redis.MemoryClient | cache_client.Redis
+    cache: redis.CartStore
     publish: Any
     freight: freight.AbstractFreight
     user: Any
-    payment: Any
+    payment: AbstractPaymentProvider
 
     class Config:
         """Pydantic configs."""
@@ -31,9 +30,9 @@ async def bootstrap(  # noqa: PLR0913
     uow: uow.AbstractUnitOfWork = None,
     cache: redis.AbstractCache = redis.RedisCache(),
     publish: Any = tasks,  # noqa: ANN401
-    freight: freight.AbstractFreight = freight.MemoryFreight(),
+    freight: freight.AbstractFreight = freight.CorreiosFreight(),
     user: Any = user_gateway,  # noqa: ANN401
-    payment: Any = stripe,  # noqa: ANN401
+    payment: AbstractPaymentProvider = stripe_provider,
 ) -> Command:
     """Create a command function to use in the application."""
     if uow is None:
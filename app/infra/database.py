@@ -1,19 +1,119 @@
-from typing import Any
+from typing import Any, TypeVar
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.ext.declarative import as_declarative, declared_attr
 from sqlalchemy.orm import sessionmaker
 
 from config import settings
 
 
-def get_engine() -> str:
-    """Return an instance of a database connection engine using SQLAlchemy.
+Self = TypeVar('Self')
+
+
+def engine_options() -> dict:
+    """Return pool and logging options shared by every engine.
+
+    All values can be overridden in ``settings.toml`` or with ``DYNACONF_``
+    environment variables, e.g. ``DYNACONF_DATABASE_POOL_SIZE=20``.
+    """
+    return {
+        'pool_size': int(settings.get('DATABASE_POOL_SIZE', 10)),
+        'max_overflow': int(settings.get('DATABASE_MAX_OVERFLOW', 0)),
+        'pool_pre_ping': bool(settings.get('DATABASE_POOL_PRE_PING', True)),
+        'pool_recycle': int(settings.get('DATABASE_POOL_RECYCLE', 1800)),
+        'echo': bool(settings.get('DATABASE_ECHO', False)),
+    }
+
+
+class EngineRegistry:
+    """Process-wide holder of the database engines and session factories.
+
+    Engines are created lazily on first use so scripts, workers and tests
+    share the same pools as the API. The FastAPI lifespan calls ``start``
+    on startup and ``dispose`` on shutdown.
+    """
+
+    def __init__(self: Self) -> None:
+        self._engine: Engine | None = None
+        self._session: sessionmaker | None = None
+        self._async_engine: AsyncEngine | None = None
+        self._async_session: async_sessionmaker | None = None
+
+    @property
+    def engine(self: Self) -> Engine:
+        """Return the shared sync engine bound to ``DATABASE_URL``."""
+        if self._engine is None:
+            self._engine = create_engine(
+                settings.DATABASE_URL,
+                **engine_options(),
+            )
+        return self._engine
+
+    @property
+    def session(self: Self) -> sessionmaker:
+        """Return the shared sync session factory."""
+        if self._session is None:
+            self._session = sessionmaker(
+                autocommit=False,
+                autoflush=False,
+                bind=self.engine,
+            )
+        return self._session
+
+    @property
+    def async_engine(self: Self) -> AsyncEngine:
+        """Return the shared async engine bound to ``DATABASE_URI``."""
+        if self._async_engine is None:
+            self._async_engine = create_async_engine(
+                settings.DATABASE_URI,
+                **engine_options(),
+            )
+        return self._async_engine
+
+    @property
+    def async_session(self: Self) -> async_sessionmaker:
+        """Return the shared async session factory."""
+        if self._async_session is None:
+            self._async_session = async_sessionmaker(
+                bind=self.async_engine,
+                expire_on_commit=False,
+                class_=AsyncSession,
+            )
+        return self._async_session
+
+    def start(self: Self) -> None:
+        """Create the engines up front instead of on the first request."""
+        _ = self.session, self.async_session
+
+    async def dispose(self: Self) -> None:
+        """Close every pooled connection and forget the engines."""
+        if self._async_engine is not None:
+            await self._async_engine.dispose()
+        if self._engine is not None:
+            self._engine.dispose()
+        self._engine = None
+        self._session = None
+        self._async_engine = None
+        self._async_session = None
+
+
+registry = EngineRegistry()
+
+
+def get_engine() -> Engine:
+    """Return the shared SQLAlchemy sync engine.
 
     Return:
     ------
-        sqlalchemy.engine.base.Engine: An instance of the configured SQLAlchemy
-        connection engine.
+        sqlalchemy.engine.base.Engine: The process-wide engine configured
+        from ``DATABASE_URL`` and the ``DATABASE_POOL_*`` settings.
 
     Example:
     -------
@@ -22,41 +122,34 @@ def get_engine() -> str:
         result = connection.execute("SELECT * FROM table")
         connection.close()
     """
-    sqlalchemy_database_url = settings.DATABASE_URL
-
-    return create_engine(
-        sqlalchemy_database_url,
-        pool_size=10,
-        max_overflow=0,
-    )
+    return registry.engine
 
 
-def get_session() -> str:
-    """Return a SQLAlchemy session factory with a configured engine.
+def get_session() -> sessionmaker:
+    """Return the shared SQLAlchemy sync session factory.
 
     Return:
     ------
-        sqlalchemy.orm.session.Session: A session factory configured to interact with
-        the database using the specified engine.
+        sqlalchemy.orm.session.Session: A session factory bound to the
+        process-wide engine.
 
     Example:
     -------
         session_factory = get_session()
         session = session_factory()
 
-    Note:
-    ----
-        To use this function, ensure that the 'get_engine()' function is correctly
-        implemented and that the necessary database URL is provided in the project's
-        settings.
-
     """
-    _engine = get_engine()
-    return sessionmaker(
-        autocommit=False,
-        autoflush=False,
-        bind=_engine,
-    )
+    return registry.session
+
+
+def get_async_engine() -> AsyncEngine:
+    """Return the shared SQLAlchemy async engine."""
+    return registry.async_engine
+
+
+def get_async_session() -> async_sessionmaker:
+    """Return the shared SQLAlchemy async session factory."""
+    return registry.async_session
 
 
 @as_declarative()
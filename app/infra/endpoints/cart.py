@@ -12,7 +12,7 @@ from app.entities.product import ProductCart
 from app.infra.bootstrap import Command, bootstrap
 from app.infra.deps import get_db
 from payment.schema import InstallmentSchema, PaymentResponse
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Body, Depends
 from loguru import logger
 
 from domains import domain_order
@@ -20,6 +20,9 @@ from app.infra import deps
 from payment.service import Checkout
 from schemas.order_schema import CheckoutReceive
 from app.cart import services
+from config import settings
+
+CART_BATCH_MAX = int(settings.get('CART_BATCH_MAX', 500))
 
 cart = APIRouter(
     prefix='/cart',
@@ -35,12 +38,12 @@ async def get_bootstrap() -> Command:
 
 
 @cart.post('/', response_model=CartBase, status_code=200)
-def create_cart(
+async def create_cart(
     *,
     bootstrap: Command = Depends(get_bootstrap),
 ) -> CartBase:
     """Create or get cart."""
-    return services.create_or_get_cart(
+    return await services.create_or_get_cart(
         uuid=None,
         token=None,
         bootstrap=bootstrap,
@@ -48,14 +51,14 @@ def create_cart(
 
 
 @cart.get('/{uuid}', response_model=CartBase, status_code=201)
-def get_cart(
+async def get_cart(
     uuid: str | None = None,
     *,
     token: str = Depends(oauth2_scheme),
     bootstrap: Command = Depends(get_bootstrap),
 ) -> CartBase:
     """Create or get cart."""
-    return services.create_or_get_cart(
+    return await services.create_or_get_cart(
         uuid=uuid,
         token=token,
         bootstrap=bootstrap,
@@ -78,6 +81,21 @@ async def add_product_to_cart(  # noqa: ANN201
     )
 
 
+@cart.patch('/{uuid}/items', status_code=200, response_model=CartBase)
+async def update_cart_items(  # noqa: ANN201
+    uuid: str,
+    *,
+    items: list[ProductCart] = Body(..., max_length=CART_BATCH_MAX),
+    bootstrap: Command = Depends(get_bootstrap),
+):
+    """Set the quantity of many products, zero removes the line."""
+    return await services.update_cart_items(
+        uuid=uuid,
+        items=items,
+        bootstrap=bootstrap,
+    )
+
+
 @cart.post('/{uuid}/estimate', status_code=201, response_model=CartBase)
 async def estimate(
     uuid: str,
@@ -16,7 +16,7 @@ async def get_product(
 ) -> None:
     """Get product."""
     try:
-        return domain_order.get_product(db, uri)
+        return await domain_order.get_product(db, uri)
     except Exception:
         raise
 
@@ -61,5 +61,8 @@ async def create_product(
     product_data: ProductSchema,
 ) -> None:
     """Create product."""
-    product = domain_order.create_product(db=db, product_data=product_data)
+    product = await domain_order.create_product(
+        db=db,
+        product_data=product_data,
+    )
     return ProductSchema.from_orm(product)
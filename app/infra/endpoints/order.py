@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from loguru import logger
 from sqlalchemy.orm import Session
 
-from constants import OrderStatus
+from constants import ExportFormat, OrderStatus
 from domains import domain_order
 from app.infra.deps import get_db
 from gateway.payment_gateway import return_transaction
@@ -44,19 +45,57 @@ async def get_order_users_id(
 
 
 @order.get('/orders', status_code=200)
-async def get_orders_paid(
+async def get_orders_paid(  # noqa: PLR0913
+    *,
     dates: str | None = None,
     status: str | None = None,
     user_id: int | None = None,
+    cursor: int | None = None,
+    limit: int | None = Query(None, ge=1),
     db: Session = Depends(get_db),
 ) -> None:
-    """Get orders paid."""
+    """Get orders paid, paginated by ``order_id``."""
     try:
-        return domain_order.get_orders_paid(db, dates, status, user_id)
+        return domain_order.get_orders_paid(
+            db,
+            dates,
+            status,
+            user_id,
+            cursor,
+            limit,
+        )
     except Exception:
         raise
 
 
+@order.get('/orders/export', status_code=200)
+async def export_orders_paid(
+    export_format: ExportFormat = Query(ExportFormat.CSV, alias='format'),
+    dates: str | None = None,
+    status: str | None = None,
+    user_id: int | None = None,
+) -> StreamingResponse:
+    """Stream the orders report as CSV or NDJSON, one product line per row."""
+    media_types = {
+        ExportFormat.CSV: 'text/csv',
+        ExportFormat.NDJSON: 'application/x-ndjson',
+    }
+    return StreamingResponse(
+        domain_order.export_orders_paid(
+            export_format,
+            dates,
+            status,
+            user_id,
+        ),
+        media_type=media_types[export_format],
+        headers={
+            'Content-Disposition': (
+                f'attachment; filename=orders.{export_format.value}'
+            ),
+        },
+    )
+
+
 @order.put('/{id}', status_code=200)
 async def put_order(
     *,
@@ -2,12 +2,16 @@ from app.infra.deps import get_db
 from payment.schema import InstallmentSchema
 from app.infra.deps import get_db
 from payment.schema import ConfigCreditCardResponse, InstallmentSchema
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from loguru import logger
 from sqlalchemy.orm import Session
 
 from domains import domain_order
 from app.infra import deps
+from app.infra.metrics import metrics
+from app.infra.redis import RedisCache
+from app.payment import postback, tasks
+from config import settings
 from payment import gateway, repositories
 from payment.schema import (
     ConfigCreditCardInDB,
@@ -57,6 +61,40 @@ def checkout(
     ).process_checkout()
 
 
+@payment.get('/metrics', status_code=200)
+async def get_payment_metrics() -> dict:
+    """Get payment provider latency histograms."""
+    return metrics.snapshot(prefix='stripe.')
+
+
+@payment.post('/postback', status_code=202)
+async def payment_postback(request: Request) -> dict:
+    """Queue a signed PagarMe postback, ignoring redeliveries."""
+    body = await request.body()
+    if not postback.verify_signature(
+        body,
+        request.headers.get('X-Hub-Signature'),
+        settings.get('GATEWAY_API', ''),
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail='Invalid postback signature',
+        )
+    try:
+        payment_update = postback.parse_postback(body)
+    except (ValueError, postback.InvalidPostbackError) as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(error),
+        ) from error
+    if not await postback.enqueue_postback(RedisCache().redis, payment_update):
+        return {'status': 'duplicate'}
+    tasks.apply_postbacks.apply_async(
+        countdown=float(settings.get('POSTBACK_APPLY_DELAY', 2)),
+    )
+    return {'status': 'queued'}
+
+
 @payment.post('/create-config', status_code=201)
 def create_config(*, config_data: ConfigCreditCardInDB) -> None:
     """Create config."""
@@ -1,15 +1,28 @@
-from fastapi import APIRouter, Depends, File, UploadFile
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    UploadFile,
+    status,
+)
 from loguru import logger
 from sqlalchemy.orm import Session
 
 from domains import domain_order
 from app.infra import deps
 from app.infra.deps import get_db
+from app.product.cache import product_cache
 from payment.schema import ProductSchema
+from config import settings
 from schemas.order_schema import (
     ProductFullResponse,
+    ProductGalleryResponse,
 )
 
+GALLERY_BATCH_MAX = int(settings.get('GALLERY_BATCH_MAX', 100))
+
 product = APIRouter(
     prefix='/product',
     tags=['product'],
@@ -27,7 +40,10 @@ async def create_product(
     product_data: ProductSchema,
 ) -> None:
     """Create product."""
-    product = domain_order.create_product(db=db, product_data=product_data)
+    product = await domain_order.create_product(
+        db=db,
+        product_data=product_data,
+    )
     return ProductSchema.from_orm(product)
 
 
@@ -39,7 +55,7 @@ async def upload_image(
 ) -> None:
     """Upload image."""
     try:
-        return domain_order.upload_image(db, product_id, image)
+        return await domain_order.upload_image(db, product_id, image)
     except Exception:
         raise
 
@@ -52,7 +68,11 @@ async def upload_image_gallery(
 ) -> None:
     """Upload image gallery."""
     try:
-        return domain_order.upload_image_gallery(product_id, db, imagegallery)
+        return await domain_order.upload_image_gallery(
+            product_id,
+            db,
+            imagegallery,
+        )
     except Exception:
         raise
 
@@ -61,7 +81,7 @@ async def upload_image_gallery(
 async def get_showcase(*, db: Session = Depends(get_db)) -> None:
     """Get showcase."""
     try:
-        return domain_order.get_showcase(db)
+        return await domain_order.get_showcase(db)
     except Exception as e:
         logger.error(f'Erro em obter os produtos - { e }')
         raise
@@ -71,7 +91,7 @@ async def get_showcase(*, db: Session = Depends(get_db)) -> None:
 async def get_images_gallery(uri: str, db: Session = Depends(get_db)) -> None:
     """Get images gallery."""
     try:
-        return domain_order.get_images_gallery(db, uri)
+        return await domain_order.get_images_gallery(db, uri)
     except Exception:
         raise
 
@@ -80,7 +100,7 @@ async def get_images_gallery(uri: str, db: Session = Depends(get_db)) -> None:
 async def delete_image(id: int, db: Session = Depends(get_db)) -> None:
     """Delete image."""
     try:
-        return domain_order.delete_image_gallery(id, db)
+        return await domain_order.delete_image_gallery(id, db)
     except Exception:
         raise
 
@@ -89,17 +109,35 @@ async def delete_image(id: int, db: Session = Depends(get_db)) -> None:
 async def get_product_uri(uri: str, db: Session = Depends(get_db)) -> None:
     """GET product uri."""
     try:
-        return domain_order.get_product(db, uri)
+        return await domain_order.get_product(db, uri)
     except Exception as e:
         logger.error(f'Erro em obter os produto - { e }')
         raise
 
 
 @catalog.get('/all', status_code=200)
-async def get_products_all(db: Session = Depends(get_db)) -> None:
-    """Get products all."""
+async def get_products_all(
+    *,
+    cursor: int | None = None,
+    limit: int | None = Query(None, ge=1),
+    fields: str | None = None,
+    legacy: bool = False,
+    db: Session = Depends(get_db),
+) -> None:
+    """Get products all.
+
+    Pages are keyset paginated: pass the returned ``next_cursor`` as
+    ``cursor`` to get the next one. ``legacy=true`` returns every product
+    in the previous unpaginated shape.
+    """
     try:
-        return domain_order.get_product_all(db)
+        return await domain_order.get_product_all(
+            db,
+            cursor,
+            limit,
+            fields,
+            legacy=legacy,
+        )
     except Exception as e:
         logger.error(f'Erro em obter os produtos - { e }')
         raise
@@ -113,7 +151,7 @@ async def put_product(
 ) -> None:
     """Put product."""
     try:
-        return domain_order.put_product(db, id, value)
+        return await domain_order.put_product(db, id, value)
     except Exception:
         raise
 
@@ -122,7 +160,7 @@ async def put_product(
 async def delete_product(id: int, db: Session = Depends(get_db)) -> None:
     """Delete product."""
     try:
-        return domain_order.delete_product(db, id)
+        return await domain_order.delete_product(db, id)
     except Exception:
         raise
 
@@ -137,13 +175,46 @@ async def get_categorys(db: Session = Depends(get_db)) -> None:
         raise
 
 
+@catalog.get('/galleries', status_code=200)
+async def get_galleries(
+    product_id: list[int] = Query([]),
+    uri: list[str] = Query([]),
+    db: Session = Depends(get_db),
+) -> list[ProductGalleryResponse]:
+    """Get the galleries of many products by id and/or uri."""
+    if len(product_id) + len(uri) > GALLERY_BATCH_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f'At most {GALLERY_BATCH_MAX} products per request',
+        )
+    return await domain_order.get_galleries(db, product_id, uri)
+
+
+@catalog.get('/cache/stats', status_code=200)
+async def get_cache_stats() -> dict:
+    """Get product cache hit/miss counters."""
+    return product_cache.stats()
+
+
 @catalog.get('/category/products/{path}', status_code=200)
-async def get_product_category(
+async def get_product_category(  # noqa: PLR0913
     path: str,
+    *,
+    cursor: int | None = None,
+    limit: int | None = Query(None, ge=1),
+    fields: str | None = None,
+    legacy: bool = False,
     db: Session = Depends(get_db),
 ) -> None:
-    """Get product category."""
+    """Get product category, paginated like ``/catalog/all``."""
     try:
-        return domain_order.get_products_category(db, path)
+        return await domain_order.get_products_category(
+            db,
+            path,
+            cursor,
+            limit,
+            fields,
+            legacy=legacy,
+        )
     except Exception:
         raise
@@ -21,7 +21,7 @@ def zip_code_adress(shipping_data: Shipping) -> None:
 
 
 @shipping.post('/zip_code/shipping/calc', status_code=200)
-def zip_code_shipping(
+async def zip_code_shipping(
     *,
     db: Session = Depends(get_db),
     shipping_data: ShippingCalc,
@@ -30,7 +30,7 @@ def zip_code_shipping(
     from loguru import logger
 
     logger.debug(shipping_data)
-    return domain_shipping.shipping_zip_code(
+    return await domain_shipping.shipping_zip_code(
         db=db,
         shipping_data=shipping_data,
     )
@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 from domains import domain_user
 from domains.domain_user import check_token
 from app.infra.deps import get_db
+from app.user.password import password_hasher
 from schemas.user_schema import (
     SignUp,
     SignUpResponse,
@@ -31,7 +32,7 @@ async def signup(
     user_in: SignUp,
 ) -> None:
     """Signup."""
-    user = domain_user.create_user(db, obj_in=user_in)
+    user = await domain_user.register_user(db, obj_in=user_in)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -59,7 +60,7 @@ async def login_for_access_token(
     db: Session = Depends(get_db),
 ) -> None:
     """Login for access token."""
-    user = domain_user.authenticate_user(
+    user = await domain_user.authenticate_user(
         db,
         form_data.username,
         form_data.password,
@@ -86,6 +87,12 @@ async def login_for_access_token(
     }
 
 
+@user.get('/password/stats', status_code=200)
+async def get_password_stats() -> dict:
+    """Get password hashing pool queue depth and counters."""
+    return password_hasher.stats()
+
+
 @user.get('/{document}', status_code=200)
 async def get_user(
     document: str,
@@ -112,4 +119,4 @@ async def reset_password(
     db: Session = Depends(get_db),
 ) -> None:
     """Reset password."""
-    return domain_user.reset_password(db, data=response_model)
+    return await domain_user.reset_password(db, data=response_model)
@@ -0,0 +1,62 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any, TypeVar
+
+
+Self = TypeVar('Self')
+
+_MISSING = object()
+
+
+class LocalCache:
+    """In-process LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self: Self, maxsize: int = 1024, ttl: float = 30) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self: Self, key: Hashable, default: Any = None) -> Any:  # noqa: ANN401
+        """Return the cached value or ``default`` when missing or expired."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(
+        self: Self,
+        key: Hashable,
+        value: Any,  # noqa: ANN401
+        ttl: float | None = None,
+    ) -> None:
+        """Store a value, evicting the least recently used when full."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self: Self, *keys: Hashable) -> None:
+        """Remove the given keys if present."""
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self: Self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self: Self) -> int:
+        """Return the number of entries, expired ones included."""
+        return len(self._data)
@@ -0,0 +1,120 @@
+import bisect
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import TypeVar
+
+Self = TypeVar('Self')
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+
+class Histogram:
+    """Cumulative latency histogram with fixed buckets in seconds."""
+
+    def __init__(self: Self, buckets: tuple = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.errors = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self: Self, seconds: float, *, error: bool = False) -> None:
+        """Must record one call of ``seconds``."""
+        position = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[position] += 1
+            self.count += 1
+            self.sum += seconds
+            if error:
+                self.errors += 1
+
+    def quantile(self: Self, quantile: float) -> float | None:
+        """Return the upper bound of the bucket holding ``quantile``."""
+        if not self.count:
+            return None
+        rank = quantile * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts, strict=False):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def snapshot(self: Self) -> dict:
+        """Return counters, bucket counts and approximate quantiles."""
+        with self._lock:
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(
+                (*self.buckets, float('inf')),
+                self.counts,
+                strict=True,
+            ):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            return {
+                'count': self.count,
+                'errors': self.errors,
+                'sum': self.sum,
+                'buckets': buckets,
+                'p50': self.quantile(0.5),
+                'p95': self.quantile(0.95),
+                'p99': self.quantile(0.99),
+            }
+
+
+class Metrics:
+    """Named histograms shared by the process."""
+
+    def __init__(self: Self) -> None:
+        self.histograms: dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self: Self, name: str) -> Histogram:
+        """Return the histogram ``name``, created on first use."""
+        with self._lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram()
+            return self.histograms[name]
+
+    @contextmanager
+    def timer(self: Self, name: str) -> Iterator[None]:
+        """Observe the duration of the block, flagging raised errors."""
+        started = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.histogram(name).observe(
+                time.perf_counter() - started,
+                error=error,
+            )
+
+    def snapshot(self: Self, prefix: str = '') -> dict:
+        """Return the snapshot of every histogram starting with prefix."""
+        return {
+            name: histogram.snapshot()
+            for name, histogram in sorted(self.histograms.items())
+            if name.startswith(prefix)
+        }
+
+
+metrics = Metrics()
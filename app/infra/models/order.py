@@ -46,6 +46,7 @@ class Product(Base):
     length: Mapped[Decimal | None]
     diameter: Mapped[Decimal | None]
     sku: Mapped[str]
+    quantity: Mapped[int | None]
 
 
 class Coupons(Base):
@@ -78,6 +79,7 @@ class Order(Base):
     order_status: Mapped[str]
     last_updated: Mapped[datetime]
     checked: Mapped[bool] = mapped_column(default=False)
+    checkout_key: Mapped[str | None] = mapped_column(unique=True)
 
 
 class OrderItems(Base):
@@ -117,4 +119,7 @@ class ImageGallery(Base):
 
     category_id: Mapped[int] = mapped_column(primary_key=True)
     url: Mapped[str]
-    product_id: Mapped[int] = mapped_column(ForeignKey('product.product_id'))
+    product_id: Mapped[int] = mapped_column(
+        ForeignKey('product.product_id'),
+        index=True,
+    )
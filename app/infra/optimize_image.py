@@ -1,15 +1,165 @@
+"""Product image pipeline.
+
+The upload is read in chunks (at most ``IMAGE_MAX_BYTES``) and handed to
+a process pool of ``IMAGE_WORKERS``, where it is decoded once and reduced
+step by step to each variant, every one encoded as WebP and JPEG. The
+files are then uploaded concurrently through the shared storage client.
+"""
+import asyncio
+import hashlib
+import io
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import PurePath
+from typing import TypeVar
+
 from dynaconf import settings
-from PIL import Image
+from fastapi import HTTPException, UploadFile, status
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app.infra.spaces import AbstractImageStorage, get_storage
+
+Self = TypeVar('Self')
+
+CHUNK_SIZE = 64 * 1024
+VARIANTS = {
+    'detail': (1200, 1200),
+    'listing': (400, 400),
+    'thumbnail': (150, 150),
+}
+FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpg': ('JPEG', 'image/jpeg'),
+}
+DEFAULT_VARIANT = ('detail', 'jpg')
+
+
+def render_variants(
+    data: bytes,
+    quality: int = 80,
+) -> dict[tuple[str, str], bytes]:
+    """Return every ``(variant, extension) -> encoded image``.
+
+    Runs in a worker process. The image is decoded once, at the smallest
+    JPEG scale that still covers the largest variant, and each variant is
+    resized from the previous one.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        source.draft('RGB', max(VARIANTS.values()))
+        image = ImageOps.exif_transpose(source).convert('RGB')
+    rendered = {}
+    for name, size in VARIANTS.items():
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+        for extension, (image_format, _) in FORMATS.items():
+            output = io.BytesIO()
+            image.save(
+                output,
+                image_format,
+                quality=quality,
+                optimize=True,
+                **({'progressive': True} if image_format == 'JPEG' else {}),
+            )
+            rendered[name, extension] = output.getvalue()
+    return rendered
+
+
+class ImagePipeline:
+    """Resize and publish product images off the request thread."""
+
+    def __init__(
+        self: Self,
+        storage: AbstractImageStorage | None = None,
+        workers: int | None = None,
+        max_bytes: int | None = None,
+        quality: int | None = None,
+    ) -> None:
+        self._storage = storage
+        self.workers = workers or int(settings.get('IMAGE_WORKERS', 2))
+        self.max_bytes = max_bytes or int(
+            settings.get('IMAGE_MAX_BYTES', 10 * 1024 * 1024),
+        )
+        self.quality = quality or int(settings.get('IMAGE_QUALITY', 80))
+        self._executor: ProcessPoolExecutor | None = None
+
+    @property
+    def storage(self: Self) -> AbstractImageStorage:
+        """Return the storage, chosen on first use."""
+        if self._storage is None:
+            self._storage = get_storage()
+        return self._storage
+
+    @property
+    def executor(self: Self) -> ProcessPoolExecutor:
+        """Return the resize pool, created on first use."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def shutdown(self: Self) -> None:
+        """Stop the resize pool and the storage uploads."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if hasattr(self._storage, 'shutdown'):
+            self._storage.shutdown()
+
+    async def read(self: Self, upload: UploadFile) -> bytes:
+        """Must read the upload in chunks, rejecting oversized files."""
+        buffer = bytearray()
+        while chunk := await upload.read(CHUNK_SIZE):
+            buffer += chunk
+            if len(buffer) > self.max_bytes:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f'Image larger than {self.max_bytes} bytes',
+                )
+        return bytes(buffer)
+
+    async def process(self: Self, upload: UploadFile) -> dict[str, str]:
+        """Must publish every variant and return ``name.ext -> url``."""
+        data = await self.read(upload)
+        try:
+            rendered = await asyncio.get_running_loop().run_in_executor(
+                self.executor,
+                render_variants,
+                data,
+                self.quality,
+            )
+        except (
+            UnidentifiedImageError,
+            Image.DecompressionBombError,
+            OSError,
+        ) as error:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail='Invalid image',
+            ) from error
+        prefix = image_prefix(upload.filename, data)
+        urls = await self.storage.upload_many(
+            {
+                f'{prefix}-{name}.{extension}': (
+                    content,
+                    FORMATS[extension][1],
+                )
+                for (name, extension), content in rendered.items()
+            },
+        )
+        return {
+            key.removeprefix(f'{prefix}-'): url for key, url in urls.items()
+        }
+
+
+def image_prefix(filename: str | None, data: bytes) -> str:
+    """Return a URL-safe name unique to the image content."""
+    stem = re.sub(r'[^a-z0-9]+', '-', PurePath(filename or '').stem.lower())
+    digest = hashlib.sha1(data).hexdigest()[:12]  # noqa: S324
+    return f'{stem.strip("-") or "image"}-{digest}'
+
 
-from app.infra.spaces import send_image_spaces
+image_pipeline = ImagePipeline()
 
 
-def optimize_image(image: str) -> None:
-    """Optimize images."""
-    img = Image.open(image.file)
-    if settings.ENVIRONMENT == 'development':
-        img.save(f'./static/images/{image.filename}')
-        return f'http://localhost:7777/static/images/{image.filename}'
-    img.save(f'{image.filename}')
-    send_image_spaces(image.filename)
-    return f'https://gattorosa.nyc3.digitaloceanspaces.com/{image.filename}'
+async def optimize_image(image: UploadFile) -> str:
+    """Publish the image variants and return the default one's URL."""
+    urls = await image_pipeline.process(image)
+    return urls['.'.join(DEFAULT_VARIANT)]
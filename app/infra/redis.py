@@ -1,44 +1,181 @@
 import abc
-from typing import TypeVar
-from typing import ClassVar
+from collections.abc import Awaitable, Callable
+from typing import ClassVar, TypeVar
+
+from redis import Redis
+from redis import asyncio as aioredis
+from redis.exceptions import WatchError
+
 from config import settings
-import redis
 
 
 Self = TypeVar('Self')
+Payload = str | bytes
+Mutate = Callable[
+    [Payload | None],
+    Payload | Awaitable[Payload | None] | None,
+]
+
+CART_TTL = int(settings.get('CART_TTL', 60 * 60 * 24 * 3))
+
+
+async def _apply(mutate: Mutate, payload: Payload | None) -> Payload | None:
+    value = mutate(payload)
+    if isinstance(value, Awaitable):
+        value = await value
+    return value
+
+
+class CartStore(abc.ABC):
+    """Storage of serialized carts keyed by cart uuid."""
+
+    async def get(self: Self, key: str) -> Payload | None:
+        """Must return the stored cart payload or None."""
+        return await self._get(key)
+
+    async def set(self: Self, key: str, value: Payload) -> None:
+        """Must store the cart payload and refresh its TTL."""
+        await self._set(key, value)
+
+    async def update(
+        self: Self,
+        key: str,
+        mutate: Mutate,
+    ) -> Payload | None:
+        """Apply ``mutate`` to the stored payload atomically.
+
+        ``mutate`` receives the current payload (or None) and returns the
+        new one, or an awaitable of it. Returning None leaves the key
+        untouched. ``mutate`` may run again when the key changed under it.
+        """
+        return await self._update(key, mutate)
+
+    @abc.abstractmethod
+    async def _get(self: Self, key: str) -> Payload | None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def _set(self: Self, key: str, value: Payload) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def _update(
+        self: Self,
+        key: str,
+        mutate: Mutate,
+    ) -> Payload | None:
+        raise NotImplementedError
+
+
+class RedisCartStore(CartStore):
+    """Cart store backed by ``redis.asyncio`` and a shared pool."""
+
+    def __init__(
+        self: Self,
+        client: aioredis.Redis,
+        ttl: int = CART_TTL,
+    ) -> None:
+        self.redis = client
+        self.ttl = ttl
+
+    async def _get(self: Self, key: str) -> Payload | None:
+        return await self.redis.get(key)
+
+    async def _set(self: Self, key: str, value: Payload) -> None:
+        await self.redis.set(key, value, ex=self.ttl)
+
+    async def _update(
+        self: Self,
+        key: str,
+        mutate: Mutate,
+    ) -> Payload | None:
+        """Read-modify-write guarded by WATCH, retried on conflicts."""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    value = await _apply(mutate, await pipe.get(key))
+                    if value is None:
+                        await pipe.unwatch()
+                        return None
+                    pipe.multi()
+                    pipe.set(key, value, ex=self.ttl)
+                    await pipe.execute()
+                    return value   # noqa: TRY300
+                except WatchError:
+                    continue
 
 
 class AbstractCache(abc.ABC):
-    def client(self: Self) -> redis.Redis:
+    def client(self: Self) -> CartStore:
         return self._client()
 
     @abc.abstractmethod
-    def _client(self: Self) -> redis.Redis:
+    def _client(self: Self) -> CartStore:
         raise NotImplementedError
 
 
 class RedisCache(AbstractCache):
+    pool: ClassVar[aioredis.ConnectionPool | None] = None
+
     def __init__(self: Self) -> None:
-        self.pool = redis.ConnectionPool(
+        if RedisCache.pool is None:
+            RedisCache.pool = aioredis.ConnectionPool(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                db=settings.REDIS_DB,
+                max_connections=int(settings.get('REDIS_MAX_CONNECTIONS', 50)),
+            )
+        self.redis = aioredis.Redis(connection_pool=RedisCache.pool)
+        self.store = RedisCartStore(self.redis)
+
+    def _client(self: Self) -> CartStore:
+        return self.store
+
+    @classmethod
+    async def close(cls: type['RedisCache']) -> None:
+        """Disconnect every pooled connection."""
+        if cls.pool is not None:
+            await cls.pool.disconnect()
+
+
+_sync_client: Redis | None = None
+
+
+def sync_client() -> Redis:
+    """Return the blocking client shared by the Celery workers."""
+    global _sync_client  # noqa: PLW0603
+    if _sync_client is None:
+        _sync_client = Redis(
             host=settings.REDIS_HOST,
             port=settings.REDIS_PORT,
             db=settings.REDIS_DB,
         )
-        self.redis = redis.Redis(connection_pool=self.pool)
+    return _sync_client
 
-    def _client(self: Self) -> redis.Redis:
-        return self.redis
 
-
-class MemoryClient:
+class MemoryClient(CartStore):
     cache: ClassVar[dict] = {}
 
-    def set(self: Self, key: str, value: str) -> dict:
+    async def _get(self: Self, key: str) -> Payload | None:
+        return self.cache.get(key)
+
+    async def _set(self: Self, key: str, value: Payload) -> None:
         self.cache[key] = value
-        return self.cache
 
-    def get(self: Self, key: str) -> dict:
-        return self.cache.get(key)
+    async def _update(
+        self: Self,
+        key: str,
+        mutate: Mutate,
+    ) -> Payload | None:
+        while True:
+            current = self.cache.get(key)
+            value = await _apply(mutate, current)
+            if self.cache.get(key) is not current:
+                continue
+            if value is not None:
+                self.cache[key] = value
+            return value
 
 
 class MemoryCache(AbstractCache):
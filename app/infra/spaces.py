@@ -1,21 +1,185 @@
+import abc
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, TypeVar
+
 import boto3
+from botocore.config import Config
 from dynaconf import settings
 
+Self = TypeVar('Self')
+
+SPACES_ENDPOINT = 'https://nyc3.digitaloceanspaces.com'
+SPACES_BUCKET = 'gattorosa'
+SPACES_PUBLIC_URL = 'https://gattorosa.nyc3.digitaloceanspaces.com'
+
+
+class AbstractImageStorage(abc.ABC):
+    """Public object storage for product images."""
+
+    async def upload(
+        self: Self,
+        key: str,
+        data: bytes,
+        content_type: str,
+    ) -> str:
+        """Must store ``data`` under ``key`` and return its public URL."""
+        await self._upload(key, data, content_type)
+        return self.url(key)
+
+    async def upload_many(
+        self: Self,
+        objects: dict[str, tuple[bytes, str]],
+    ) -> dict[str, str]:
+        """Must upload ``key -> (data, content_type)`` concurrently."""
+        urls = await asyncio.gather(
+            *(
+                self.upload(key, data, content_type)
+                for key, (data, content_type) in objects.items()
+            ),
+        )
+        return dict(zip(objects, urls, strict=True))
+
+    @abc.abstractmethod
+    def url(self: Self, key: str) -> str:
+        ...
+
+    @abc.abstractmethod
+    async def _upload(
+        self: Self,
+        key: str,
+        data: bytes,
+        content_type: str,
+    ) -> None:
+        ...
+
+
+class SpacesStorage(AbstractImageStorage):
+    """DigitalOcean Spaces through one S3 client shared by the process.
+
+    boto3 clients are thread safe, so uploads run on up to
+    ``SPACES_UPLOAD_WORKERS`` threads over the same connection pool.
+    """
+
+    def __init__(
+        self: Self,
+        workers: int | None = None,
+        client: Any = None,  # noqa: ANN401
+    ) -> None:
+        self.workers = workers or int(settings.get('SPACES_UPLOAD_WORKERS', 8))
+        self.bucket = settings.get('SPACES_BUCKET', SPACES_BUCKET)
+        self.public_url = settings.get('SPACES_PUBLIC_URL', SPACES_PUBLIC_URL)
+        self._client = client
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self: Self):  # noqa: ANN201
+        """Return the S3 client, created on first use."""
+        with self._lock:
+            if self._client is None:
+                self._client = boto3.session.Session().client(
+                    's3',
+                    region_name='nyc3',
+                    endpoint_url=settings.get(
+                        'SPACES_ENDPOINT',
+                        SPACES_ENDPOINT,
+                    ),
+                    aws_access_key_id=settings.AWS_ACESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    config=Config(
+                        max_pool_connections=self.workers,
+                    ),
+                )
+            return self._client
+
+    @property
+    def executor(self: Self) -> ThreadPoolExecutor:
+        """Return the upload pool, created on first use."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix='spaces',
+            )
+        return self._executor
+
+    def shutdown(self: Self) -> None:
+        """Stop the upload pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def url(self: Self, key: str) -> str:
+        return f'{self.public_url}/{key}'
+
+    async def _upload(
+        self: Self,
+        key: str,
+        data: bytes,
+        content_type: str,
+    ) -> None:
+        client = self.client
+        await asyncio.get_running_loop().run_in_executor(
+            self.executor,
+            lambda: client.put_object(
+                Bucket=self.bucket,
+                Key=key,
+                Body=data,
+                ACL='public-read',
+                ContentType=content_type,
+                CacheControl='public, max-age=31536000, immutable',
+            ),
+        )
+
+
+class LocalStorage(AbstractImageStorage):
+    """Images served from ``static/images`` in development."""
+
+    def __init__(
+        self: Self,
+        directory: str = './static/images',
+        public_url: str = 'http://localhost:7777/static/images',
+    ) -> None:
+        self.directory = Path(directory)
+        self.public_url = public_url
+
+    def url(self: Self, key: str) -> str:
+        return f'{self.public_url}/{key}'
+
+    async def _upload(
+        self: Self,
+        key: str,
+        data: bytes,
+        content_type: str,  # noqa: ARG002
+    ) -> None:
+        path = self.directory / key
+        await asyncio.to_thread(path.write_bytes, data)
+
+
+class MemoryStorage(AbstractImageStorage):
+    """In-memory bucket standing in for Spaces in tests."""
+
+    def __init__(self: Self, delay: float = 0) -> None:
+        self.delay = delay
+        self.objects: dict[str, tuple[bytes, str]] = {}
+
+    def url(self: Self, key: str) -> str:
+        return f'memory://images/{key}'
+
+    async def _upload(
+        self: Self,
+        key: str,
+        data: bytes,
+        content_type: str,
+    ) -> None:
+        await asyncio.sleep(self.delay)
+        self.objects[key] = (data, content_type)
+
 
-def send_image_spaces(image_name: str) -> None:
-    """Send image to digital ocean spaces."""
-    session = boto3.session.Session()
-    client = session.client(
-        's3',
-        region_name='nyc3',
-        endpoint_url='https://nyc3.digitaloceanspaces.com',
-        aws_access_key_id=settings.AWS_ACESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-    )
-
-    client.upload_file(
-        f'{image_name}',  # Path to local file
-        'gattorosa',  # Name of Space
-        f'{image_name}',
-        ExtraArgs={'ACL': 'public-read'},
-    )  # Name for remote file
+def get_storage() -> AbstractImageStorage:
+    """Return the storage for the current environment."""
+    if settings.ENVIRONMENT == 'development':
+        return LocalStorage()
+    return SpacesStorage()
@@ -42,6 +42,14 @@ def confirm_payment_intent(
     )
 
 
+def refund_payment_intent(payment_intent_id: str) -> stripe.Refund:
+    """Must refund a payment intent, once however often it is retried."""
+    return stripe.Refund.create(
+        payment_intent=payment_intent_id,
+        idempotency_key=f'refund-{payment_intent_id}',
+    )
+
+
 def create_credit_card(  # noqa: PLR0913
     number: str,
     exp_month: int,
@@ -0,0 +1,191 @@
+"""Installment plans in integer cents.
+
+Each ``CreditCardFeeConfig`` becomes an ``InstallmentTable`` holding the
+compound fee ``(1 + fee) ** n`` of every installment count as an exact
+integer fraction, built once per process. A plan is then a handful of
+integer operations per installment count, so many totals are priced in
+one call without floats or Decimal contexts.
+"""
+import threading
+from collections.abc import Iterable
+from decimal import Decimal
+from typing import TypeVar
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.infra.models.transaction import CreditCardFeeConfig
+from config import settings
+
+Self = TypeVar('Self')
+
+MAX_INSTALLMENTS = int(settings.get('INSTALLMENTS_MAX', 12))
+DEFAULT_FEE = Decimal(str(settings.get('INSTALLMENTS_DEFAULT_FEE', '0.0199')))
+DEFAULT_MIN_INSTALLMENT_WITH_FEE = 4
+
+
+class InstallmentError(Exception):
+    """Raise when an installment count is not offered by the config."""
+
+    def __init__(self: Self, installments: int, maximum: int) -> None:
+        super().__init__(
+            f'Installments must be between 1 and {maximum}, '
+            f'got {installments}',
+        )
+
+
+def fee_fraction(fee: Decimal) -> tuple[int, int]:
+    """Return ``1 + fee`` as an exact ``(numerator, denominator)``."""
+    scale = 10 ** max(-Decimal(fee).as_tuple().exponent, 0)
+    return scale + int(Decimal(fee) * scale), scale
+
+
+class InstallmentTable:
+    """Compound fee factors of one fee config."""
+
+    def __init__(
+        self: Self,
+        fee: Decimal,
+        min_installment_with_fee: int,
+        max_installments: int,
+    ) -> None:
+        self.min_installment_with_fee = min_installment_with_fee
+        self.max_installments = max(
+            1,
+            min(max_installments or MAX_INSTALLMENTS, MAX_INSTALLMENTS),
+        )
+        numerator, denominator = fee_fraction(fee)
+        self.factors = tuple(
+            (numerator**n, denominator**n)
+            if n >= min_installment_with_fee
+            else (1, 1)
+            for n in range(1, self.max_installments + 1)
+        )
+
+    @classmethod
+    def from_config(
+        cls: type['InstallmentTable'],
+        config: CreditCardFeeConfig,
+    ) -> 'InstallmentTable':
+        return cls(
+            fee=config.fee,
+            min_installment_with_fee=config.min_installment_with_fee,
+            max_installments=config.max_installments,
+        )
+
+    def total(self: Self, amount: int, installments: int) -> int:
+        """Must return ``amount`` cents with the fee of ``installments``."""
+        if not 1 <= installments <= self.max_installments:
+            raise InstallmentError(installments, self.max_installments)
+        numerator, denominator = self.factors[installments - 1]
+        return (amount * numerator + denominator // 2) // denominator
+
+    def plan(self: Self, amount: int) -> list[dict]:
+        """Return every installment option for ``amount`` cents.
+
+        ``value`` is the regular installment; the remainder of the
+        division goes to the first one so the installments add up to
+        ``total`` exactly.
+        """
+        options = []
+        for n, (numerator, denominator) in enumerate(self.factors, 1):
+            total = (amount * numerator + denominator // 2) // denominator
+            value, remainder = divmod(total, n)
+            options.append(
+                {
+                    'installments': n,
+                    'value': value,
+                    'first_value': value + remainder,
+                    'total': total,
+                    'with_fee': denominator != 1,
+                },
+            )
+        return options
+
+    def plans(self: Self, amounts: Iterable[int]) -> list[list[dict]]:
+        """Return the plan of each amount."""
+        return [self.plan(amount) for amount in amounts]
+
+
+class InstallmentEngine:
+    """Installment tables of every fee config, loaded once per process.
+
+    Fee configs are never edited, a new one is created instead, so the
+    tables are kept until ``clear``. Products without a config get the
+    ``default`` plan: 1.99% a month from the 4th installment.
+    """
+
+    def __init__(self: Self) -> None:
+        self.tables: dict[int, InstallmentTable] = {}
+        self.default = InstallmentTable(
+            fee=DEFAULT_FEE,
+            min_installment_with_fee=DEFAULT_MIN_INSTALLMENT_WITH_FEE,
+            max_installments=MAX_INSTALLMENTS,
+        )
+        self._lock = threading.Lock()
+
+    def load(
+        self: Self,
+        db: Session,
+        config_ids: Iterable[int],
+    ) -> dict[int, InstallmentTable]:
+        """Must return the tables of ``config_ids``, querying only misses."""
+        wanted = {config_id for config_id in config_ids if config_id}
+        missing = wanted - self.tables.keys()
+        if missing:
+            configs = db.scalars(
+                select(CreditCardFeeConfig).where(
+                    CreditCardFeeConfig.credit_card_fee_config_id.in_(
+                        missing,
+                    ),
+                ),
+            ).all()
+            with self._lock:
+                for config in configs:
+                    self.tables[
+                        config.credit_card_fee_config_id
+                    ] = InstallmentTable.from_config(config)
+        return {
+            config_id: self.tables[config_id]
+            for config_id in wanted
+            if config_id in self.tables
+        }
+
+    def table(
+        self: Self,
+        db: Session,
+        config_id: int | None,
+    ) -> InstallmentTable:
+        """Must return the table of one config, the default one for None."""
+        if not config_id:
+            return self.default
+        tables = self.load(db, [config_id])
+        if config_id not in tables:
+            msg = f'Installment config {config_id} not found'
+            raise LookupError(msg)
+        return tables[config_id]
+
+    def plans(
+        self: Self,
+        db: Session,
+        amounts: Iterable[tuple[int, int]],
+    ) -> list[list[dict] | None]:
+        """Return the plan of each ``(config_id, amount)`` in one pass.
+
+        Configs are loaded with a single query; a None config gets the
+        default plan and unknown configs get None.
+        """
+        amounts = list(amounts)
+        tables = self.load(db, (config_id for config_id, _ in amounts))
+        plans = []
+        for config_id, amount in amounts:
+            table = tables.get(config_id) if config_id else self.default
+            plans.append(table.plan(amount) if table else None)
+        return plans
+
+    def clear(self: Self) -> None:
+        with self._lock:
+            self.tables.clear()
+
+
+installment_engine = InstallmentEngine()
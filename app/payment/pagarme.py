@@ -0,0 +1,277 @@
+"""Async PagarMe transactions client.
+
+One ``httpx.AsyncClient`` per client keeps connections alive between
+payments. Every call is bounded by ``PAGARME_TIMEOUT`` seconds as a whole;
+idempotent calls (reads) are retried up to ``PAGARME_RETRIES`` times with
+exponential backoff and full jitter, and a circuit breaker fails fast
+while the gateway keeps failing.
+
+Synchronous code (the checkout flows and the status jobs) goes through
+``create_transaction_sync`` and ``get_transaction_sync``, which run on a
+client owned by a background event loop; ``close_sync_client`` closes it.
+"""
+import asyncio
+import atexit
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Any, TypeVar
+
+import httpx
+from loguru import logger
+
+from config import settings
+
+if TYPE_CHECKING:
+    from collections.abc import Coroutine
+
+Self = TypeVar('Self')
+
+PAGARME_URL = 'https://api.pagar.me/1/transactions'
+HEADERS = {'Content-Type': 'application/json'}
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+class PaymentGatewayError(Exception):
+    """Raise when PagarMe can not answer a call."""
+
+
+class CircuitOpenError(PaymentGatewayError):
+    """Raise while the circuit breaker rejects calls."""
+
+    def __init__(self: Self, retry_in: float) -> None:
+        super().__init__(f'PagarMe circuit open, retry in {retry_in:.1f}s')
+
+
+class CircuitBreaker:
+    """Open after ``failures`` consecutive errors for ``reset_timeout`` s.
+
+    Once the timeout elapses a single trial call is let through (half
+    open); its success closes the circuit and its failure opens it again.
+    """
+
+    def __init__(
+        self: Self,
+        failures: int = 5,
+        reset_timeout: float = 30,
+    ) -> None:
+        self.failures = failures
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+        self.trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self: Self) -> str:
+        """Return ``closed``, ``open`` or ``half-open``."""
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return 'open'
+        return 'half-open'
+
+    def allow(self: Self) -> None:
+        """Must raise CircuitOpenError unless a call may go through."""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return
+            if state == 'half-open' and not self.trial:
+                self.trial = True
+                return
+            elapsed = time.monotonic() - self.opened_at
+            raise CircuitOpenError(max(self.reset_timeout - elapsed, 0))
+
+    def record_success(self: Self) -> None:
+        with self._lock:
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def record_failure(self: Self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.trial or self.consecutive_failures >= self.failures:
+                logger.warning('PagarMe circuit opened')
+                self.opened_at = time.monotonic()
+            self.trial = False
+
+
+class PagarMeClient:
+    """PagarMe transactions API on a keep-alive ``httpx.AsyncClient``."""
+
+    def __init__(  # noqa: PLR0913
+        self: Self,
+        *,
+        url: str | None = None,
+        api_key: str | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+        timeout: float | None = None,
+        retries: int | None = None,
+        backoff: float | None = None,
+        breaker: CircuitBreaker | None = None,
+    ) -> None:
+        self.url = (
+            url or settings.get('PAYMENT_GATEWAY_URL', PAGARME_URL)
+        ).rstrip('/')
+        self.api_key = api_key or settings.get('GATEWAY_API', '')
+        self.transport = transport
+        self.timeout = timeout or float(settings.get('PAGARME_TIMEOUT', 10))
+        self.retries = (
+            retries
+            if retries is not None
+            else int(settings.get('PAGARME_RETRIES', 2))
+        )
+        self.backoff = (
+            backoff
+            if backoff is not None
+            else float(settings.get('PAGARME_BACKOFF', 0.2))
+        )
+        self.breaker = breaker or CircuitBreaker(
+            failures=int(settings.get('PAGARME_BREAKER_FAILURES', 5)),
+            reset_timeout=float(settings.get('PAGARME_BREAKER_RESET', 30)),
+        )
+        self._http: httpx.AsyncClient | None = None
+
+    @property
+    def client(self: Self) -> httpx.AsyncClient:
+        """Return the HTTP client, created on first use."""
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                transport=self.transport,
+                headers=HEADERS,
+                limits=httpx.Limits(
+                    max_connections=int(
+                        settings.get('PAGARME_MAX_CONNECTIONS', 20),
+                    ),
+                    keepalive_expiry=60,
+                ),
+            )
+        return self._http
+
+    async def close(self: Self) -> None:
+        """Close the HTTP client."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def create_transaction(self: Self, payment: dict) -> dict:
+        """Must create a transaction; never retried, it is not idempotent."""
+        return await self._call('POST', self.url, payment, idempotent=False)
+
+    async def get_transaction(self: Self, gateway_id: int | str) -> dict:
+        """Must return a transaction by its gateway id."""
+        return await self._call(
+            'GET',
+            f'{self.url}/{gateway_id}',
+            {'api_key': self.api_key},
+            idempotent=True,
+        )
+
+    async def _call(
+        self: Self,
+        method: str,
+        url: str,
+        payload: dict,
+        *,
+        idempotent: bool,
+    ) -> dict:
+        attempts = 1 + (self.retries if idempotent else 0)
+        for attempt in range(attempts):
+            self.breaker.allow()
+            try:
+                async with asyncio.timeout(self.timeout):
+                    response = await self.client.request(
+                        method,
+                        url,
+                        json=payload,
+                        timeout=self.timeout,
+                    )
+                if response.status_code in RETRY_STATUS:
+                    response.raise_for_status()
+                result = response.json()
+            except (httpx.HTTPError, TimeoutError) as error:
+                self.breaker.record_failure()
+                logger.warning(
+                    f'PagarMe {method} failed ({attempt + 1}/{attempts}): '
+                    f'{error!r}',
+                )
+                if attempt + 1 == attempts:
+                    raise PaymentGatewayError(repr(error)) from error
+                await asyncio.sleep(
+                    random.uniform(0, self.backoff * 2**attempt),  # noqa: S311
+                )
+                continue
+            except BaseException:
+                # Cancelled or unexpected: never leave a trial call open.
+                self.breaker.record_failure()
+                raise
+            self.breaker.record_success()
+            return result
+        raise PaymentGatewayError(url)
+
+
+pagarme = PagarMeClient()
+
+
+class _BackgroundLoop:
+    """Event loop on a daemon thread serving synchronous callers."""
+
+    def __init__(self: Self) -> None:
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.client: PagarMeClient | None = None
+        self.thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def run(self: Self, call: Any) -> Any:  # noqa: ANN401
+        """Run ``call(client)`` on the loop and wait for its result."""
+        with self._lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self.client = PagarMeClient()
+                self.thread = threading.Thread(
+                    target=self.loop.run_forever,
+                    name='pagarme',
+                    daemon=True,
+                )
+                self.thread.start()
+            loop, client = self.loop, self.client
+        coroutine: Coroutine = call(client)
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    def close(self: Self) -> None:
+        """Close the client and stop the loop; the next call restarts it."""
+        with self._lock:
+            loop, client, thread = self.loop, self.client, self.thread
+            self.loop = self.client = self.thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(client.close(), loop).result(
+                timeout=client.timeout,
+            )
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=client.timeout)
+            if not loop.is_running():
+                loop.close()
+
+
+_background = _BackgroundLoop()
+atexit.register(_background.close)
+
+
+def create_transaction_sync(payment: dict) -> dict:
+    """Must create a transaction from synchronous code."""
+    return _background.run(lambda client: client.create_transaction(payment))
+
+
+def get_transaction_sync(gateway_id: int | str) -> dict:
+    """Must return a transaction from synchronous code."""
+    return _background.run(lambda client: client.get_transaction(gateway_id))
+
+
+def close_sync_client() -> None:
+    """Close the client used by the synchronous wrappers."""
+    _background.close()
@@ -0,0 +1,216 @@
+"""PagarMe postbacks: verify, deduplicate, queue and apply in batches.
+
+The endpoint only checks the ``X-Hub-Signature`` HMAC, drops deliveries
+already seen (``SET NX`` with ``POSTBACK_DEDUPE_TTL``) and pushes the
+update to ``POSTBACK_QUEUE_KEY``. A worker drains the queue and applies
+up to ``POSTBACK_BATCH_SIZE`` updates with a few bulk statements, so the
+reconciliation job is only a low-frequency safety net. Statuses only move
+forward (``STATUS_RANK``), so a late ``processing`` or ``waiting_payment``
+delivery never downgrades a paid or refused payment.
+"""
+import hashlib
+import hmac
+import json
+from collections import defaultdict
+from typing import Any
+from urllib.parse import parse_qsl
+
+from pydantic import BaseModel
+from redis import Redis
+from redis import asyncio as aioredis
+from sqlalchemy import bindparam, case, func, select, update
+from sqlalchemy.orm import Session
+
+from app.infra.models.order import Order
+from app.infra.models.transaction import Payment, Transaction
+from config import settings
+
+POSTBACK_QUEUE_KEY = settings.get('POSTBACK_QUEUE_KEY', 'postback:pending')
+POSTBACK_DEDUPE_TTL = int(settings.get('POSTBACK_DEDUPE_TTL', 86400))
+POSTBACK_BATCH_SIZE = int(settings.get('POSTBACK_BATCH_SIZE', 500))
+
+DIGESTS = {'sha1': hashlib.sha1, 'sha256': hashlib.sha256}
+STATUS_RANK = {
+    'processing': 1,
+    'analyzing': 2,
+    'pending_review': 2,
+    'authorized': 2,
+    'waiting_payment': 2,
+    'paid': 3,
+    'refused': 3,
+    'cancelled': 3,
+    'pending_refund': 4,
+    'refunded': 5,
+    'chargedback': 5,
+}
+
+
+class InvalidPostbackError(Exception):
+    """Raise when a postback lacks the transaction id or status."""
+
+    def __init__(self: 'InvalidPostbackError') -> None:
+        super().__init__('Postback without transaction id or status')
+
+
+class PaymentUpdate(BaseModel):
+    """New status of one gateway transaction."""
+
+    gateway_id: int
+    status: str
+    authorization_code: str | None = None
+    token: str | None = None
+
+    @property
+    def key(self: 'PaymentUpdate') -> str:
+        """Return the deduplication key of the delivery."""
+        return f'{self.gateway_id}:{self.status}'
+
+
+def verify_signature(body: bytes, signature: str | None, secret: str) -> bool:
+    """Must check the ``algorithm=hexdigest`` HMAC of the raw body."""
+    if not signature or not secret:
+        return False
+    algorithm, _, digest = signature.partition('=')
+    if algorithm not in DIGESTS:
+        return False
+    expected = hmac.new(secret.encode(), body, DIGESTS[algorithm])
+    return hmac.compare_digest(expected.hexdigest(), digest)
+
+
+def parse_postback(body: bytes) -> PaymentUpdate:
+    """Return the update carried by a form or JSON postback."""
+    if body.lstrip().startswith(b'{'):
+        data = json.loads(body)
+    else:
+        data = dict(parse_qsl(body.decode()))
+    gateway_id = data.get('id') or data.get('transaction[id]')
+    status = data.get('current_status') or data.get('transaction[status]')
+    if not gateway_id or not status:
+        raise InvalidPostbackError
+    return PaymentUpdate(
+        gateway_id=gateway_id,
+        status=status,
+        authorization_code=data.get('transaction[authorization_code]'),
+        token=data.get('transaction[card][id]'),
+    )
+
+
+async def enqueue_postback(
+    redis: aioredis.Redis,
+    payment_update: PaymentUpdate,
+) -> bool:
+    """Must queue the update unless the delivery was already seen.
+
+    The seen key is dropped again when the push fails, so the gateway's
+    redelivery is queued instead of being discarded as a duplicate.
+    """
+    seen = f'postback:seen:{payment_update.key}'
+    if not await redis.set(seen, 1, nx=True, ex=POSTBACK_DEDUPE_TTL):
+        return False
+    try:
+        await redis.rpush(POSTBACK_QUEUE_KEY, payment_update.model_dump_json())
+    except Exception:
+        await redis.delete(seen)
+        raise
+    return True
+
+
+def drain_postbacks(
+    redis: Redis,
+    batch_size: int = POSTBACK_BATCH_SIZE,
+) -> list[PaymentUpdate]:
+    """Pop up to ``batch_size`` queued updates."""
+    return [
+        PaymentUpdate.model_validate_json(payload)
+        for payload in redis.lpop(POSTBACK_QUEUE_KEY, batch_size) or []
+    ]
+
+
+def requeue_postbacks(redis: Redis, updates: list[PaymentUpdate]) -> None:
+    """Put updates that could not be applied back at the queue head."""
+    if updates:
+        redis.lpush(
+            POSTBACK_QUEUE_KEY,
+            *(item.model_dump_json() for item in reversed(updates)),
+        )
+
+
+def status_rank(status: str | None) -> int:
+    """Return how far ``status`` is in the payment lifecycle."""
+    return STATUS_RANK.get(status, 0)
+
+
+def _rank_of(column: Any) -> Any:  # noqa: ANN401
+    return case(STATUS_RANK, value=column, else_=0)
+
+
+def apply_payment_updates(db: Session, updates: list[PaymentUpdate]) -> int:
+    """Must apply the most advanced update of each transaction in bulk.
+
+    Payments are updated with one executemany statement; orders and
+    transactions with one statement per status. A row is only written
+    when the new status ranks above its current one, so final statuses
+    are never overwritten by late deliveries.
+    """
+    latest = {}
+    for item in updates:
+        current = latest.get(item.gateway_id)
+        if current is None or (
+            status_rank(item.status) >= status_rank(current.status)
+        ):
+            latest[item.gateway_id] = item
+    if not latest:
+        return 0
+    payment = Payment.__table__
+    db.execute(
+        update(payment)
+        .where(
+            payment.c.gateway_id == bindparam('update_gateway_id'),
+            _rank_of(payment.c.status) < bindparam('update_rank'),
+        )
+        .values(
+            status=bindparam('update_status'),
+            authorization=func.coalesce(
+                bindparam('update_authorization'),
+                payment.c.authorization,
+            ),
+            token=func.coalesce(bindparam('update_token'), payment.c.token),
+            processed=True,
+            processed_at=func.now(),
+        ),
+        [
+            {
+                'update_gateway_id': item.gateway_id,
+                'update_rank': status_rank(item.status),
+                'update_status': item.status,
+                'update_authorization': item.authorization_code,
+                'update_token': item.token,
+            }
+            for item in latest.values()
+        ],
+    )
+    by_status = defaultdict(list)
+    for item in latest.values():
+        by_status[item.status].append(item.gateway_id)
+    for status, gateway_ids in by_status.items():
+        payment_ids = select(Payment.payment_id).where(
+            Payment.gateway_id.in_(gateway_ids),
+        )
+        db.execute(
+            update(Order)
+            .where(
+                Order.payment_id.in_(payment_ids),
+                _rank_of(Order.order_status) < status_rank(status),
+            )
+            .values(order_status=status, last_updated=func.now()),
+        )
+        db.execute(
+            update(Transaction)
+            .where(
+                Transaction.payment_id.in_(payment_ids),
+                _rank_of(Transaction.status) < status_rank(status),
+            )
+            .values(status=status),
+        )
+    db.commit()
+    return len(latest)
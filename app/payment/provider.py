@@ -0,0 +1,215 @@
+import abc
+import asyncio
+import itertools
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, TypeVar
+
+from app.entities.cart import CreatePaymentMethod
+from app.infra import stripe
+from app.infra.metrics import metrics
+from config import settings
+
+Self = TypeVar('Self')
+
+
+class AbstractPaymentProvider(abc.ABC):
+    """Card payments used by the cart checkout."""
+
+    async def create_payment_method(
+        self: Self,
+        payment: CreatePaymentMethod,
+    ) -> dict:
+        """Must create a card payment method."""
+        return await self._create_payment_method(payment)
+
+    async def create_payment_intent(
+        self: Self,
+        amount: int,
+        currency: str,
+        customer_id: str,
+        payment_method: str,
+    ) -> dict:
+        """Must create and confirm a payment intent."""
+        return await self._create_payment_intent(
+            amount=amount,
+            currency=currency,
+            customer_id=customer_id,
+            payment_method=payment_method,
+        )
+
+    async def confirm_payment_intent(
+        self: Self,
+        payment_intent_id: str,
+        payment_method: str,
+        receipt_email: str,
+    ) -> dict:
+        """Must confirm a payment intent."""
+        return await self._confirm_payment_intent(
+            payment_intent_id=payment_intent_id,
+            payment_method=payment_method,
+            receipt_email=receipt_email,
+        )
+
+    @abc.abstractmethod
+    async def _create_payment_method(
+        self: Self,
+        payment: CreatePaymentMethod,
+    ) -> dict:
+        ...
+
+    @abc.abstractmethod
+    async def _create_payment_intent(
+        self: Self,
+        amount: int,
+        currency: str,
+        customer_id: str,
+        payment_method: str,
+    ) -> dict:
+        ...
+
+    @abc.abstractmethod
+    async def _confirm_payment_intent(
+        self: Self,
+        payment_intent_id: str,
+        payment_method: str,
+        receipt_email: str,
+    ) -> dict:
+        ...
+
+
+class StripePaymentProvider(AbstractPaymentProvider):
+    """Stripe SDK calls run on a bounded thread pool.
+
+    The SDK is blocking, so each call runs on one of ``STRIPE_WORKERS``
+    threads and its latency is recorded in the ``stripe.<operation>``
+    histogram.
+    """
+
+    def __init__(self: Self, workers: int | None = None) -> None:
+        self.workers = workers or int(settings.get('STRIPE_WORKERS', 8))
+        self._executor: ThreadPoolExecutor | None = None
+
+    @property
+    def executor(self: Self) -> ThreadPoolExecutor:
+        """Return the worker pool, created on first use."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix='stripe',
+            )
+        return self._executor
+
+    def shutdown(self: Self) -> None:
+        """Stop the worker pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(
+        self: Self,
+        operation: str,
+        func: Callable[..., Any],
+        **kwargs: object,
+    ) -> Any:  # noqa: ANN401
+        with metrics.timer(f'stripe.{operation}'):
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor,
+                partial(func, **kwargs),
+            )
+
+    async def _create_payment_method(
+        self: Self,
+        payment: CreatePaymentMethod,
+    ) -> dict:
+        return await self._run(
+            'create_payment_method',
+            stripe.create_payment_method,
+            payment=payment,
+        )
+
+    async def _create_payment_intent(
+        self: Self,
+        amount: int,
+        currency: str,
+        customer_id: str,
+        payment_method: str,
+    ) -> dict:
+        return await self._run(
+            'create_payment_intent',
+            stripe.create_payment_intent,
+            amount=amount,
+            currency=currency,
+            customer_id=customer_id,
+            payment_method=payment_method,
+        )
+
+    async def _confirm_payment_intent(
+        self: Self,
+        payment_intent_id: str,
+        payment_method: str,
+        receipt_email: str,
+    ) -> dict:
+        return await self._run(
+            'confirm_payment_intent',
+            stripe.confirm_payment_intent,
+            payment_intent_id=payment_intent_id,
+            payment_method=payment_method,
+            receipt_email=receipt_email,
+        )
+
+
+class MemoryPaymentProvider(AbstractPaymentProvider):
+    """Fake provider answering after ``delay`` seconds, for load tests."""
+
+    def __init__(self: Self, delay: float = 0) -> None:
+        self.delay = delay
+        self.ids = itertools.count(1)
+        self.payment_intents = {}
+
+    async def _create_payment_method(
+        self: Self,
+        payment: CreatePaymentMethod,
+    ) -> dict:
+        await asyncio.sleep(self.delay)
+        return {
+            'id': f'pm_{next(self.ids)}',
+            'type': 'card',
+            'card': {'last4': payment.number[-4:]},
+        }
+
+    async def _create_payment_intent(
+        self: Self,
+        amount: int,
+        currency: str,
+        customer_id: str,
+        payment_method: str,
+    ) -> dict:
+        await asyncio.sleep(self.delay)
+        payment_intent = {
+            'id': f'pi_{next(self.ids)}',
+            'amount': amount,
+            'currency': currency,
+            'customer': customer_id,
+            'payment_method': payment_method,
+            'status': 'succeeded',
+        }
+        self.payment_intents[payment_intent['id']] = payment_intent
+        return payment_intent
+
+    async def _confirm_payment_intent(
+        self: Self,
+        payment_intent_id: str,
+        payment_method: str,
+        receipt_email: str,
+    ) -> dict:
+        await asyncio.sleep(self.delay)
+        payment_intent = self.payment_intents[payment_intent_id]
+        payment_intent['payment_method'] = payment_method
+        payment_intent['receipt_email'] = receipt_email
+        payment_intent['status'] = 'succeeded'
+        return payment_intent
+
+
+stripe_provider = StripePaymentProvider()
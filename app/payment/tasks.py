@@ -0,0 +1,34 @@
+from loguru import logger
+
+from app.infra.database import get_session
+from app.infra.redis import sync_client
+from app.payment.postback import (
+    apply_payment_updates,
+    drain_postbacks,
+    requeue_postbacks,
+)
+from app.worker import celery
+
+
+@celery.task(
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    max_retries=5,
+)
+def apply_postbacks() -> int:
+    """Apply queued postbacks until the queue is empty.
+
+    Postbacks arriving while a batch is written are picked up by the next
+    loop, so a burst is applied by a few workers in large batches.
+    """
+    redis = sync_client()
+    applied = 0
+    while updates := drain_postbacks(redis):
+        try:
+            with get_session()() as db:
+                applied += apply_payment_updates(db, updates)
+        except Exception:
+            requeue_postbacks(redis, updates)
+            raise
+    logger.info(f'Applied {applied} postbacks')
+    return applied
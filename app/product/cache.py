@@ -0,0 +1,212 @@
+import json
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any, TypeVar
+
+from fastapi.encoders import jsonable_encoder
+from loguru import logger
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.infra.local_cache import LocalCache
+from app.infra.models.order import Product
+from app.infra.redis import RedisCache
+from config import settings
+
+
+Self = TypeVar('Self')
+
+LISTINGS_KEY = 'product:listings'
+SHOWCASE_KEY = 'product:showcase'
+ALL_PRODUCTS_KEY = 'product:all'
+
+
+def product_id_key(product_id: int) -> str:
+    """Return the cache key of a product by id."""
+    return f'product:id:{product_id}'
+
+
+def product_uri_key(uri: str) -> str:
+    """Return the cache key of a product by uri."""
+    return f'product:uri:{uri}'
+
+
+def gallery_id_key(product_id: int) -> str:
+    """Return the cache key of a product gallery by product id."""
+    return f'product:gallery:id:{product_id}'
+
+
+def gallery_uri_key(uri: str) -> str:
+    """Return the cache key of a product gallery by product uri."""
+    return f'product:gallery:uri:{uri}'
+
+
+def category_key(path: str) -> str:
+    """Return the cache key of the products listed in a category."""
+    return f'product:category:{path}'
+
+
+def product_to_dict(product: Product) -> dict:
+    """Return the columns of a product row as a JSON-compatible dict.
+
+    Both cache tiers then hold the same values the API would render.
+    """
+    return jsonable_encoder(
+        {
+            column.key: getattr(product, column.key)
+            for column in Product.__table__.columns
+        },
+    )
+
+
+class ProductCache:
+    """Read-through product cache with a local and a shared tier.
+
+    The local tier is a per-process LRU with a short TTL; the shared tier
+    is Redis, so a product loaded by one worker is reused by the others.
+    Writes call ``invalidate`` which drops the product keys and every
+    listing (category, showcase, all products) from both tiers; other
+    processes drop their local copy when its short TTL expires.
+    """
+
+    def __init__(
+        self: Self,
+        local: LocalCache | None = None,
+        shared: aioredis.Redis | None = None,
+        ttl: int = 300,
+    ) -> None:
+        self.local = local or LocalCache()
+        self.shared = shared
+        self.ttl = ttl
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    async def get(self: Self, key: str) -> Any | None:  # noqa: ANN401
+        """Return a cached value from the first tier that has it."""
+        return (await self.get_many([key])).get(key)
+
+    async def get_many(self: Self, keys: Iterable[str]) -> dict[str, Any]:
+        """Return the cached values found for ``keys``.
+
+        Keys missing locally are fetched from Redis with a single MGET.
+        """
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.local.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        self.local_hits += len(found)
+        if missing and self.shared is not None:
+            try:
+                payloads = await self.shared.mget(missing)
+            except RedisError as error:
+                self.errors += 1
+                logger.warning(f'Product cache unavailable: {error}')
+                payloads = [None] * len(missing)
+            for key, payload in zip(missing, payloads, strict=True):
+                if payload is None:
+                    continue
+                value = json.loads(payload)
+                self.local.set(key, value)
+                found[key] = value
+                self.shared_hits += 1
+        self.misses += len(set(missing) - found.keys())
+        return found
+
+    async def set(
+        self: Self,
+        key: str,
+        value: Any,  # noqa: ANN401
+        *,
+        listing: bool = False,
+    ) -> None:
+        """Store a value in both tiers.
+
+        Listing keys are remembered so they can be dropped on any write.
+        """
+        self.local.set(key, value)
+        if self.shared is None:
+            return
+        try:
+            async with self.shared.pipeline(transaction=False) as pipe:
+                pipe.set(key, json.dumps(value), ex=self.ttl)
+                if listing:
+                    pipe.sadd(LISTINGS_KEY, key)
+                await pipe.execute()
+        except RedisError as error:
+            self.errors += 1
+            logger.warning(f'Product cache unavailable: {error}')
+
+    async def get_or_load(
+        self: Self,
+        key: str,
+        loader: Callable[[], Awaitable[Any] | Any],
+        *,
+        listing: bool = False,
+    ) -> Any:  # noqa: ANN401
+        """Return the cached value or load, store and return it."""
+        value = await self.get(key)
+        if value is not None:
+            return value
+        value = loader()
+        if isinstance(value, Awaitable):
+            value = await value
+        if value is not None:
+            await self.set(key, value, listing=listing)
+        return value
+
+    async def invalidate(
+        self: Self,
+        product_id: int | None = None,
+        uri: str | None = None,
+    ) -> None:
+        """Drop a product and every listing from both tiers."""
+        self.invalidations += 1
+        self.local.clear()
+        if self.shared is None:
+            return
+        keys = [LISTINGS_KEY, SHOWCASE_KEY, ALL_PRODUCTS_KEY]
+        if product_id is not None:
+            keys.append(product_id_key(product_id))
+        if uri is not None:
+            keys.append(product_uri_key(uri))
+        try:
+            listings = await self.shared.smembers(LISTINGS_KEY)
+            await self.shared.delete(*keys, *listings)
+        except RedisError as error:
+            self.errors += 1
+            logger.warning(f'Product cache invalidation failed: {error}')
+
+    def stats(self: Self) -> dict:
+        """Return hit/miss counters."""
+        lookups = self.local_hits + self.shared_hits + self.misses
+        hits = self.local_hits + self.shared_hits
+        return {
+            'local_hits': self.local_hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+            'invalidations': self.invalidations,
+            'errors': self.errors,
+            'local_size': len(self.local),
+        }
+
+
+def create_product_cache() -> ProductCache:
+    """Create the product cache configured from settings."""
+    return ProductCache(
+        local=LocalCache(
+            maxsize=int(settings.get('PRODUCT_CACHE_SIZE', 1024)),
+            ttl=float(settings.get('PRODUCT_CACHE_LOCAL_TTL', 30)),
+        ),
+        shared=RedisCache().redis,
+        ttl=int(settings.get('PRODUCT_CACHE_TTL', 300)),
+    )
+
+
+product_cache = create_product_cache()
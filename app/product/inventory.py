@@ -0,0 +1,68 @@
+from collections.abc import Mapping
+
+from sqlalchemy import case, or_, update
+from sqlalchemy.orm import Session
+
+from app.infra.models.order import Product
+
+
+class OutOfStockError(Exception):
+    """Raise when some products do not have the requested quantity."""
+
+    def __init__(self: 'OutOfStockError', product_ids: list[int]) -> None:
+        self.product_ids = product_ids
+        super().__init__(f'Products out of stock: {product_ids}')
+
+
+def reserve_stock(db: Session, quantities: Mapping[int, int]) -> list[int]:
+    """Decrement stock in one statement and return the failed product ids.
+
+    A single ``UPDATE ... WHERE quantity >= CASE ... RETURNING`` touches
+    only the products with enough stock, so concurrent checkouts never
+    oversell. Products left out are returned; the caller decides whether
+    to roll back the partial reservation or to go on without them.
+
+    A NULL quantity means the stock is not tracked: those products are
+    always reserved and stay NULL, as ``NULL - n`` is NULL.
+    """
+    quantities = {
+        product_id: qty for product_id, qty in quantities.items() if qty > 0
+    }
+    if not quantities:
+        return []
+    product = Product.__table__
+    requested = case(quantities, value=product.c.product_id)
+    reserved = db.scalars(
+        update(product)
+        .where(
+            product.c.product_id.in_(quantities),
+            or_(
+                product.c.quantity.is_(None),
+                product.c.quantity >= requested,
+            ),
+        )
+        .values(quantity=product.c.quantity - requested)
+        .returning(product.c.product_id),
+    ).all()
+    return sorted(set(quantities) - set(reserved))
+
+
+def release_stock(db: Session, quantities: Mapping[int, int]) -> None:
+    """Give back stock reserved by ``reserve_stock``, skipping untracked."""
+    quantities = {
+        product_id: qty for product_id, qty in quantities.items() if qty > 0
+    }
+    if not quantities:
+        return
+    product = Product.__table__
+    db.execute(
+        update(product)
+        .where(
+            product.c.product_id.in_(quantities),
+            product.c.quantity.is_not(None),
+        )
+        .values(
+            quantity=product.c.quantity
+            + case(quantities, value=product.c.product_id),
+        ),
+    )
@@ -2,20 +2,25 @@
 import enum
 from datetime import datetime, timedelta
 from functools import wraps
+from uuid import uuid4
 
 from dynaconf import settings
 from fastapi import HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from loguru import logger
-from passlib.context import CryptContext
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from constants import DocumentType, Roles
-from app.cart.uow import get_session
 from app.infra.models.role import Role
 from app.infra.models.users import User, UserResetPassword
+from app.user.password import password_hasher
+from app.user.resolver import (
+    CurrentUser,
+    invalidate_user,
+    resolve_user,
+)
 from schemas.user_schema import (
     SignUp,
     UserInDB,
@@ -23,7 +28,7 @@ from schemas.user_schema import (
     UserSchema,
 )
 
-pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+pwd_context = password_hasher.context
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='access_token')
 
 
@@ -117,6 +122,7 @@ def create_access_token(
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({'exp': expire})
+    to_encode.setdefault('jti', uuid4().hex)
     return jwt.encode(
         to_encode,
         settings.SECRET_KEY,
@@ -124,32 +130,11 @@ def create_access_token(
     )
 
 
-def get_current_user(
+async def get_current_user(
     token: str,
-) -> User:
-    """Must return user db."""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail='Could not validate credentials',
-        headers={'WWW-Authenticate': 'Bearer'},
-    )
-    try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM],
-        )
-        document: str = payload.get('sub')
-        if document is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    db = get_session()()
-
-    user = _get_user(db, document=document)
-    if user is None:
-        raise credentials_exception
-    return user
+) -> CurrentUser:
+    """Must return the token user, cached by token ``jti``."""
+    return await resolve_user(token)
 
 
 def _get_user(db: Session, document: str) -> User:
@@ -221,7 +206,6 @@ def save_token_reset_password(db: Session, document: str) -> UserResetPassword:
 
 def reset_password(db: Session, data: UserResponseResetPassword) -> None:
     """Must reset password."""
-    pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
     with db:
         user_query = select(User).where(User.document == data.document)
         _user = db.execute(user_query).scalars().first()
@@ -234,3 +218,4 @@ def reset_password(db: Session, data: UserResponseResetPassword) -> None:
         _used_token.used_token = True
         _user.password = pwd_context.hash(data.password)
         db.commit()
+    invalidate_user(data.document)
@@ -0,0 +1,143 @@
+import asyncio
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from fastapi import HTTPException, status
+from loguru import logger
+from passlib.context import CryptContext
+
+from config import settings
+
+Self = TypeVar('Self')
+
+
+class PasswordHasher:
+    """Bcrypt hashing on a bounded thread pool.
+
+    bcrypt releases the GIL, so ``workers`` threads hash in parallel while
+    the event loop keeps serving requests. At most ``max_pending`` calls
+    may wait for a worker; past that new calls fail fast with 503 instead
+    of piling up behind a login burst. Hashes made with a cost other than
+    ``rounds`` are reported as needing a rehash.
+    """
+
+    def __init__(
+        self: Self,
+        workers: int = 4,
+        max_pending: int = 64,
+        rounds: int = 12,
+    ) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self.context = CryptContext(
+            schemes=['bcrypt'],
+            deprecated='auto',
+            bcrypt__default_rounds=rounds,
+            bcrypt__min_rounds=rounds,
+            bcrypt__max_rounds=rounds,
+        )
+        self._executor: ThreadPoolExecutor | None = None
+        self.running = 0
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self: Self) -> ThreadPoolExecutor:
+        """Return the worker pool, created on first use."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix='password',
+            )
+        return self._executor
+
+    def shutdown(self: Self) -> None:
+        """Stop the worker pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self: Self) -> dict:
+        """Return pool size, queue depth and counters."""
+        return {
+            'workers': self.workers,
+            'running': self.running,
+            'pending': self.pending,
+            'peak_pending': self.peak_pending,
+            'max_pending': self.max_pending,
+            'completed': self.completed,
+            'rejected': self.rejected,
+        }
+
+    async def _run(
+        self: Self,
+        func: Callable[..., Any],
+        *args: object,
+    ) -> Any:  # noqa: ANN401
+        with self._lock:
+            in_flight = self.running + self.pending
+            saturated = in_flight >= self.workers + self.max_pending
+            if saturated:
+                self.rejected += 1
+            else:
+                self.pending += 1
+                self.peak_pending = max(self.peak_pending, self.pending)
+        if saturated:
+            logger.warning(f'Password pool saturated: {self.stats()}')
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail='Too many login attempts, try again later',
+            )
+
+        def work():  # noqa: ANN202
+            with self._lock:
+                self.pending -= 1
+                self.running += 1
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+
+        future = self.executor.submit(work)
+        future.add_done_callback(self._forget_cancelled)
+        return await asyncio.wrap_future(future)
+
+    def _forget_cancelled(self: Self, future: Future) -> None:
+        """Free the queue slot of a call cancelled before it ran."""
+        if future.cancelled():
+            with self._lock:
+                self.pending -= 1
+
+    async def hash(self: Self, password: str) -> str:
+        """Must return the bcrypt hash of ``password``."""
+        return await self._run(self.context.hash, password)
+
+    async def verify(self: Self, password: str, hashed: str) -> bool:
+        """Must check ``password`` against ``hashed``."""
+        return await self._run(self.context.verify, password, hashed)
+
+    async def verify_and_update(
+        self: Self,
+        password: str,
+        hashed: str,
+    ) -> tuple[bool, str | None]:
+        """Must check ``password`` and return a new hash if outdated."""
+        return await self._run(
+            self.context.verify_and_update,
+            password,
+            hashed,
+        )
+
+
+password_hasher = PasswordHasher(
+    workers=int(settings.get('PASSWORD_HASH_WORKERS', 4)),
+    max_pending=int(settings.get('PASSWORD_HASH_MAX_PENDING', 64)),
+    rounds=int(settings.get('BCRYPT_ROUNDS', 12)),
+)
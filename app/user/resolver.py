@@ -0,0 +1,141 @@
+import time
+from typing import TypeVar
+
+from fastapi import HTTPException, status
+from jose import JWTError, jwt
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import select
+
+from app.infra import database
+from app.infra.local_cache import LocalCache
+from app.infra.models.users import User
+from config import settings
+
+
+Self = TypeVar('Self')
+
+
+class CurrentUser(BaseModel):
+    """Snapshot of the authenticated user shared between requests."""
+
+    user_id: int
+    name: str
+    email: str
+    document: str
+    phone: str | None = None
+    role_id: int
+    active: bool | None = None
+    customer_id: str | None = None
+    card_id: str | None = None
+    payment_method: str | None = None
+    model_config = ConfigDict(from_attributes=True)
+
+
+def credentials_exception() -> HTTPException:
+    """Return the error raised for any invalid token."""
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail='Could not validate credentials',
+        headers={'WWW-Authenticate': 'Bearer'},
+    )
+
+
+def decode_token(token: str) -> dict:
+    """Must return the token claims or raise 401."""
+    try:
+        payload = jwt.decode(
+            token,
+            settings.SECRET_KEY,
+            algorithms=[settings.ALGORITHM],
+        )
+    except JWTError as error:
+        raise credentials_exception() from error
+    if payload.get('sub') is None:
+        raise credentials_exception()
+    return payload
+
+
+class UserCache:
+    """Decoded token to user cache with a short TTL.
+
+    Entries are keyed by the token ``jti`` (or subject and expiry for
+    tokens issued without one) and never outlive the token. ``invalidate``
+    drops every entry of a document after a password reset or a user
+    update; other workers pick the change up when their TTL expires.
+    """
+
+    def __init__(self: Self, maxsize: int = 4096, ttl: float = 30) -> None:
+        self.users = LocalCache(maxsize=maxsize, ttl=ttl)
+        self.revoked = LocalCache(maxsize=maxsize, ttl=ttl)
+        self.ttl = ttl
+
+    @staticmethod
+    def key(payload: dict) -> str:
+        """Return the cache key of a token."""
+        return payload.get('jti') or f'{payload["sub"]}:{payload.get("exp")}'
+
+    def get(self: Self, payload: dict) -> CurrentUser | None:
+        """Return the cached user unless it was invalidated since."""
+        entry = self.users.get(self.key(payload))
+        if entry is None:
+            return None
+        cached_at, user = entry
+        revoked_at = self.revoked.get(user.document)
+        if revoked_at is not None and revoked_at >= cached_at:
+            return None
+        return user
+
+    def set(self: Self, payload: dict, user: CurrentUser) -> None:
+        """Store the user until the TTL or the token expiry."""
+        ttl = self.ttl
+        if expires_at := payload.get('exp'):
+            ttl = min(ttl, expires_at - time.time())
+        if ttl > 0:
+            self.users.set(self.key(payload), (time.monotonic(), user), ttl)
+
+    def invalidate(self: Self, document: str) -> None:
+        """Drop every cached token of ``document``."""
+        self.revoked.set(document, time.monotonic())
+
+
+user_cache = UserCache(
+    maxsize=int(settings.get('USER_CACHE_SIZE', 4096)),
+    ttl=float(settings.get('USER_CACHE_TTL', 30)),
+)
+
+
+async def resolve_user(token: str) -> CurrentUser:
+    """Must return the token user, querying with the shared async engine."""
+    payload = decode_token(token)
+    if user := user_cache.get(payload):
+        return user
+    async with database.get_async_session()() as session:
+        user_db = await session.scalar(
+            select(User).where(User.document == payload['sub']),
+        )
+    if user_db is None:
+        raise credentials_exception()
+    user = CurrentUser.model_validate(user_db)
+    user_cache.set(payload, user)
+    return user
+
+
+def resolve_user_sync(token: str) -> CurrentUser:
+    """Must return the token user for synchronous callers."""
+    payload = decode_token(token)
+    if user := user_cache.get(payload):
+        return user
+    with database.get_session()() as session:
+        user_db = session.scalar(
+            select(User).where(User.document == payload['sub']),
+        )
+        if user_db is None:
+            raise credentials_exception()
+        user = CurrentUser.model_validate(user_db)
+    user_cache.set(payload, user)
+    return user
+
+
+def invalidate_user(document: str) -> None:
+    """Must drop the cached user of ``document``."""
+    user_cache.invalidate(document)
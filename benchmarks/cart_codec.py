@@ -0,0 +1,55 @@
+"""Compare JSON and msgpack cart payloads.
+
+Usage: ``python -m benchmarks.cart_codec [items ...]``
+"""
+import sys
+import timeit
+from decimal import Decimal
+from uuid import uuid4
+
+from app.cart import codec
+from app.entities.cart import CartUser
+from app.entities.product import ProductCart
+from app.entities.user import UserData
+
+
+def build_cart(items: int) -> CartUser:
+    """Build a logged user cart with ``items`` lines."""
+    return CartUser(
+        uuid=uuid4(),
+        cart_items=[
+            ProductCart(
+                product_id=product_id,
+                quantity=product_id % 7 + 1,
+                price=Decimal(product_id * 137 % 50000).scaleb(-2),
+                discount_price=Decimal('1.25'),
+            )
+            for product_id in range(1, items + 1)
+        ],
+        subtotal=Decimal('1234.56'),
+        user_data=UserData(
+            name='Maria da Silva',
+            email='maria@example.com',
+            document='12345678900',
+            phone='11999999999',
+        ),
+    )
+
+
+def run(items: int, number: int = 2000) -> None:
+    """Print payload size and per-call dump/load time for each codec."""
+    cart = build_cart(items)
+    for name in (codec.JSON_CODEC, codec.MSGPACK_CODEC):
+        payload = codec.dumps(cart, codec=name)
+        dump = timeit.timeit(lambda: codec.dumps(cart, codec=name), number=number)
+        load = timeit.timeit(lambda: codec.loads(payload, CartUser), number=number)
+        print(
+            f'{items:>4} items {name:<8} {len(payload):>7} bytes '
+            f'dump {dump / number * 1e6:8.1f} us '
+            f'load {load / number * 1e6:8.1f} us',
+        )
+
+
+if __name__ == '__main__':
+    for size in [int(arg) for arg in sys.argv[1:]] or [1, 10, 100, 500]:
+        run(size)
@@ -0,0 +1,62 @@
+"""Compare Decimal and integer-cents cart totals.
+
+Usage: ``python -m benchmarks.cart_totals [items ...]``
+"""
+import sys
+import timeit
+from decimal import Decimal
+
+from app.entities.cart import calculate_totals
+from app.entities.money import Money
+from app.entities.product import ProductCart
+
+DISCOUNT = Decimal('0.15')
+
+
+def build_lines(items: int) -> list[ProductCart]:
+    """Build ``items`` priced cart lines."""
+    return [
+        ProductCart(
+            product_id=product_id,
+            quantity=product_id % 7 + 1,
+            price=Money(product_id * 137 % 50000),
+        )
+        for product_id in range(1, items + 1)
+    ]
+
+
+def decimal_totals(
+    lines: list[tuple[Decimal, int]],
+    discount: Decimal,
+) -> tuple[Decimal, Decimal]:
+    """Totals computed with Decimal prices, as the cart used to."""
+    subtotal = Decimal(0)
+    discount_total = Decimal(0)
+    for price, quantity in lines:
+        subtotal += price * quantity
+        discount_total += price * discount * quantity
+    return subtotal, discount_total
+
+
+def run(items: int, number: int = 2000) -> None:
+    """Print the per-call time of both calculations."""
+    lines = build_lines(items)
+    decimals = [(line.price.to_decimal(), line.quantity) for line in lines]
+    cents = timeit.timeit(
+        lambda: calculate_totals(lines, DISCOUNT),
+        number=number,
+    )
+    legacy = timeit.timeit(
+        lambda: decimal_totals(decimals, DISCOUNT),
+        number=number,
+    )
+    print(
+        f'{items:>4} items '
+        f'decimal {legacy / number * 1e6:8.1f} us '
+        f'cents {cents / number * 1e6:8.1f} us',
+    )
+
+
+if __name__ == '__main__':
+    for size in [int(arg) for arg in sys.argv[1:]] or [1, 10, 100, 500]:
+        run(size)
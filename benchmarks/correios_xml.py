@@ -0,0 +1,49 @@
+"""Compare the iterparse and BeautifulSoup Correios response parsers.
+
+Usage: ``python -m benchmarks.correios_xml [number]``
+
+Parses the recorded responses in ``zipcode/tests/samples``.
+"""
+import sys
+import timeit
+from pathlib import Path
+
+from zipcode.adapter import Adapter
+
+SAMPLES = Path(__file__).parent.parent / 'zipcode' / 'tests' / 'samples'
+
+
+def run(number: int = 5000) -> None:
+    """Print the per-call time of each parser and of the request body."""
+    consulta_cep = (SAMPLES / 'consulta_cep.xml').read_bytes()
+    calc_preco_prazo = (SAMPLES / 'calc_preco_prazo.xml').read_bytes()
+    cases = {
+        'consultacep iterparse': lambda: Adapter.xmltojson_consultacep(
+            consulta_cep,
+        ),
+        'consultacep soup': lambda: Adapter.soup_consultacep(consulta_cep),
+        'shipping iterparse': lambda: Adapter.xmltojson_shipping(
+            calc_preco_prazo,
+            'PAC',
+        ),
+        'shipping soup': lambda: Adapter.soup_shipping(
+            calc_preco_prazo,
+            'PAC',
+        ),
+        'body_shipping': lambda: Adapter.body_shipping(
+            '4510',
+            '47590000',
+            '07171140',
+            '1',
+            '15',
+            '2',
+            '10',
+        ),
+    }
+    for name, case in cases.items():
+        elapsed = timeit.timeit(case, number=number)
+        print(f'{name:<22} {elapsed / number * 1e6:8.1f} us')
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
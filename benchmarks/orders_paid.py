@@ -0,0 +1,178 @@
+"""Measure the paid orders report on a seeded SQLite database.
+
+Usage: ``python -m benchmarks.orders_paid [orders]``
+
+Every order has a payment, two product lines and, for one in ten, an
+affiliate. The report is read page by page and the number of SQL
+statements per page is printed next to the latency.
+"""
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.infra.models.base import Base
+from app.infra.models.order import Category, Order, Product
+from app.infra.models.transaction import Payment, Transaction
+from app.infra.models.users import Address, User
+from domains import domain_order
+
+USERS = 1000
+PRODUCTS = 50
+START = datetime(2023, 1, 1)
+
+
+def seed(session: sessionmaker, orders: int) -> None:
+    """Insert ``orders`` paid orders and their related rows."""
+    with session() as db:
+        db.execute(insert(Category), [{'name': 'c', 'path': 'c'}])
+        db.execute(
+            insert(Product),
+            [
+                {
+                    'name': f'product {product_id}',
+                    'uri': f'product-{product_id}',
+                    'price': 1000,
+                    'description': '',
+                    'installments_config': 1,
+                    'category_id': 1,
+                    'sku': str(product_id),
+                }
+                for product_id in range(1, PRODUCTS + 1)
+            ],
+        )
+        db.execute(
+            insert(User),
+            [
+                {
+                    'name': f'user {user_id}',
+                    'document': f'{user_id:011d}',
+                    'username': f'user{user_id}',
+                    'email': f'user{user_id}@example.com',
+                    'password': '',
+                }
+                for user_id in range(1, USERS + 1)
+            ],
+        )
+        db.execute(
+            insert(Address),
+            [
+                {
+                    'user_id': user_id,
+                    'country': 'BR',
+                    'city': 'Sao Paulo',
+                    'state': 'SP',
+                    'neighborhood': 'Centro',
+                    'street': 'Rua A',
+                    'street_number': '10',
+                    'address_complement': '',
+                    'zipcode': '01001000',
+                    'active': True,
+                }
+                for user_id in range(1, USERS + 1)
+            ],
+        )
+        db.execute(
+            insert(Payment),
+            [
+                {
+                    'user_id': order_id % USERS + 1,
+                    'amount': 2000,
+                    'token': '',
+                    'gateway_id': order_id,
+                    'status': 'paid',
+                    'authorization': '',
+                    'payment_method': 'credit-card',
+                    'payment_gateway': 'PAGARME',
+                    'installments': 1,
+                }
+                for order_id in range(1, orders + 1)
+            ],
+        )
+        db.execute(
+            insert(Order),
+            [
+                {
+                    'customer_id': order_id % USERS + 1,
+                    'order_date': START + timedelta(minutes=order_id),
+                    'payment_id': order_id,
+                    'order_status': 'paid',
+                    'last_updated': START,
+                }
+                for order_id in range(1, orders + 1)
+            ],
+        )
+        db.execute(
+            insert(Transaction),
+            [
+                {
+                    'user_id': order_id % USERS + 1,
+                    'amount': 1000,
+                    'order_id': order_id,
+                    'qty': 1,
+                    'payment_id': order_id,
+                    'status': 'paid',
+                    'product_id': (order_id + line) % PRODUCTS + 1,
+                    'affiliate': 1 if order_id % 10 == 0 else None,
+                }
+                for order_id in range(1, orders + 1)
+                for line in range(2)
+            ],
+        )
+        db.commit()
+
+
+def run(orders: int) -> None:
+    """Seed the database and print query count and latency per page."""
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)
+    seed(session, orders)
+
+    statements = []
+    event.listen(
+        engine,
+        'before_cursor_execute',
+        lambda *args: statements.append(args[2]),
+    )
+    dates = json.dumps({'date_start': START.date().isoformat()})
+    for label, kwargs in (
+        ('first page', {'status': 'paid'}),
+        ('one day', {'status': 'paid', 'dates': dates, 'limit': 1000}),
+    ):
+        statements.clear()
+        started = time.perf_counter()
+        report = domain_order.get_orders_paid(session(), **kwargs)
+        elapsed = time.perf_counter() - started
+        print(
+            f'{label:<12} {len(report["orders"]):>5} orders '
+            f'{len(statements):>2} queries {elapsed * 1e3:8.1f} ms',
+        )
+
+    statements.clear()
+    cursor, pages, total = None, 0, 0
+    started = time.perf_counter()
+    while True:
+        report = domain_order.get_orders_paid(
+            session(),
+            status='paid',
+            cursor=cursor,
+            limit=1000,
+        )
+        pages += 1
+        total += len(report['orders'])
+        cursor = report['next_cursor']
+        if cursor is None:
+            break
+    elapsed = time.perf_counter() - started
+    print(
+        f'full report  {total:>5} orders {len(statements):>2} queries '
+        f'{elapsed * 1e3:8.1f} ms in {pages} pages',
+    )
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
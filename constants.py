@@ -29,3 +29,8 @@ class OrderStatus(enum.Enum):
     SHIPPING_ORDER = 'SHIPPING_ORDER'
     GENERATE_INVOICE = 'GENERATE_INVOICE'
     SHIPPING_COMPLETE = 'SHIPPING_COMPLETE'
+
+
+class ExportFormat(enum.Enum):
+    CSV = 'csv'
+    NDJSON = 'ndjson'
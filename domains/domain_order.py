@@ -1,157 +1,271 @@
+import csv
+import io
 import json
 from collections import defaultdict
+from collections.abc import Iterator
+from datetime import date, datetime, time, timedelta
 
-from sqlalchemy import select
+from dynaconf import settings
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, func, or_, select, text, update
 from loguru import logger
-from sqlalchemy import Date, cast
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, aliased
 
+from constants import ExportFormat
+from app.infra.database import get_session
 from app.infra.optimize_image import optimize_image
+from app.payment.installments import installment_engine
 from app.infra.models.order import Category, ImageGallery, Order, Product
+from app.product.cache import (
+    ALL_PRODUCTS_KEY,
+    SHOWCASE_KEY,
+    category_key,
+    gallery_id_key,
+    gallery_uri_key,
+    product_cache,
+    product_to_dict,
+    product_uri_key,
+)
 from app.infra.models.transaction import Payment, Transaction
 from app.infra.models.users import Address, User
 from schemas.order_schema import (
     CategoryInDB,
-    ImageGalleryResponse,
-    OrderCl,
     OrderFullResponse,
     OrderSchema,
     OrdersPaidFullResponse,
     ProductFullResponse,
+    ProductGalleryResponse,
     ProductInDB,
     ProductSchema,
     ProductsResponseOrder,
     TrackingFullResponse,
 )
 
+CATALOG_PRIVATE_FIELDS = ('quantity',)
+CATALOG_EXCLUDED_FIELDS = (
+    'description',
+    'installments_list',
+    *CATALOG_PRIVATE_FIELDS,
+)
 
-def get_product(db: Session, uri):
-    with db:
-        query_product = select(Product).where(Product.uri == uri)
-        return db.execute(query_product).scalars().first()
 
+async def get_product(db: Session, uri):
+    def load():
+        with db:
+            query_product = select(Product).where(Product.uri == uri)
+            product = db.execute(query_product).scalars().first()
+            return product_to_dict(product) if product else None
 
-def create_product(db: Session, product_data: ProductSchema):
+    return await product_cache.get_or_load(product_uri_key(uri), load)
+
+
+async def create_product(db: Session, product_data: ProductSchema):
     db_product = Product(**product_data.model_dump())
     with db:
         db.add(db_product)
         db.commit()
-        return ProductSchema.model_validate(db_product)
+        product = ProductSchema.model_validate(db_product)
+    await product_cache.invalidate(uri=product.uri)
+    return product
 
 
-def put_product(db: Session, id, product_data: ProductFullResponse):
+async def put_product(db: Session, id, product_data: ProductFullResponse):
+    columns = Product.__table__.columns.keys()
+    data = product_data.model_dump(exclude={'product_id'})
+    values = {key: value for key, value in data.items() if key in columns}
     with db:
-        product_query = select(Product).where(Product.id == id)
-        product = db.execute(product_query).scalars().first()
-        product = product.update(product_data)
-        logger.debug(product)
+        uri = db.execute(
+            select(Product.uri).where(Product.product_id == id),
+        ).scalar()
+        db.execute(
+            update(Product).where(Product.product_id == id).values(**values),
+        )
         db.commit()
+    await product_cache.invalidate(product_id=id, uri=uri)
     return {**product_data.dict()}
 
 
-def delete_product(db: Session, id):
+async def delete_product(db: Session, id):
     with db:
-        db.execute(select(Product).where(Product.id == id).delete()).delete()
+        uri = db.execute(
+            select(Product.uri).where(Product.product_id == id),
+        ).scalar()
+        db.execute(delete(Product).where(Product.product_id == id))
         db.commit()
+    await product_cache.invalidate(product_id=id, uri=uri)
     return {'Produto excluido'}
 
 
-def upload_image(db: Session, product_id, image):
-    image_path = optimize_image.optimize_image(image)
+async def upload_image(db: Session, product_id, image):
+    image_path = await optimize_image(image)
     with db:
-        db_product = db.query(Product).filter(Product.id == product_id).first()
+        db_product = db.get(Product, product_id)
         db_product.image_path = image_path
+        uri = db_product.uri
         db.commit()
+    await product_cache.invalidate(product_id=product_id, uri=uri)
     return image_path
 
 
-def upload_image_gallery(product_id, db: Session, imageGallery):
-    image_path = optimize_image.optimize_image(imageGallery)
+async def upload_image_gallery(product_id, db: Session, imageGallery):
+    image_path = await optimize_image(imageGallery)
     with db:
         db_image_gallery = ImageGallery(url=image_path, product_id=product_id)
         db.add(db_image_gallery)
         db.commit()
+        await refresh_galleries(db, [product_id])
     return image_path
 
 
-def delete_image_gallery(id: int, db: Session):
+async def delete_image_gallery(id: int, db: Session):
     with db:
-        db.execute(select(ImageGallery).where(ImageGallery.id == id)).delete()
+        product_id = db.execute(
+            delete(ImageGallery)
+            .where(ImageGallery.category_id == id)
+            .returning(ImageGallery.product_id),
+        ).scalar()
         db.commit()
+        if product_id is not None:
+            await refresh_galleries(db, [product_id])
     return 'Imagem excluida'
 
 
-def get_images_gallery(db: Session, uri):
-    with db:
-        product_id_query = select(Product).where(Product.uri == uri)
-        product_id = db.execute(product_id_query).scalars().first()
-        images_query = select.query(ImageGallery).where(
-            ImageGallery.product_id == product_id.id,
+def load_galleries(
+    db: Session,
+    product_ids: list[int] | None = None,
+    uris: list[str] | None = None,
+) -> list[dict]:
+    """Return the gallery projection of the products in one query."""
+    query = (
+        select(
+            Product.product_id,
+            Product.uri,
+            ImageGallery.category_id,
+            ImageGallery.url,
         )
-        images = db.execute(images_query).scalars().all()
-        images_list = []
-
-        for image in images:
-            images_list.append(ImageGalleryResponse.from_orm(image))
-
-        if images:
-            return {'images': images_list}
-        return {'images': []}
-
-
-def get_showcase(db: Session):
-    with db:
-        showcases_query = select(Product).where(Product.showcase is True)
-        showcases = db.execute(showcases_query).scalars().all()
-        products = []
-
-        for showcase in showcases:
-            products.append(ProductInDB.from_orm(showcase))
-
-        if showcases:
-            return {'products': products}
-        return {'products': []}
+        .outerjoin(ImageGallery, ImageGallery.product_id == Product.product_id)
+        .where(
+            or_(
+                Product.product_id.in_(product_ids or []),
+                Product.uri.in_(uris or []),
+            ),
+        )
+        .order_by(Product.product_id, ImageGallery.category_id)
+    )
+    galleries = {}
+    for product_id, uri, image_id, url in db.execute(query):
+        gallery = galleries.setdefault(
+            product_id,
+            {'product_id': product_id, 'uri': uri, 'images': []},
+        )
+        if image_id is not None:
+            gallery['images'].append(
+                {'image_gallery_id': image_id, 'url': url},
+            )
+    return [
+        ProductGalleryResponse.model_validate(gallery).model_dump(mode='json')
+        for gallery in galleries.values()
+    ]
+
+
+async def cache_galleries(galleries: list[dict]) -> None:
+    """Store each projection under its product id and uri."""
+    for gallery in galleries:
+        for key in (
+            gallery_id_key(gallery['product_id']),
+            gallery_uri_key(gallery['uri']),
+        ):
+            await product_cache.set(key, gallery, listing=True)
+
+
+async def refresh_galleries(db: Session, product_ids: list[int]) -> None:
+    """Reload the cached projection after a gallery change."""
+    await cache_galleries(load_galleries(db, product_ids=product_ids))
+
+
+async def get_galleries(
+    db: Session,
+    product_ids: list[int] | None = None,
+    uris: list[str] | None = None,
+) -> list[dict]:
+    """Return the galleries of many products, in request order.
+
+    Cached projections are read with one MGET and the rest is loaded with
+    a single query. Unknown products are left out.
+    """
+    keys = [gallery_id_key(product_id) for product_id in product_ids or []]
+    keys += [gallery_uri_key(uri) for uri in uris or []]
+    found = await product_cache.get_many(keys)
+    missing = set(keys) - found.keys()
+    if missing:
+        with db:
+            loaded = load_galleries(
+                db,
+                product_ids=[
+                    product_id
+                    for product_id in product_ids or []
+                    if gallery_id_key(product_id) in missing
+                ],
+                uris=[
+                    uri for uri in uris or [] if gallery_uri_key(uri) in missing
+                ],
+            )
+        await cache_galleries(loaded)
+        for gallery in loaded:
+            found[gallery_id_key(gallery['product_id'])] = gallery
+            found[gallery_uri_key(gallery['uri'])] = gallery
+    galleries = {}
+    for key in keys:
+        if key in found:
+            galleries.setdefault(found[key]['product_id'], found[key])
+    return list(galleries.values())
+
+
+async def get_images_gallery(db: Session, uri):
+    galleries = await get_galleries(db, uris=[uri])
+    return {'images': galleries[0]['images'] if galleries else []}
+
+
+async def get_showcase(db: Session):
+    def load():
+        with db:
+            showcases_query = select(Product).where(Product.showcase.is_(True))
+            showcases = db.execute(showcases_query).scalars().all()
+            return [
+                ProductInDB.model_validate(showcase).model_dump(mode='json')
+                for showcase in showcases
+            ]
+
+    products = await product_cache.get_or_load(
+        SHOWCASE_KEY,
+        load,
+        listing=True,
+    )
+    return {'products': products}
 
 
 def get_installments(db: Session, cart):
     with db:
-        _cart = cart.dict()
-        _product_id = _cart['cart'][0]['product_id']
-        _product_config_query = select(Product).where(
-            Product.id == int(_product_id),
-        )
-        _product = db.execute(_product_config_query).scalars().first()
-        _total_amount = 0
-        _total_amount_fee = 0
-        _installments = []
-
-        for item in _cart['cart']:
-            _total_amount += item['amount'] * item['qty']
-
-        logger.debug(f'Total da soma {_total_amount}')
-        for n in range(1, 13):
-            if n <= 3:
-                _installment = (_total_amount / n) / 100
-                _installments.append(
-                    {
-                        'name': f'{n} x R${round(_installment, 2)}',
-                        'value': f'{n}',
-                    },
-                )
-                logger.debug(f'Parcela sem juros {_installment}')
-            else:
-                _total_amount_fee = _total_amount * (1 + 0.0199) ** n
-                _installment = (_total_amount_fee / n) / 100
-                _installments.append(
-                    {
-                        'name': f'{n} x R${round(_installment, 2)}',
-                        'value': f'{n}',
-                    },
-                )
-                logger.debug(f'Parcela com juros {_installment}')
-
-        logger.debug(f'array de parcelas {_installments}')
-        return _installments
+        items = cart.dict()['cart']
+        config_id = db.execute(
+            select(Product.installments_config).where(
+                Product.product_id == int(items[0]['product_id']),
+            ),
+        ).scalar()
+        total = sum(int(item['amount']) * int(item['qty']) for item in items)
+        try:
+            table = installment_engine.table(db, config_id)
+        except LookupError as error:
+            logger.warning(f'{error}, using the default installments')
+            table = installment_engine.default
+    return [
+        {
+            'name': f"{option['installments']} x R${option['value'] / 100:.2f}",
+            'value': f"{option['installments']}",
+        }
+        for option in table.plan(total)
+    ]
 
 
 def get_product_by_id(db: Session, id):
@@ -161,144 +275,248 @@ def get_product_by_id(db: Session, id):
         return ProductInDB.from_orm(product)
 
 
-def get_orders_paid(db: Session, dates=None, status=None, user_id=None):
-    if dates:
-        logger.info(dates)
-        new_date = json.loads(dates)
-        date_end = {'date_end': new_date.get('date_start')}
-        if 'date_end' not in new_date.keys():
-            new_date.update(date_end)
-    if status == 'null':
-        status = None
+def orders_paid_query(dates=None, status=None, user_id=None):
+    """Return the filtered orders report query, one row per order.
 
+    ``dates`` is a JSON object with ``date_start`` and an optional
+    ``date_end``; both days are included. ``user_id`` is the customer
+    document.
+    """
     orders_query = (
         select(
-            Transaction.order_id,
-            Transaction.payment_id,
+            Order.order_id,
+            Order.payment_id,
             Order.tracking_number,
             Order.order_date,
-            User.id.label('user_id'),
+            Order.order_status.label('status'),
+            Order.checked,
+            User.user_id,
             User.name.label('user_name'),
             User.email,
             User.phone,
             User.document,
-            Transaction.affiliate,
             Payment.amount,
             Payment.gateway_id.label('id_pagarme'),
-            Order.order_status.label('status'),
-            Order.checked,
         )
-        .join(Order, Transaction.order_id == Order.id)
-        .join(Product, Transaction.product_id == Product.id)
-        .join(User, Transaction.user_id == User.id)
-        .join(Payment, Payment.id == Transaction.payment_id)
+        .join(Payment, Payment.payment_id == Order.payment_id)
+        .join(User, User.user_id == Order.customer_id)
     )
+    if status and status != 'null':
+        orders_query = orders_query.where(Order.order_status == status)
     if dates:
-        orders_query = (
-            orders.where(
-                Order.order_status == status,
-                cast(Order.order_date, Date).between(
-                    new_date.get('date_start'),
-                    new_date.get('date_end'),
-                ),
-            )
-            .distinct()
-            .all()
+        logger.info(dates)
+        new_date = json.loads(dates)
+        date_start = date.fromisoformat(new_date['date_start'])
+        date_end = date.fromisoformat(
+            new_date.get('date_end') or new_date['date_start'],
+        )
+        orders_query = orders_query.where(
+            Order.order_date >= datetime.combine(date_start, time.min),
+            Order.order_date
+            < datetime.combine(date_end + timedelta(days=1), time.min),
         )
     if user_id:
-        user_query = select(User).where(User.document == str(user_id))
-        user = db.execute(user_query).scalars().first()
+        orders_query = orders_query.where(User.document == str(user_id))
+    return orders_query
 
-        orders_query = (
-            orders.where(Order.customer_id == user.id).distinct().all()
+
+def orders_paid_page_size(limit: int | None) -> int:
+    """Return the requested page size capped by ``ORDERS_MAX_PAGE_SIZE``."""
+    default = int(settings.get('ORDERS_PAGE_SIZE', 100))
+    maximum = int(settings.get('ORDERS_MAX_PAGE_SIZE', 1000))
+    return min(limit or default, maximum)
+
+
+def get_orders_details(db: Session, orders) -> tuple[dict, dict, dict]:
+    """Return addresses, affiliates and product lines of ``orders``.
+
+    Each is loaded with a single ``IN`` query regardless of the number of
+    orders: addresses by user id, affiliate names and products by
+    payment id.
+    """
+    user_ids = {order.user_id for order in orders}
+    payment_ids = {order.payment_id for order in orders}
+
+    addresses = {}
+    address_query = (
+        select(Address)
+        .where(Address.user_id.in_(user_ids))
+        .order_by(Address.active, Address.address_id)
+    )
+    for address in db.execute(address_query).scalars():
+        addresses[address.user_id] = address
+
+    affiliates_query = (
+        select(Transaction.payment_id, User.name)
+        .join(User, User.user_id == Transaction.affiliate)
+        .where(Transaction.payment_id.in_(payment_ids))
+        .distinct()
+    )
+    affiliates = dict(db.execute(affiliates_query).all())
+
+    products = defaultdict(list)
+    products_query = (
+        select(
+            Product.name.label('product_name'),
+            Product.image_path,
+            Transaction.amount.label('price'),
+            Transaction.qty,
+            Transaction.payment_id,
         )
+        .join(Product, Transaction.product_id == Product.product_id)
+        .where(Transaction.payment_id.in_(payment_ids))
+        .order_by(Transaction.transaction_id)
+    )
+    for product in db.execute(products_query):
+        products[product.payment_id].append(
+            ProductsResponseOrder.model_validate(product),
+        )
+    return addresses, affiliates, products
+
+
+def get_orders_paid(
+    db: Session,
+    dates=None,
+    status=None,
+    user_id=None,
+    cursor: int | None = None,
+    limit: int | None = None,
+):
+    limit = orders_paid_page_size(limit)
+    orders_query = (
+        orders_paid_query(dates, status, user_id)
+        .order_by(Order.order_id)
+        .limit(limit + 1)
+    )
+    if cursor is not None:
+        orders_query = orders_query.where(Order.order_id > cursor)
+    with db:
+        orders = db.execute(orders_query).all()
+        next_cursor = None
+        if len(orders) > limit:
+            orders = orders[:limit]
+            next_cursor = orders[-1].order_id
+        if not orders:
+            return {'orders': [], 'next_cursor': None}
+        addresses, affiliates, products = get_orders_details(db, orders)
+
     order_list = []
-    product_list = []
-    orders = db.execute(orders_query).scalars().all()
     for order in orders:
-        address_query = select(
-            Address.user_id,
-            Address.type_address,
-            Address.category,
-            Address.country,
-            Address.city,
-            Address.state,
-            Address.neighborhood,
-            Address.street,
-            Address.street_number,
-            Address.address_complement,
-            Address.zipcode,
-        ).where(
-            Address.category == 'shipping',
-            Address.user_id == order.user_id,
+        address = addresses.get(order.user_id)
+        order_list.append(
+            OrdersPaidFullResponse(
+                payment_id=order.payment_id,
+                id_pagarme=order.id_pagarme,
+                status=order.status,
+                order_id=order.order_id,
+                tracking_number=order.tracking_number,
+                order_date=order.order_date.date().strftime('%d-%m-%y'),
+                user_name=order.user_name,
+                email=order.email,
+                phone=order.phone,
+                document=order.document,
+                country=address.country if address else None,
+                city=address.city if address else None,
+                state=address.state if address else None,
+                neighborhood=address.neighborhood if address else None,
+                street=address.street if address else None,
+                street_number=address.street_number if address else None,
+                address_complement=(
+                    address.address_complement if address else None
+                ),
+                zipcode=address.zipcode if address else None,
+                user_affiliate=affiliates.get(order.payment_id),
+                amount=order.amount,
+                checked=order.checked,
+                products=products[order.payment_id],
+            ),
         )
-        address = db.execute(address_query).scalars().first()
+    return {'orders': order_list, 'next_cursor': next_cursor}
+
+
+ORDERS_EXPORT_COLUMNS = (
+    'order_id',
+    'order_date',
+    'status',
+    'payment_id',
+    'id_pagarme',
+    'amount',
+    'user_name',
+    'email',
+    'document',
+    'tracking_number',
+    'checked',
+    'product_name',
+    'qty',
+    'price',
+    'user_affiliate',
+)
 
-        affiliate = None
-        if order.affiliate is not None:
-            affiliates_query = select(User.name).where(
-                order.affiliate == User.uuid,
-                Transaction.payment_id == order.payment_id,
-            )
-            affiliates = db.execute(affiliates_query).scalars().all()
-            for affil in affiliates:
-                affiliate = affil
-
-        products_query = (
-            select(
-                Product.name.label('product_name'),
-                Product.image_path,
-                Transaction.amount.label('price'),
-                Transaction.qty,
-                Transaction.payment_id,
-                Transaction.order_id,
-            )
-            .join(Product, Transaction.product_id == Product.id)
-            .where(Transaction.payment_id == order.payment_id)
-        )
-        products = db.execute(products_query).scalars().all()
-        for product in products:
-            product_all = ProductsResponseOrder.from_orm(product)
-            product_list.append(product_all)
-
-        product_grouped = defaultdict(list)
-
-        for item in product_list:
-            if item.payment_id == order.payment_id:
-                product_grouped[item.payment_id].append(item)
-        prods = []
-        prods = product_grouped.pop(item.payment_id)
-        orders_all = OrderCl(
-            payment_id=order.payment_id,
-            id_pagarme=order.id_pagarme,
-            status=order.status,
-            order_id=order.order_id,
-            tracking_number=order.tracking_number,
-            order_date=order.order_date.date().strftime('%d-%m-%y'),
-            user_name=order.user_name,
-            email=order.email,
-            phone=order.phone,
-            document=order.document,
-            type_address=address.type_address,
-            category=address.category,
-            country=address.country,
-            city=address.city,
-            state=address.state,
-            neighborhood=address.neighborhood,
-            street=address.street,
-            street_number=address.street_number,
-            address_complement=address.address_complement,
-            zipcode=address.zipcode,
-            user_affiliate=affiliate,
-            amount=order.amount,
-            checked=order.checked,
-            products=prods,
+
+def orders_export_query(dates=None, status=None, user_id=None):
+    """Return the orders report flattened to one row per product line."""
+    affiliate = aliased(User)
+    return (
+        orders_paid_query(dates, status, user_id)
+        .add_columns(
+            Product.name.label('product_name'),
+            Transaction.qty,
+            Transaction.amount.label('price'),
+            affiliate.name.label('user_affiliate'),
         )
+        .join(Transaction, Transaction.payment_id == Order.payment_id)
+        .join(Product, Product.product_id == Transaction.product_id)
+        .outerjoin(affiliate, affiliate.user_id == Transaction.affiliate)
+        .order_by(Order.order_id, Transaction.transaction_id)
+    )
+
 
-        order_list.append(OrdersPaidFullResponse.from_orm(orders_all))
-    if orders:
-        return {'orders': order_list}
-    return {'orders': []}
+def _csv_chunk(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def _ndjson_chunk(rows) -> str:
+    return ''.join(
+        json.dumps(dict(zip(ORDERS_EXPORT_COLUMNS, row)), default=str) + '\n'
+        for row in rows
+    )
+
+
+def export_orders_paid(
+    export_format: ExportFormat,
+    dates=None,
+    status=None,
+    user_id=None,
+    session_factory=None,
+) -> Iterator[str]:
+    """Yield the orders report as CSV or NDJSON text chunks.
+
+    Rows are read through a server-side cursor ``ORDERS_EXPORT_CHUNK``
+    at a time and written out before the next chunk is fetched, so memory
+    does not grow with the date range. The session is owned by the
+    generator because it outlives the request handler.
+    """
+    chunk_size = int(settings.get('ORDERS_EXPORT_CHUNK', 1000))
+    if session_factory is None:
+        session_factory = get_session()
+    write = _ndjson_chunk
+    if export_format == ExportFormat.CSV:
+        write = _csv_chunk
+        yield _csv_chunk([ORDERS_EXPORT_COLUMNS])
+    with session_factory() as db:
+        result = db.execute(
+            orders_export_query(dates, status, user_id).execution_options(
+                stream_results=True,
+                yield_per=chunk_size,
+            ),
+        )
+        for rows in result.partitions():
+            yield write(
+                [row._mapping[column] for column in ORDERS_EXPORT_COLUMNS]
+                for row in rows
+            )
 
 
 def get_order(db: Session, id):
@@ -410,40 +628,219 @@ def get_category(db: Session):
     return {'category': category_list}
 
 
-def get_products_category(db: Session, path):
-    products = None
-    products_category = []
-    with db:
-        category_query = select(Category).where(Category.path == path)
-        category = db.execute(category_query).scalars().first()
-
-        logger.info(category.path, category.category_id)
-        products_query = (
-            select(Product)
-            .where(
-                Product.category_id == category.category_id,
-            )
+def catalog_page_size(limit: int | None) -> int:
+    """Return the requested page size capped by ``CATALOG_MAX_PAGE_SIZE``."""
+    default = int(settings.get('CATALOG_PAGE_SIZE', 24))
+    maximum = int(settings.get('CATALOG_MAX_PAGE_SIZE', 100))
+    return min(limit or default, maximum)
+
+
+def listing_columns(fields: str | None = None) -> list:
+    """Return the product columns shipped in a listing page.
+
+    ``fields`` is a comma separated list of column names; by default every
+    column but the heavy ``description`` and ``installments_list``. The
+    stock ``quantity`` is never shipped to the public catalog.
+    """
+    columns = Product.__table__.columns
+    if not fields:
+        return [
+            column
+            for column in columns
+            if column.key not in CATALOG_EXCLUDED_FIELDS
+        ]
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    public = set(columns.keys()) - set(CATALOG_PRIVATE_FIELDS)
+    unknown = sorted(set(names) - public)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f'Unknown product fields: {", ".join(unknown)}',
         )
-        products = db.execute(products_query).scalars().all()
+    return [
+        column
+        for column in columns
+        if column.key == 'product_id' or column.key in names
+    ]
+
+
+def estimate_products_total(db: Session, *criteria) -> int:
+    """Return the number of products matching ``criteria``.
+
+    The whole catalog is estimated from the planner statistics on
+    Postgres instead of scanning the table; filtered totals are exact.
+    """
+    if not criteria and db.get_bind().dialect.name == 'postgresql':
+        estimate = db.execute(
+            text(
+                "SELECT reltuples::bigint FROM pg_class "
+                "WHERE relname = 'product'",
+            ),
+        ).scalar()
+        if estimate is not None and estimate >= 0:
+            return estimate
+    count_query = select(func.count(Product.product_id)).where(*criteria)
+    return db.execute(count_query).scalar()
+
+
+def get_products_page(
+    db: Session,
+    *criteria,
+    cursor: int | None = None,
+    limit: int,
+    columns: list,
+) -> dict:
+    """Return one page of products ordered by id after ``cursor``.
+
+    One row past the page is fetched to know whether another page exists.
+    """
+    products_query = (
+        select(*columns)
+        .where(*criteria)
+        .order_by(Product.product_id)
+        .limit(limit + 1)
+    )
+    if cursor is not None:
+        products_query = products_query.where(Product.product_id > cursor)
+    rows = db.execute(products_query).mappings().all()
+    products = jsonable_encoder([dict(row) for row in rows[:limit]])
+    attach_installments(db, products)
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = products[-1]['product_id']
+    return {
+        'products': products,
+        'next_cursor': next_cursor,
+        'limit': limit,
+        'total': estimate_products_total(db, *criteria),
+    }
+
+
+def attach_installments(db: Session, products: list[dict]) -> None:
+    """Add the installment plan of each product priced in the page."""
+    if not products or not {'price', 'installments_config'} <= products[0].keys():
+        return
+    plans = installment_engine.plans(
+        db,
+        (
+            (product['installments_config'], int(product['price']))
+            for product in products
+        ),
+    )
+    for product, plan in zip(products, plans, strict=True):
+        product['installments'] = plan
+
+
+def _page_key(prefix: str, cursor, limit: int, columns: list) -> str:
+    fields = ','.join(column.key for column in columns)
+    return f'{prefix}:page:{cursor}:{limit}:{fields}'
+
+
+async def get_products_category(
+    db: Session,
+    path,
+    cursor: int | None = None,
+    limit: int | None = None,
+    fields: str | None = None,
+    *,
+    legacy: bool = False,
+):
+    if legacy:
+        return await _get_products_category_legacy(db, path)
+    limit = catalog_page_size(limit)
+    columns = listing_columns(fields)
+
+    def load():
+        with db:
+            category_query = select(Category.category_id).where(
+                Category.path == path,
+            )
+            category_id = db.execute(category_query).scalar()
+            if category_id is None:
+                return None
+            return get_products_page(
+                db,
+                Product.category_id == category_id,
+                cursor=cursor,
+                limit=limit,
+                columns=columns,
+            )
 
-        for product in products:
-            products_category.append(product)
+    page = await product_cache.get_or_load(
+        _page_key(category_key(path), cursor, limit, columns),
+        load,
+        listing=True,
+    )
+    if page is None:
+        raise HTTPException(status_code=404, detail='Category not found')
+    return page
+
+
+async def _get_products_category_legacy(db: Session, path):
+    def load():
+        with db:
+            category_query = select(Category).where(Category.path == path)
+            category = db.execute(category_query).scalars().first()
+
+            logger.info(category.path, category.category_id)
+            products_query = (
+                select(Product)
+                .where(
+                    Product.category_id == category.category_id,
+                )
+            )
+            products = db.execute(products_query).scalars().all()
+            return [product_to_dict(product) for product in products]
 
-    if products:
-        return {'product': products_category}
-    return {'product': []}
+    products = await product_cache.get_or_load(
+        category_key(path),
+        load,
+        listing=True,
+    )
+    return {'product': products}
+
+
+async def get_product_all(
+    db: Session,
+    cursor: int | None = None,
+    limit: int | None = None,
+    fields: str | None = None,
+    *,
+    legacy: bool = False,
+):
+    if legacy:
+        return await _get_product_all_legacy(db)
+    limit = catalog_page_size(limit)
+    columns = listing_columns(fields)
+
+    def load():
+        with db:
+            return get_products_page(
+                db,
+                cursor=cursor,
+                limit=limit,
+                columns=columns,
+            )
 
+    return await product_cache.get_or_load(
+        _page_key(ALL_PRODUCTS_KEY, cursor, limit, columns),
+        load,
+        listing=True,
+    )
 
-def get_product_all(db: Session):
-    products = None
-    with db:
-        products = select(Product)
-        products = db.execute(products).scalars().all()
-    products_list = []
 
-    for product in products:
-        products_list.append(ProductInDB.model_validate(product))
+async def _get_product_all_legacy(db: Session):
+    def load():
+        with db:
+            products = db.execute(select(Product)).scalars().all()
+            return [
+                ProductInDB.model_validate(product).model_dump(mode='json')
+                for product in products
+            ]
 
-    if products:
-        return {'products': products_list}
-    return {'products': []}
+    products = await product_cache.get_or_load(
+        ALL_PRODUCTS_KEY,
+        load,
+        listing=True,
+    )
+    return {'products': products}
@@ -1,10 +1,12 @@
+from collections import Counter
+from collections.abc import Callable
 from datetime import datetime, timedelta
 from decimal import Decimal
 
-import httpx
 from dynaconf import settings
 from fastapi import HTTPException
 from loguru import logger
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 
 from domains.domain_user import (
@@ -15,6 +17,10 @@ from domains.domain_user import (
 )
 from app.infra.models.order import Order, OrderItems, Product
 from app.infra.models.transaction import CreditCardFeeConfig, Payment, Transaction
+from app.payment.installments import installment_engine
+from app.payment.pagarme import create_transaction_sync
+from app.payment.postback import PaymentUpdate, apply_payment_updates
+from app.product.inventory import release_stock, reserve_stock
 from schemas.order_schema import (
     CheckoutSchema,
     ProductSchema,
@@ -37,14 +43,8 @@ def create_installment_config(db: Session, config_data):
 
 def credit_card_payment(db: Session, payment: CreditCardPayment):
     try:
-        headers = {'Content-Type': 'application/json'}
         logger.debug(f'{payment.json()}')
-        r = httpx.post(
-            settings.PAYMENT_GATEWAY_URL,
-            data=payment.json(),
-            headers=headers,
-        )
-        r = r.json()
+        r = create_transaction_sync(payment.model_dump(mode='json'))
         logger.error(f"response error {r.get('errors')}")
         return {
             'user': 'usuario',
@@ -61,13 +61,7 @@ def credit_card_payment(db: Session, payment: CreditCardPayment):
 
 def slip_payment(db: Session, payment: SlipPayment):
     try:
-        headers = {'Content-Type': 'application/json'}
-        r = httpx.post(
-            settings.PAYMENT_GATEWAY_URL,
-            data=payment.json(),
-            headers=headers,
-        )
-        r = r.json()
+        r = create_transaction_sync(payment.model_dump(mode='json'))
         logger.info(f'RESPONSE ------------{r}')
         return {
             'user': 'usuario',
@@ -237,6 +231,70 @@ def process_order(db: Session, shopping_cart, user):
         raise e
 
 
+REFUSED_STATUSES = {'refused'}
+CANCELLED_STATUS = 'cancelled'
+
+
+def payment_refused(result: dict) -> bool:
+    """Return whether the gateway refused or rejected the transaction."""
+    return (
+        bool(result.get('errors'))
+        or result.get('status') in REFUSED_STATUSES
+    )
+
+
+def release_reservation(db: Session, quantities: Counter) -> None:
+    """Give back stock reserved for a payment that did not go through."""
+    db.rollback()
+    release_stock(db, quantities)
+    db.commit()
+
+
+def cancel_payment(db: Session, payment_id: int) -> None:
+    """Cancel a payment whose gateway call failed, with its transactions.
+
+    The rows are committed before the gateway is called, so they are left
+    ``cancelled`` instead of ``pending`` forever.
+    """
+    db.rollback()
+    db.execute(
+        update(Payment)
+        .where(Payment.payment_id == payment_id)
+        .values(status=CANCELLED_STATUS),
+    )
+    db.execute(
+        update(Transaction)
+        .where(Transaction.payment_id == payment_id)
+        .values(status=CANCELLED_STATUS),
+    )
+    db.commit()
+
+
+def charge_reserved_stock(
+    db: Session,
+    quantities: Counter,
+    charge: Callable[[], dict],
+) -> dict:
+    """Reserve ``quantities`` and run ``charge`` against the gateway.
+
+    The reservation is committed before the gateway is called and given
+    back when ``charge`` raises or the transaction is refused.
+    """
+    if reserve_stock(db, quantities):
+        db.rollback()
+        msg = 'Produto esgotado'
+        raise Exception(msg)
+    db.commit()
+    try:
+        result = charge()
+    except Exception:
+        release_reservation(db, quantities)
+        raise
+    if payment_refused(result):
+        release_reservation(db, quantities)
+    return result
+
+
 def process_payment(
     db: Session,
     checkout_data: CheckoutSchema,
@@ -261,21 +319,25 @@ def process_payment(
             'product_id'
         ]
         _product_config = (
-            db.query(Product).filter_by(id=int(_product_id)).first()
+            db.query(Product).filter_by(product_id=int(_product_id)).first()
         )
 
-        _config_installments = (
-            db.query(CreditCardFeeConfig)
-            .filter_by(id=_product_config.installments_config)
-            .first()
+        _table = installment_engine.table(
+            db,
+            _product_config.installments_config,
         )
-        if _installments > 12:
-            msg = 'O número máximo de parcelas é 12'
+        if _installments > _table.max_installments:
+            msg = f'O número máximo de parcelas é {_table.max_installments}'
             raise Exception(msg)
-        elif _installments >= _config_installments.min_installment_with_fee:
-            _total_amount = _total_amount * (
-                (1 + _config_installments.fee) ** _installments
+        _total_amount = (
+            Decimal(
+                _table.total(
+                    int((_total_amount * 100).to_integral_value()),
+                    _installments,
+                ),
             )
+            / 100
+        )
 
         _customer = {
             'external_id': str(user.id),
@@ -299,73 +361,56 @@ def process_payment(
         }
         logger.error(f'{_shipping}')
 
-        db_payment = Payment(
-            user_id=user_id,
-            amount=int(_total_amount) * 100,
-            status='pending',
-            payment_method=_payment_method,
-            payment_gateway='PagarMe',
-            installments=_installments if _installments else 1,
-        )
-        db.add(db_payment)
-        db.commit()
-
-        _items = []
+        _quantities = Counter()
         for cart in _shopping_cart[0].get('itens'):
-            logger.debug(cart)
-            db_transaction = Transaction(
-                user_id=user_id,
-                amount=cart.get('amount'),
-                order_id=order.id,
-                qty=cart.get('qty'),
-                payment_id=db_payment.id,
-                status='pending',
-                product_id=cart.get('product_id'),
-                affiliate=_affiliate,
-            )
-            _items.append(
-                {
-                    'id': str(cart.get('product_id')),
-                    'title': cart.get('product_name'),
-                    'unit_price': cart.get('amount'),
-                    'quantity': cart.get('qty'),
-                    'tangible': str(cart.get('tangible')),
-                },
-            )
-            db.add(db_transaction)
-        db.commit()
-
-        for item in _items:
-            _product_decrease = (
-                db.query(Product).filter_by(id=item.get('id')).first()
-            )
-            _qty_decrease = int(item.get('quantity'))
-            _product_decrease.quantity -= _qty_decrease
-            if _product_decrease.quantity < 0:
-                msg = 'Produto esgotado'
-                raise Exception(msg)
-            else:
-                db.add(_product_decrease)
-
-        if checkout_data.get('payment_method') == 'credit-card':
-            logger.info('------------CREDIT CARD--------------')
-            _payment = CreditCardPayment(
-                api_key=settings.GATEWAY_API,
-                amount=db_payment.amount,
-                card_number=checkout_data.get('credit_card_number'),
-                card_cvv=checkout_data.get('credit_card_cvv'),
-                card_expiration_date=checkout_data.get('credit_card_validate'),
-                card_holder_name=checkout_data.get('credit_card_name'),
-                installments=_installments,
-                customer=_customer,
-                billing=_billing,
-                shipping=_shipping,
-                items=_items,
-            )
-            logger.error('CREDIT CARD RESPONSE')
-            logger.debug(f'{_payment}')
-            return credit_card_payment(db=db, payment=_payment)
-        else:
+            _quantities[int(cart.get('product_id'))] += int(cart.get('qty'))
+
+        def _request(db_payment: Payment) -> dict:
+            _items = []
+            for cart in _shopping_cart[0].get('itens'):
+                logger.debug(cart)
+                db_transaction = Transaction(
+                    user_id=user_id,
+                    amount=cart.get('amount'),
+                    order_id=order.id,
+                    qty=cart.get('qty'),
+                    payment_id=db_payment.payment_id,
+                    status='pending',
+                    product_id=cart.get('product_id'),
+                    affiliate=_affiliate,
+                )
+                _items.append(
+                    {
+                        'id': str(cart.get('product_id')),
+                        'title': cart.get('product_name'),
+                        'unit_price': cart.get('amount'),
+                        'quantity': cart.get('qty'),
+                        'tangible': str(cart.get('tangible')),
+                    },
+                )
+                db.add(db_transaction)
+            db.commit()
+
+            if checkout_data.get('payment_method') == 'credit-card':
+                logger.info('------------CREDIT CARD--------------')
+                _payment = CreditCardPayment(
+                    api_key=settings.GATEWAY_API,
+                    amount=db_payment.amount,
+                    card_number=checkout_data.get('credit_card_number'),
+                    card_cvv=checkout_data.get('credit_card_cvv'),
+                    card_expiration_date=checkout_data.get(
+                        'credit_card_validate',
+                    ),
+                    card_holder_name=checkout_data.get('credit_card_name'),
+                    installments=_installments,
+                    customer=_customer,
+                    billing=_billing,
+                    shipping=_shipping,
+                    items=_items,
+                )
+                logger.error('CREDIT CARD RESPONSE')
+                logger.debug(f'{_payment}')
+                return credit_card_payment(db=db, payment=_payment)
             _slip_expire = datetime.now() + timedelta(days=3)
             _payment = SlipPayment(
                 amount=db_payment.amount,
@@ -381,6 +426,25 @@ def process_payment(
             )
             return slip_payment(db=db, payment=_payment)
 
+        def _charge() -> dict:
+            db_payment = Payment(
+                user_id=user_id,
+                amount=int(_total_amount) * 100,
+                status='pending',
+                payment_method=_payment_method,
+                payment_gateway='PagarMe',
+                installments=_installments if _installments else 1,
+            )
+            db.add(db_payment)
+            db.commit()
+            try:
+                return _request(db_payment)
+            except Exception:
+                cancel_payment(db, db_payment.payment_id)
+                raise
+
+        return charge_reserved_stock(db, _quantities, _charge)
+
     except Exception as e:
         raise e
 
@@ -392,15 +456,18 @@ def send_payment_mail(db: Session, user, payment):
         raise e
 
 
-def postback_payment(db: Session, payment_data, order):
-    try:
-        return update_payment_status(
-            db=db,
-            payment_data=payment_data,
-            order=order,
-        )
-    except Exception as e:
-        raise e
+def postback_payment(db: Session, payment_data, order=None):  # noqa: ARG001
+    return apply_payment_updates(
+        db,
+        [
+            PaymentUpdate(
+                gateway_id=payment_data.get('gateway_id'),
+                status=payment_data.get('status'),
+                authorization_code=payment_data.get('authorization_code'),
+                token=payment_data.get('token'),
+            ),
+        ],
+    )
 
 
 def update_gateway_id(db: Session, payment_data, order):
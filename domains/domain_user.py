@@ -1,6 +1,7 @@
 import enum
 from datetime import datetime, timedelta
 from functools import wraps
+from uuid import uuid4
 
 import httpx
 from dynaconf import settings
@@ -8,17 +9,18 @@ from fastapi import HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from loguru import logger
-from passlib.context import CryptContext
-from sqlalchemy import and_, select
+from sqlalchemy import and_, select, update
 from sqlalchemy.orm import Session
 
 from constants import DocumentType, Roles
-from app.cart.uow import get_session
 from app.infra.models.role import Role
 from app.infra.models.users import Address, User, UserResetPassword
 from app.infra.models.role import Role
 from app.infra.models.users import Address, User, UserResetPassword
+from app.user.password import password_hasher
+from app.user.resolver import invalidate_user, resolve_user_sync
 from schemas.order_schema import CheckoutSchema
+from zipcode.cep_index import cep_index
 from schemas.user_schema import (
     SignUp,
     UserInDB,
@@ -26,7 +28,7 @@ from schemas.user_schema import (
     UserSchema,
 )
 
-pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+pwd_context = password_hasher.context
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='access_token')
 
 
@@ -34,15 +36,15 @@ class COUNTRY_CODE(enum.Enum):
     brazil = 'brazil'
 
 
-def gen_hash(password):
-    return pwd_context.hash(password)
+async def gen_hash(password):
+    return await password_hasher.hash(password)
 
 
-def verify_password(password, check_password):
-    return pwd_context.verify(check_password, password)
+async def verify_password(password, check_password):
+    return await password_hasher.verify(check_password, password)
 
 
-def create_user(db: Session, obj_in: SignUp):
+def create_user(db: Session, obj_in: SignUp, password: str | None = None):
     try:
         logger.info(obj_in)
         logger.debug(Roles.USER.value)
@@ -51,6 +53,8 @@ def create_user(db: Session, obj_in: SignUp):
             raise Exception(msg)
 
 
+        if password is None:
+            password = pwd_context.hash(obj_in.password.get_secret_value())
         with db:
             db_user = User(
                 name=obj_in.name,
@@ -60,7 +64,7 @@ def create_user(db: Session, obj_in: SignUp):
                 birth_date=None,
                 email=obj_in.mail,
                 phone=obj_in.phone,
-                password=gen_hash(obj_in.password.get_secret_value()),
+                password=password,
                 role_id=Roles.USER.value,
                 update_email_on_next_login=False,
                 update_password_on_next_login=False,
@@ -74,6 +78,14 @@ def create_user(db: Session, obj_in: SignUp):
         raise e
 
 
+async def register_user(db: Session, obj_in: SignUp):
+    """Must create the user hashing the password on the worker pool."""
+    password = None
+    if obj_in.password:
+        password = await gen_hash(obj_in.password.get_secret_value())
+    return create_user(db, obj_in, password=password)
+
+
 def check_existent_user(db: Session, email, document, password):
     try:
         with db:
@@ -89,13 +101,27 @@ def check_existent_user(db: Session, email, document, password):
         raise e
 
 
-def get_user(db: Session, document: str, password: str):
+async def get_user(db: Session, document: str, password: str):
     try:
         db_user = _get_user(db=db, document=document)
         if not password:
             msg = 'User not password'
             raise Exception(msg)
-        if db_user and verify_password(db_user.password, password):
+        verified, new_hash = False, None
+        if db_user:
+            verified, new_hash = await password_hasher.verify_and_update(
+                password,
+                db_user.password,
+            )
+        if verified:
+            if new_hash:
+                with db:
+                    db.execute(
+                        update(User)
+                        .where(User.user_id == db_user.user_id)
+                        .values(password=new_hash),
+                    )
+                    db.commit()
             return db_user
         else:
             logger.error(
@@ -106,8 +132,8 @@ def get_user(db: Session, document: str, password: str):
         raise e
 
 
-def authenticate_user(db, document: str, password: str):
-    user = get_user(db, document, password)
+async def authenticate_user(db, document: str, password: str):
+    user = await get_user(db, document, password)
     user_dict = UserSchema.model_validate(user).model_dump()
 
     user = UserInDB(**user_dict)
@@ -124,6 +150,7 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({'exp': expire})
+    to_encode.setdefault('jti', uuid4().hex)
     return jwt.encode(
         to_encode,
         settings.SECRET_KEY,
@@ -134,28 +161,7 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
 def get_current_user(
     token: str,
 ):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail='Could not validate credentials',
-        headers={'WWW-Authenticate': 'Bearer'},
-    )
-    try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM],
-        )
-        document: str = payload.get('sub')
-        if document is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    db = get_session()()
-
-    user = _get_user(db, document=document)
-    if user is None:
-        raise credentials_exception
-    return user
+    return resolve_user_sync(token)
 
 
 def _get_user(db: Session, document: str):
@@ -321,6 +327,16 @@ def address_by_postal_code(zipcode_data):
                 details={'message': 'Cep inválido'},
             )
 
+        if address := cep_index.lookup(postal_code):
+            return {
+                'street': address['end'],
+                'city': address['cidade'],
+                'neighborhood': address['bairro'],
+                'state': address['uf'],
+                'country': COUNTRY_CODE.brazil.value,
+                'zip_code': postal_code,
+            }
+
         viacep_url = f'https://viacep.com.br/ws/{postal_code}/json/'
         status_code = httpx.get(viacep_url).status_code
 
@@ -375,8 +391,8 @@ def save_token_reset_password(db: Session, document: str):
     return db_reset
 
 
-def reset_password(db: Session, data: UserResponseResetPassword):
-    pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+async def reset_password(db: Session, data: UserResponseResetPassword):
+    password = await gen_hash(data.password)
     with db:
         user_query = select(User).where(User.document == data.document)
         _user = db.execute(user_query).scalars().first()
@@ -387,6 +403,7 @@ def reset_password(db: Session, data: UserResponseResetPassword):
         _used_token = db.execute(used_token_query).scalars().first()
 
         _used_token.used_token = True
-        _user.password = pwd_context.hash(data.password)
+        _user.password = password
         db.commit()
+    invalidate_user(data.document)
     return 'Senha alterada'
@@ -0,0 +1,207 @@
+"""Reconcile pending order statuses with the payment gateway.
+
+Pending orders are read by keyset pages of ``RECONCILE_PAGE_SIZE``, each
+page is looked up on PagarMe with at most ``RECONCILE_CONCURRENCY`` calls
+in flight, and changed statuses are written with one ``UPDATE`` per
+status and page, only where the status is still the one read. Orders
+without a payment row are refused; payments still waiting for their
+gateway id are counted as failed and retried by the next run. Stripe
+payments are confirmed by the checkout and left out.
+
+Usage: ``python -m job_service.reconcile``
+"""
+import asyncio
+import time
+from collections import defaultdict
+from collections.abc import Callable
+from typing import TypeVar
+
+from loguru import logger
+from pydantic import BaseModel
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.infra import database
+from app.infra.models.order import Order
+from app.infra.models.transaction import Payment
+from app.payment.pagarme import PagarMeClient, PaymentGatewayError, pagarme
+from config import settings
+
+Self = TypeVar('Self')
+
+FINAL_STATUSES = ('paid', 'refused')
+
+
+class ReconcileReport(BaseModel):
+    """Progress of a reconciliation run."""
+
+    pages: int = 0
+    processed: int = 0
+    updated: int = 0
+    failed: int = 0
+    elapsed: float = 0
+
+    @property
+    def throughput(self: Self) -> float:
+        """Return processed orders per second."""
+        return self.processed / self.elapsed if self.elapsed else 0
+
+
+def pending_orders(
+    db: Session,
+    after: int | None,
+    limit: int,
+) -> list[tuple[int, str, int | None, int | None]]:
+    """Return ``(order_id, status, payment_id, gateway_id)`` after ``after``.
+
+    ``payment_id`` is None when the order has no payment row.
+    """
+    query = (
+        select(
+            Order.order_id,
+            Order.order_status,
+            Payment.payment_id,
+            Payment.gateway_id,
+        )
+        .outerjoin(Payment, Payment.payment_id == Order.payment_id)
+        .where(
+            Order.order_status.not_in(FINAL_STATUSES),
+            or_(
+                Payment.payment_id.is_(None),
+                Payment.payment_gateway != 'STRIPE',
+            ),
+        )
+        .order_by(Order.order_id)
+        .limit(limit)
+    )
+    if after is not None:
+        query = query.where(Order.order_id > after)
+    return db.execute(query).all()
+
+
+def apply_statuses(db: Session, statuses: dict[int, tuple[str, str]]) -> int:
+    """Write ``order_id -> (read, new)`` statuses, returning rows written.
+
+    One UPDATE per status change, as a compare-and-set on the status read
+    with the page: an order a postback moved in the meantime is left alone
+    and picked up again by the next run.
+    """
+    by_change = defaultdict(list)
+    for order_id, change in statuses.items():
+        by_change[change].append(order_id)
+    updated = 0
+    for (read, status), order_ids in by_change.items():
+        updated += db.execute(
+            update(Order)
+            .where(
+                Order.order_id.in_(order_ids),
+                Order.order_status == read,
+            )
+            .values(order_status=status, last_updated=func.now()),
+        ).rowcount
+    db.commit()
+    return updated
+
+
+async def gateway_statuses(
+    client: PagarMeClient,
+    orders: list[tuple[int, str, int | None, int | None]],
+    concurrency: int,
+) -> tuple[dict[int, tuple[str, str]], int]:
+    """Return ``order_id -> (read, gateway)`` changes and the failed count.
+
+    Orders without a payment row are refused. A payment without a gateway
+    id may still be in flight, so it is skipped and counted as failed.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def lookup(gateway_id: int) -> str | None:
+        async with semaphore:
+            try:
+                transaction = await client.get_transaction(gateway_id)
+            except PaymentGatewayError as error:
+                logger.warning(f'Transaction {gateway_id} failed: {error}')
+                return None
+            return transaction.get('status')
+
+    statuses, lookups, failed = {}, [], 0
+    for order_id, status, payment_id, gateway_id in orders:
+        if payment_id is None:
+            if status != 'refused':
+                statuses[order_id] = (status, 'refused')
+        elif gateway_id:
+            lookups.append((order_id, status, gateway_id))
+        else:
+            failed += 1
+    results = await asyncio.gather(
+        *(lookup(gateway_id) for _, _, gateway_id in lookups),
+    )
+    for (order_id, status, _), new_status in zip(
+        lookups,
+        results,
+        strict=True,
+    ):
+        if new_status is None:
+            failed += 1
+        elif new_status != status:
+            statuses[order_id] = (status, new_status)
+    return statuses, failed
+
+
+async def reconcile(
+    session_factory: Callable[[], Session] | None = None,
+    client: PagarMeClient | None = None,
+    concurrency: int | None = None,
+    page_size: int | None = None,
+) -> ReconcileReport:
+    """Must bring every pending order in line with the gateway."""
+    session_factory = session_factory or database.get_session()
+    client = client or pagarme
+    concurrency = concurrency or int(
+        settings.get('RECONCILE_CONCURRENCY', 20),
+    )
+    page_size = page_size or int(settings.get('RECONCILE_PAGE_SIZE', 500))
+    report = ReconcileReport()
+    started = time.perf_counter()
+    after = None
+    with session_factory() as db:
+        while orders := pending_orders(db, after, page_size):
+            after = orders[-1][0]
+            statuses, failed = await gateway_statuses(
+                client,
+                orders,
+                concurrency,
+            )
+            report.updated += apply_statuses(db, statuses)
+            report.pages += 1
+            report.processed += len(orders)
+            report.failed += failed
+            report.elapsed = time.perf_counter() - started
+            logger.info(
+                f'page {report.pages}: {report.processed} orders, '
+                f'{report.updated} updated, {report.failed} failed, '
+                f'{report.throughput:.1f} orders/s',
+            )
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+async def run() -> ReconcileReport:
+    """Reconcile with the shared client and close it afterwards."""
+    try:
+        return await reconcile()
+    finally:
+        await pagarme.close()
+
+
+def main() -> None:
+    """Run the reconciliation and log its report."""
+    report = asyncio.run(run())
+    logger.info(
+        f'Reconciled {report.processed} orders in {report.elapsed:.1f}s: '
+        f'{report.updated} updated, {report.failed} failed',
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -1,38 +1,164 @@
+"""Deliver order status steps to the mail API through an outbox.
+
+Unsent steps are claimed in batches of ``OUTBOX_BATCH_SIZE`` with
+``SELECT ... FOR UPDATE SKIP LOCKED``, posted to ``API_MAIL_URL`` with at
+most ``OUTBOX_CONCURRENCY`` requests in flight and marked as sent in the
+same transaction. Claimed rows stay locked until the commit, so several
+workers can run side by side without sending a step twice; a worker that
+dies before committing leaves its batch to the others. Every request
+carries an ``Idempotency-Key`` so the receiver can drop those redeliveries.
+
+Usage: ``python -m job_service.service`` (start as many as needed)
+"""
+import asyncio
+from collections.abc import Callable
+
 import httpx
 from dynaconf import settings
 from loguru import logger
-from sqlalchemy import (
-    create_engine,
-)
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from pydantic import BaseModel
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
 
+from app.infra import database
 from app.infra.models.order import OrderStatusSteps
 
 
+class DispatchReport(BaseModel):
+    """Progress of a dispatcher run."""
+
+    batches: int = 0
+    delivered: int = 0
+    failed: int = 0
+
+
 def get_session():
-    engine = create_engine(settings.DATABASE_URL, echo=True)
-    declarative_base()
-    Session = sessionmaker(bind=engine)
+    Session = database.get_session()
     return Session()
 
 
-def post_order_status(url):
-    return httpx.post(url=url)
+def claim_steps(
+    db: Session,
+    after: int | None,
+    limit: int,
+) -> list[OrderStatusSteps]:
+    """Lock up to ``limit`` unsent steps no other worker holds."""
+    query = (
+        select(OrderStatusSteps)
+        .where(
+            OrderStatusSteps.active.is_(True),
+            OrderStatusSteps.sending.is_(False),
+        )
+        .order_by(OrderStatusSteps.order_status_steps_id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    if after is not None:
+        query = query.where(OrderStatusSteps.order_status_steps_id > after)
+    return db.scalars(query).all()
+
+
+def mark_sent(db: Session, step_ids: list[int]) -> None:
+    """Flag the delivered steps and release the batch."""
+    if step_ids:
+        db.execute(
+            update(OrderStatusSteps)
+            .where(OrderStatusSteps.order_status_steps_id.in_(step_ids))
+            .values(sending=True, last_updated=func.now()),
+        )
+    db.commit()
+
+
+async def post_order_status(
+    client: httpx.AsyncClient,
+    url: str,
+    step: OrderStatusSteps,
+) -> bool:
+    """Must post one step, returning whether the mail API accepted it."""
+    try:
+        response = await client.post(
+            url,
+            json={'order_id': step.order_id, 'status': step.status},
+            headers={
+                'Idempotency-Key': (
+                    f'order-status-{step.order_status_steps_id}'
+                ),
+            },
+        )
+        response.raise_for_status()
+    except httpx.HTTPError as error:
+        logger.warning(
+            f'Step {step.order_status_steps_id} not delivered: {error!r}',
+        )
+        return False
+    return True
+
+
+async def deliver(
+    client: httpx.AsyncClient,
+    url: str,
+    steps: list[OrderStatusSteps],
+    concurrency: int,
+) -> list[int]:
+    """Return the ids of the steps delivered."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(step: OrderStatusSteps) -> bool:
+        async with semaphore:
+            return await post_order_status(client, url, step)
+
+    results = await asyncio.gather(*(send(step) for step in steps))
+    return [
+        step.order_status_steps_id
+        for step, sent in zip(steps, results, strict=True)
+        if sent
+    ]
+
+
+async def dispatch(
+    session_factory: Callable[[], Session] | None = None,
+    client: httpx.AsyncClient | None = None,
+    batch_size: int | None = None,
+    concurrency: int | None = None,
+) -> DispatchReport:
+    """Must deliver every unsent step once per run.
+
+    Steps that fail stay unsent and are retried by the next run.
+    """
+    session_factory = session_factory or get_session
+    batch_size = batch_size or int(settings.get('OUTBOX_BATCH_SIZE', 100))
+    concurrency = concurrency or int(settings.get('OUTBOX_CONCURRENCY', 10))
+    url = settings.API_MAIL_URL
+    report = DispatchReport()
+    http = client or httpx.AsyncClient(
+        timeout=float(settings.get('OUTBOX_TIMEOUT', 10)),
+    )
+    after = None
+    try:
+        with session_factory() as db:
+            while steps := claim_steps(db, after, batch_size):
+                after = steps[-1].order_status_steps_id
+                try:
+                    sent = await deliver(http, url, steps, concurrency)
+                except BaseException:
+                    db.rollback()
+                    raise
+                mark_sent(db, sent)
+                report.batches += 1
+                report.delivered += len(sent)
+                report.failed += len(steps) - len(sent)
+    finally:
+        if client is None:
+            await http.aclose()
+    return report
 
 
 def process():
-    session = get_session()
-    result = session.query(OrderStatusSteps).filter_by(
-        active=True,
-        sending=False,
+    report = asyncio.run(dispatch())
+    logger.info(
+        f'{report.delivered} order steps delivered, {report.failed} failed',
     )
-    result_list = [
-        {'Order_id': row.id, 'Status': row.status} for row in result
-    ]
-    logger.debug(f'SETTINGS ------ {settings.API_MAIL_URL}')
-    post_order_status(settings.API_MAIL_URL)
-    return result_list
+    return report
 
 
 def main():
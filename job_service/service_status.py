@@ -1,38 +1,14 @@
-from datetime import datetime
+import asyncio
 
 from loguru import logger
 
-from gateway.payment_gateway import return_transaction
-from job_service.service import get_session
-from models.order import Order
-
-db = get_session()
-payment_id = []
-status_pagarme = []
-orders = (
-    db.query(Order).filter(~Order.order_status.in_(['paid', 'refused'])).all()
-)
+from job_service.reconcile import run
 
 
 def order_status():
-    cont = 0
-    for status in orders:
-        gateway_id = return_transaction(status.payment_id)
-        db_order = (
-            db.query(Order)
-            .filter(Order.payment_id == status.payment_id)
-            .first()
-        )
-        if status.payment_id == 0:
-            status.order_status = 'refused'
-        else:
-            logger.debug(f'------- ID STATUS {status.payment_id}-----------')
-            logger.debug(f'---- ID {gateway_id} ----')
-            db_order.last_updated = datetime.now()
-            db_order.order_status = gateway_id.get('status')
-        db.commit()
-        cont += 1
-    logger.debug(f'Foram processados {cont} pedidos')
+    report = asyncio.run(run())
+    logger.debug(f'Foram processados {report.processed} pedidos')
+    return report
 
 
 def main():
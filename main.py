@@ -1,5 +1,8 @@
+import asyncio
 import logging
 import sys
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 
 import sentry_sdk
 from dynaconf import settings
@@ -9,6 +12,13 @@ from fastapi.staticfiles import StaticFiles
 from loguru import logger
 from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
 
+from app.freight.correios import CorreiosClient
+from app.infra.database import registry
+from app.infra.optimize_image import image_pipeline
+from app.infra.redis import RedisCache
+from app.payment.pagarme import close_sync_client, pagarme
+from app.payment.provider import stripe_provider
+from app.user.password import password_hasher
 from app.infra.endpoints.direct_sales import direct_sales
 from app.infra.endpoints.mail import mail
 from app.infra.endpoints.order import order
@@ -34,7 +44,22 @@ class InterceptHandler(logging.Handler):
         logger_opt.log(record.levelno, record.getMessage())
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    """Open the shared pools on startup and close them on shutdown."""
+    registry.start()
+    yield
+    await registry.dispose()
+    await RedisCache.close()
+    await CorreiosClient.close()
+    await pagarme.close()
+    await asyncio.to_thread(close_sync_client)
+    stripe_provider.shutdown()
+    password_hasher.shutdown()
+    image_pipeline.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.mount('/static', StaticFiles(directory='static'), name='static')
 
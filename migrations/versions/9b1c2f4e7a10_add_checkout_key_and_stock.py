@@ -0,0 +1,37 @@
+"""add order checkout_key and product quantity
+
+Revision ID: 9b1c2f4e7a10
+Revises: 4d24e58ec8a1
+Create Date: 2023-08-14 09:12:31.402518
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b1c2f4e7a10'
+down_revision: Union[str, None] = '4d24e58ec8a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'order', sa.Column('checkout_key', sa.String(), nullable=True)
+    )
+    op.create_unique_constraint(
+        'order_checkout_key_key', 'order', ['checkout_key']
+    )
+    # Stock was never tracked before this revision: NULL means untracked,
+    # so existing products stay on sale until their stock is set.
+    op.add_column(
+        'product', sa.Column('quantity', sa.Integer(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('product', 'quantity')
+    op.drop_constraint('order_checkout_key_key', 'order', type_='unique')
+    op.drop_column('order', 'checkout_key')
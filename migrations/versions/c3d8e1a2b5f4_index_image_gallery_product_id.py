@@ -0,0 +1,31 @@
+"""index image_gallery product_id
+
+Revision ID: c3d8e1a2b5f4
+Revises: 9b1c2f4e7a10
+Create Date: 2023-08-21 10:04:17.118342
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d8e1a2b5f4'
+down_revision: Union[str, None] = '9b1c2f4e7a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        op.f('ix_image_gallery_product_id'),
+        'image_gallery',
+        ['product_id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f('ix_image_gallery_product_id'), table_name='image_gallery'
+    )
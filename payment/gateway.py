@@ -1,22 +1,14 @@
-import httpx
-from dynaconf import settings
 from loguru import logger
 
+from app.payment.pagarme import create_transaction_sync
 from payment.schema import CreditCardPayment, ResponseGateway, SlipPayment
 
 
 def credit_card_payment(payment: CreditCardPayment):
     try:
-        headers = {'Content-Type': 'application/json'}
         logger.debug(f'----- DICT {payment.dict()} ------------')
-        logger.debug(f'{settings.PAYMENT_GATEWAY_URL}')
-        r = httpx.post(
-            f'{settings.PAYMENT_GATEWAY_URL}',
-            json=payment.dict(),
-            headers=headers,
-        )
-        logger.error(f'----- request {r.content} --------')
-        r = r.json()
+        r = create_transaction_sync(payment.model_dump(mode='json'))
+        logger.error(f'----- request {r} --------')
         logger.error(f"response error {r.get('errors')}")
         return ResponseGateway(
             user='usuario',
@@ -34,15 +26,8 @@ def credit_card_payment(payment: CreditCardPayment):
 
 def slip_payment(payment: SlipPayment):
     try:
-        headers = {'Content-Type': 'application/json'}
         logger.debug(f'------------ {payment.json()} ----- PAYMENTJSON')
-        logger.debug(f'{settings.PAYMENT_GATEWAY_URL}')
-        r = httpx.post(
-            f'{settings.PAYMENT_GATEWAY_URL}',
-            json=payment.dict(),
-            headers=headers,
-        )
-        r = r.json()
+        r = create_transaction_sync(payment.model_dump(mode='json'))
         logger.info(f'RESPONSE ------------{r}')
         return ResponseGateway(
             user='usuario',
@@ -5,6 +5,7 @@ from loguru import logger
 
 from app.infra.models.order import Order, OrderItems, Product
 from app.infra.models.transaction import CreditCardFeeConfig, Payment, Transaction
+from app.product.inventory import reserve_stock
 from payment.adapter import get_db
 from payment.schema import (
     ConfigCreditCardResponse,
@@ -18,22 +19,18 @@ def rollback():
 
 
 class ProductDB:
-    def __init__(self, item) -> None:
+    def __init__(self, quantities) -> None:
         self.db = get_db()
-        self.item = item
+        self.quantities = quantities
 
-    def decrease_product(self):
+    def reserve(self):
         with self.db:
-            return (
-                self.db.query(Product)
-                .filter_by(id=self.item.get('id'))
-                .first()
-            )
-
-    def add_product(self, _product_decrease):
-        with self.db:
-            self.db.add(_product_decrease)
-            self.db.commit()
+            failed = reserve_stock(self.db, self.quantities)
+            if failed:
+                self.db.rollback()
+            else:
+                self.db.commit()
+            return failed
 
 
 class OrderDB:
@@ -1,3 +1,4 @@
+from collections import Counter
 from datetime import datetime, timedelta
 from decimal import Decimal
 
@@ -50,20 +51,18 @@ class User:
 
 
 class Product:
-    def __init__(self, item) -> None:
-        self.item = item
+    def __init__(self, items) -> None:
+        self.items = items
 
     def decrease(self):
-        _product = ProductDB(item=self.item)
-        _product_decrease = _product.decrease_product()
-        logger.debug(_product_decrease.quantity)
-        _qty_decrease = int(self.item.get('quantity'))
-        _product_decrease.quantity -= _qty_decrease
-        if _product_decrease.quantity < 0:
+        _quantities = Counter()
+        for item in self.items:
+            _quantities[int(item.get('id'))] += int(item.get('quantity'))
+        _failed = ProductDB(quantities=_quantities).reserve()
+        if _failed:
+            logger.debug(f'Out of stock {_failed}')
             msg = 'Produto esgotado'
             raise TypeError(msg)
-        else:
-            _product.add_product(_product_decrease)
 
 
 class ShoppingCart:
@@ -85,10 +84,8 @@ class ShoppingCart:
                     'tangible': str(cart.get('tangible')),
                 },
             )
-            for item in _items:
-                Product(item=item).decrease()
-            return _items
-        return None
+        Product(items=_items).decrease()
+        return _items
 
     def installments(self):
         _total_amount = Decimal(self._shopping_cart[0].get('total_amount'))
@@ -174,16 +174,16 @@ class OrdersPaidFullResponse(BaseModel):
     email: str
     phone: str | None = None
     document: int
-    type_address: str
-    category: str
-    country: str
-    city: str
-    state: str
-    neighborhood: str
-    street: str
-    street_number: int
+    type_address: str | None = None
+    category: str | None = None
+    country: str | None = None
+    city: str | None = None
+    state: str | None = None
+    neighborhood: str | None = None
+    street: str | None = None
+    street_number: str | None = None
     address_complement: str | None = None
-    zipcode: str
+    zipcode: str | None = None
     user_affiliate: str | None = None
     amount: int
     checked: bool | None = None
@@ -263,6 +263,12 @@ class ImageGalleryResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ProductGalleryResponse(BaseModel):
+    product_id: int
+    uri: str
+    images: list[ImageGalleryResponse]
+
+
 class ListCategory(BaseModel):
     category: list[CategoryInDB]
     model_config = ConfigDict(from_attributes=True)
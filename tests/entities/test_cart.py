@@ -292,3 +292,20 @@ def test_calculate_subtotal_in_cart_with_coupon() -> None:
     assert cart.subtotal == subtotal
     assert cart.coupon.code == coupon.code
     assert cart.discount == discount_subtotal
+
+
+def test_update_items_keeps_order_and_index() -> None:
+    """Must apply many quantities and keep lookups right after removals."""
+    # Arrange
+    cart = create_cart(product_id=1, quantity=1)
+    for product_id in range(2, 6):
+        cart.add_product(product_id=product_id, quantity=1)
+
+    # Act
+    cart.update_items({2: 0, 4: 7, 6: 1})
+    cart.remove_product(product_id=3)
+    cart.increase_quantity(product_id=5)
+
+    # Assert
+    lines = [(item.product_id, item.quantity) for item in cart.cart_items]
+    assert lines == [(1, 1), (4, 7), (5, 2), (6, 1)]
@@ -0,0 +1,88 @@
+from decimal import Decimal
+
+import pytest
+from pydantic import ValidationError
+
+from app.entities.cart import calculate_totals, generate_new_cart
+from app.entities.money import InvalidMoneyError, Money
+from app.entities.product import ProductCart, ProductInDB
+
+
+def test_money_reads_reais_and_rounds_half_up() -> None:
+    """Must keep integer cents and compare equal to the reais amount."""
+    # Act
+    price = Money.from_decimal('10.505')
+
+    # Assert
+    assert price.cents == 1051
+    assert price == Decimal('10.51')
+    assert Money.from_decimal(3) == Money(300)
+    assert sum([price, Money(49)]) == Money(1100)
+    assert price * Decimal('0.1') == Money(105)
+    with pytest.raises(InvalidMoneyError):
+        Money.from_decimal('ten')
+
+
+@pytest.mark.parametrize('price', [{}, [], 'ten'])
+def test_invalid_price_is_a_validation_error(price: object) -> None:
+    """Must reject non-numeric prices as a validation error, not a crash."""
+    # Act / Assert
+    with pytest.raises(ValidationError):
+        ProductCart(product_id=1, quantity=1, price=price)
+
+
+def test_calculate_totals_matches_decimal_totals() -> None:
+    """Must return the same totals as Decimal arithmetic, in cents."""
+    # Arrange
+    items = [
+        ProductCart(product_id=1, quantity=3, price=Decimal('19.90')),
+        ProductCart(product_id=2, quantity=1, price=Decimal('0.35')),
+    ]
+
+    # Act
+    subtotal, discount = calculate_totals(items, Decimal('0.1'))
+
+    # Assert
+    assert subtotal == 5970 + 35
+    assert discount == 199 * 3 + 4
+
+
+def test_stored_product_prices_are_cents() -> None:
+    """Must read ``product.price`` as cents, as the catalog stores it."""
+    # Arrange
+    product = ProductInDB(
+        product_id=1,
+        name='shoe',
+        uri='/shoe',
+        price=Decimal(1990),
+        active=True,
+        direct_sales=False,
+        description='',
+        image_path=None,
+        installments_config=None,
+        installments_list=None,
+        discount=None,
+        category_id=1,
+        showcase=False,
+        show_discount=False,
+        height=None,
+        width=None,
+        weight=None,
+        length=None,
+        diameter=None,
+        sku=None,
+    )
+
+    # Act
+    cart = generate_new_cart(
+        product=ProductCart(product_id=1, quantity=1),
+        price=product.price,
+        quantity=2,
+    )
+
+    # Assert
+    assert product.price == Money(1990)
+    assert cart.subtotal == Decimal('39.80')
+    assert Money.from_cents(1990) == Decimal('19.90')
+    with pytest.raises(InvalidMoneyError):
+        Money.from_cents('ten')
@@ -0,0 +1,62 @@
+import asyncio
+import re
+
+import httpx
+
+PRICES = {'4510': '61,30', '4014': '95,10'}
+DEADLINES = {'4510': '9', '4014': '3'}
+
+RESPONSE = """<?xml version="1.0" encoding="utf-8"?>
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
+<soap:Body>
+<CalcPrecoPrazoResponse xmlns="http://tempuri.org/">
+<CalcPrecoPrazoResult><Servicos><cServico>
+<Codigo>{service}</Codigo>
+<Valor>{price}</Valor>
+<PrazoEntrega>{deadline}</PrazoEntrega>
+<Erro>0</Erro>
+</cServico></Servicos></CalcPrecoPrazoResult>
+</CalcPrecoPrazoResponse>
+</soap:Body>
+</soap:Envelope>"""
+
+
+class FakeCorreios:
+    """In-process Correios price service for httpx clients.
+
+    ``delay`` seconds are slept per request to check concurrency,
+    services listed in ``fail`` answer with HTTP 500 and those listed in
+    ``malformed`` answer 200 with an HTML page.
+    """
+
+    def __init__(
+        self,
+        delay: float = 0,
+        fail: tuple = (),
+        malformed: tuple = (),
+    ) -> None:
+        self.delay = delay
+        self.fail = fail
+        self.malformed = malformed
+        self.requests = []
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        body = request.content.decode()
+        service = re.search(r'<tem:nCdServico>(\d+)<', body).group(1)
+        self.requests.append(body)
+        await asyncio.sleep(self.delay)
+        if service in self.fail:
+            return httpx.Response(500)
+        if service in self.malformed:
+            return httpx.Response(200, text='<html><body>Erro</body>')
+        return httpx.Response(
+            200,
+            text=RESPONSE.format(
+                service=service,
+                price=PRICES[service],
+                deadline=DEADLINES[service],
+            ),
+        )
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handler)
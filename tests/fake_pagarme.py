@@ -0,0 +1,51 @@
+import asyncio
+import itertools
+import json
+
+import httpx
+
+
+class FakePagarMe:
+    """In-process PagarMe transactions API for httpx clients.
+
+    Transactions are kept in memory. The first ``fail`` requests answer
+    with HTTP 503 and every request sleeps ``delay`` seconds.
+    """
+
+    def __init__(self, delay: float = 0, fail: int = 0) -> None:
+        self.delay = delay
+        self.fail = fail
+        self.requests = []
+        self.transactions = {}
+        self.ids = itertools.count(1000)
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            self.fail -= 1
+            return httpx.Response(503)
+        if request.method == 'POST':
+            payment = json.loads(request.content)
+            gateway_id = next(self.ids)
+            transaction = {
+                'id': gateway_id,
+                'tid': gateway_id,
+                'acquirer_id': 'acquirer',
+                'authorization_code': '123456',
+                'amount': payment.get('amount'),
+                'status': (
+                    'waiting_payment'
+                    if payment.get('payment_method') == 'boleto'
+                    else 'paid'
+                ),
+            }
+            self.transactions[gateway_id] = transaction
+            return httpx.Response(200, json=transaction)
+        gateway_id = int(request.url.path.rsplit('/', 1)[-1])
+        if gateway_id not in self.transactions:
+            return httpx.Response(404, json={'errors': ['not found']})
+        return httpx.Response(200, json=self.transactions[gateway_id])
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handler)
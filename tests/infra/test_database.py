@@ -0,0 +1,44 @@
+import pytest
+
+from app.cart.uow import SqlAlchemyUnitOfWork
+from app.infra.database import EngineRegistry, registry
+
+
+def test_session_factories_are_shared() -> None:
+    """Must return the same factory and engine on every call."""
+    # Arrange
+    local_registry = EngineRegistry()
+
+    # Act
+    first = local_registry.async_session
+    second = local_registry.async_session
+
+    # Assert
+    assert first is second
+    assert local_registry.session is local_registry.session
+    assert first.kw['bind'] is local_registry.async_engine
+
+
+def test_unit_of_work_uses_registry_session_factory() -> None:
+    """Must not build a new engine per unit of work."""
+    # Act
+    uow_1 = SqlAlchemyUnitOfWork()
+    uow_2 = SqlAlchemyUnitOfWork()
+
+    # Assert
+    assert uow_1.session is registry.async_session
+    assert uow_2.session is registry.async_session
+
+
+@pytest.mark.asyncio()
+async def test_dispose_resets_engines() -> None:
+    """Must create new engines after dispose."""
+    # Arrange
+    local_registry = EngineRegistry()
+    engine = local_registry.async_engine
+
+    # Act
+    await local_registry.dispose()
+
+    # Assert
+    assert local_registry.async_engine is not engine
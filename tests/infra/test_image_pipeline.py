@@ -0,0 +1,133 @@
+import io
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+
+from app.infra.optimize_image import ImagePipeline
+from app.infra.spaces import MemoryStorage, SpacesStorage
+
+
+def upload(size: tuple[int, int], filename: str = 'Red Shoe.PNG') -> UploadFile:
+    content = io.BytesIO()
+    Image.new('RGB', size, 'red').save(content, 'PNG')
+    content.seek(0)
+    return UploadFile(file=content, filename=filename)
+
+
+@pytest.mark.asyncio()
+async def test_process_uploads_every_variant_in_both_formats():
+    """Must publish thumbnail, listing and detail as WebP and JPEG."""
+
+    # Arrange
+    storage = MemoryStorage()
+    pipeline = ImagePipeline(storage=storage, workers=1)
+
+    # Act
+    try:
+        urls = await pipeline.process(upload((2400, 1200)))
+    finally:
+        pipeline.shutdown()
+
+    # Assert
+    assert sorted(urls) == [
+        'detail.jpg',
+        'detail.webp',
+        'listing.jpg',
+        'listing.webp',
+        'thumbnail.jpg',
+        'thumbnail.webp',
+    ]
+    sizes = {}
+    for key, (data, content_type) in storage.objects.items():
+        assert key.startswith('red-shoe-')
+        with Image.open(io.BytesIO(data)) as image:
+            assert content_type == f'image/{image.format.lower()}'
+            sizes[key.rsplit('-', 1)[-1]] = image.size
+    assert sizes['detail.jpg'] == (1200, 600)
+    assert sizes['listing.webp'] == (400, 200)
+    assert sizes['thumbnail.jpg'] == (150, 75)
+
+
+@pytest.mark.asyncio()
+async def test_process_rejects_oversized_upload():
+    """Must stop reading once the upload exceeds max_bytes."""
+
+    # Arrange
+    storage = MemoryStorage()
+    pipeline = ImagePipeline(storage=storage, workers=1, max_bytes=100)
+
+    # Act
+    with pytest.raises(HTTPException) as error:
+        await pipeline.process(upload((500, 500)))
+
+    # Assert
+    assert error.value.status_code == 413
+    assert storage.objects == {}
+
+
+@pytest.mark.asyncio()
+async def test_process_rejects_decompression_bomb(monkeypatch):
+    """Must answer 422 for images past Pillow's pixel limit."""
+
+    # Arrange
+    monkeypatch.setattr(Image, 'MAX_IMAGE_PIXELS', 1000)
+    storage = MemoryStorage()
+    pipeline = ImagePipeline(storage=storage, workers=1)
+
+    # Act
+    try:
+        with pytest.raises(HTTPException) as error:
+            await pipeline.process(upload((100, 100)))
+    finally:
+        pipeline.shutdown()
+
+    # Assert
+    assert error.value.status_code == 422
+    assert storage.objects == {}
+
+
+@pytest.mark.asyncio()
+async def test_spaces_storage_puts_public_objects():
+    """Must put each object with public ACL, content type and caching."""
+
+    # Arrange
+    client = boto3.session.Session().client(
+        's3',
+        region_name='nyc3',
+        endpoint_url='https://nyc3.digitaloceanspaces.com',
+        aws_access_key_id='key',
+        aws_secret_access_key='secret',  # noqa: S106
+    )
+    storage = SpacesStorage(workers=1, client=client)
+    objects = {
+        'shoe-detail.webp': (b'webp', 'image/webp'),
+        'shoe-detail.jpg': (b'jpeg', 'image/jpeg'),
+    }
+    stubber = Stubber(client)
+    for key, (data, content_type) in objects.items():
+        stubber.add_response(
+            'put_object',
+            {'ETag': '"etag"'},
+            {
+                'Bucket': storage.bucket,
+                'Key': key,
+                'Body': data,
+                'ACL': 'public-read',
+                'ContentType': content_type,
+                'CacheControl': 'public, max-age=31536000, immutable',
+            },
+        )
+
+    # Act
+    with stubber:
+        try:
+            urls = await storage.upload_many(objects)
+        finally:
+            storage.shutdown()
+
+    # Assert
+    stubber.assert_no_pending_responses()
+    assert urls == {key: f'{storage.public_url}/{key}' for key in objects}
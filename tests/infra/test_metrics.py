@@ -0,0 +1,33 @@
+import pytest
+
+from app.infra.metrics import Histogram, Metrics
+
+
+def test_histogram_quantiles_use_bucket_bounds() -> None:
+    """Must report the bucket bound holding each quantile."""
+    # Arrange
+    histogram = Histogram(buckets=(0.1, 1))
+
+    # Act
+    for seconds in (0.05, 0.05, 0.05, 0.5, 5):
+        histogram.observe(seconds)
+
+    # Assert
+    snapshot = histogram.snapshot()
+    assert snapshot['buckets'] == {'0.1': 3, '1': 4, 'inf': 5}
+    assert snapshot['p50'] == 0.1
+    assert snapshot['p95'] == float('inf')
+
+
+def test_timer_flags_errors() -> None:
+    """Must observe failed blocks as errors."""
+    # Arrange
+    metrics = Metrics()
+
+    # Act
+    with pytest.raises(ValueError), metrics.timer('call'):
+        raise ValueError
+
+    # Assert
+    assert metrics.snapshot()['call']['errors'] == 1
+    assert metrics.snapshot()['call']['count'] == 1
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.user.password import PasswordHasher
+
+
+@pytest.mark.asyncio()
+async def test_hash_and_verify_run_on_the_pool() -> None:
+    """Must verify a hash made by the pool and count both calls."""
+    # Arrange
+    hasher = PasswordHasher(workers=2, rounds=4)
+
+    # Act
+    hashed = await hasher.hash('secret')
+    verified = await hasher.verify('secret', hashed)
+
+    # Assert
+    assert verified is True
+    assert await hasher.verify('wrong', hashed) is False
+    assert hasher.stats()['completed'] == 3
+    assert hasher.stats()['pending'] == 0
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio()
+async def test_verify_and_update_rehashes_other_cost() -> None:
+    """Must return a new hash when the cost factor changed."""
+    # Arrange
+    hashed = await PasswordHasher(rounds=4).hash('secret')
+    hasher = PasswordHasher(rounds=5)
+
+    # Act
+    verified, new_hash = await hasher.verify_and_update('secret', hashed)
+
+    # Assert
+    assert verified is True
+    assert new_hash.startswith('$2b$05$')
+    assert await hasher.verify_and_update('secret', new_hash) == (True, None)
+
+
+@pytest.mark.asyncio()
+async def test_saturated_pool_rejects_calls() -> None:
+    """Must fail fast with 503 once the queue is full."""
+    # Arrange
+    hasher = PasswordHasher(workers=1, max_pending=1)
+    release = threading.Event()
+    hasher.context = SimpleNamespace(hash=lambda _: release.wait(5))
+    calls = [asyncio.ensure_future(hasher.hash('secret')) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    # Act
+    with pytest.raises(HTTPException) as error:
+        await hasher.hash('secret')
+
+    # Assert
+    assert error.value.status_code == 503
+    assert hasher.stats()['running'] + hasher.stats()['pending'] == 2
+    release.set()
+    await asyncio.gather(*calls)
+    assert hasher.stats()['rejected'] == 1
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio()
+async def test_cancelled_queued_call_frees_its_slot() -> None:
+    """Must not count a call cancelled while waiting for a worker."""
+    # Arrange
+    hasher = PasswordHasher(workers=1, max_pending=1)
+    release = threading.Event()
+    hasher.context = SimpleNamespace(hash=lambda _: release.wait(5))
+    running = asyncio.ensure_future(hasher.hash('secret'))
+    queued = asyncio.ensure_future(hasher.hash('secret'))
+    await asyncio.sleep(0)
+
+    # Act
+    queued.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await queued
+
+    # Assert
+    assert hasher.stats()['pending'] == 0
+    release.set()
+    await running
+    assert hasher.stats()['running'] == 0
+    assert hasher.stats()['completed'] == 1
+    hasher.shutdown()
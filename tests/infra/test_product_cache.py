@@ -0,0 +1,73 @@
+import pytest
+
+from app.infra.local_cache import LocalCache
+from app.product.cache import ProductCache, SHOWCASE_KEY, product_id_key
+
+
+def test_local_cache_evicts_least_recently_used() -> None:
+    """Must drop the oldest untouched entry when full."""
+    # Arrange
+    cache = LocalCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+
+    # Act
+    cache.set('c', 3)
+
+    # Assert
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+
+def test_local_cache_expires_entries() -> None:
+    """Must not return entries older than their ttl."""
+    # Arrange
+    cache = LocalCache()
+
+    # Act
+    cache.set('a', 1, ttl=-1)
+
+    # Assert
+    assert cache.get('a', 'missing') == 'missing'
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio()
+async def test_get_or_load_calls_loader_once() -> None:
+    """Must serve the second read from cache and count it."""
+    # Arrange
+    cache = ProductCache()
+    calls = []
+
+    def loader() -> dict:
+        calls.append(1)
+        return {'product_id': 1}
+
+    # Act
+    first = await cache.get_or_load(product_id_key(1), loader)
+    second = await cache.get_or_load(product_id_key(1), loader)
+
+    # Assert
+    assert first == second == {'product_id': 1}
+    assert len(calls) == 1
+    assert cache.stats()['misses'] == 1
+    assert cache.stats()['local_hits'] == 1
+
+
+@pytest.mark.asyncio()
+async def test_invalidate_drops_products_and_listings() -> None:
+    """Must reload products and listings after a write."""
+    # Arrange
+    cache = ProductCache()
+    await cache.set(product_id_key(1), {'product_id': 1})
+    await cache.set(SHOWCASE_KEY, [{'product_id': 1}], listing=True)
+
+    # Act
+    await cache.invalidate(product_id=1)
+
+    # Assert
+    assert await cache.get(product_id_key(1)) is None
+    assert await cache.get(SHOWCASE_KEY) is None
+    assert cache.stats()['invalidations'] == 1
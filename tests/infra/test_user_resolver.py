@@ -0,0 +1,82 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.user import resolver
+from app.user.gateway import create_access_token
+from app.user.resolver import CurrentUser, UserCache, decode_token
+
+
+def make_user(document: str = '12345678901') -> CurrentUser:
+    return CurrentUser(
+        user_id=1,
+        name='Jane',
+        email='jane@example.com',
+        document=document,
+        role_id=2,
+    )
+
+
+def test_tokens_get_a_unique_jti() -> None:
+    """Must key each token by its own id."""
+    # Act
+    first = decode_token(create_access_token({'sub': '12345678901'}))
+    second = decode_token(create_access_token({'sub': '12345678901'}))
+
+    # Assert
+    assert first['jti'] != second['jti']
+    assert UserCache.key(first) == first['jti']
+
+
+def test_decode_token_rejects_invalid_token() -> None:
+    """Must raise 401 for a token that can not be decoded."""
+    # Act / Assert
+    with pytest.raises(HTTPException) as error:
+        decode_token('not-a-token')
+    assert error.value.status_code == 401
+
+
+def test_invalidate_drops_cached_user() -> None:
+    """Must miss after the user document is invalidated."""
+    # Arrange
+    cache = UserCache()
+    payload = {'sub': '12345678901', 'jti': 'a'}
+    cache.set(payload, make_user())
+
+    # Act
+    cache.invalidate('12345678901')
+
+    # Assert
+    assert cache.get(payload) is None
+    cache.set(payload, make_user())
+    assert cache.get(payload) is not None
+
+
+def test_entries_do_not_outlive_the_token() -> None:
+    """Must not cache a user for an expired token."""
+    # Arrange
+    cache = UserCache()
+    payload = {'sub': '12345678901', 'exp': time.time() - 1}
+
+    # Act
+    cache.set(payload, make_user())
+
+    # Assert
+    assert cache.get(payload) is None
+
+
+@pytest.mark.asyncio()
+async def test_resolve_user_hits_cache_without_database(monkeypatch) -> None:
+    """Must return the cached user without opening a session."""
+    # Arrange
+    token = create_access_token({'sub': '12345678901'})
+    monkeypatch.setattr(resolver, 'user_cache', UserCache())
+    resolver.user_cache.set(decode_token(token), make_user())
+    monkeypatch.setattr(resolver.database, 'get_async_session', None)
+
+    # Act
+    user = await resolver.resolve_user(token)
+
+    # Assert
+    assert user.document == '12345678901'
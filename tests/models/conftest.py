@@ -1,13 +1,18 @@
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
 from app.infra.models.base import Base
 
 
 @pytest.fixture
 def session() -> sessionmaker:
-    engine = create_engine('sqlite:///:memory:')
+    engine = create_engine(
+        'sqlite:///:memory:',
+        connect_args={'check_same_thread': False},
+        poolclass=StaticPool,
+    )
     Session = sessionmaker(
         bind=engine,
         autocommit=False,
@@ -0,0 +1,248 @@
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app.cart.checkout import CheckoutRequest, write_checkouts
+from app.entities.cart import CartPayment
+from app.entities.product import ProductCart
+from app.entities.user import UserData
+from app.infra.models.order import (
+    Order,
+    OrderItems,
+    OrderStatusSteps,
+    Product,
+)
+from app.infra.models.transaction import Payment, Transaction
+from tests.factories_db import (
+    CategoryFactory,
+    CreditCardFeeConfigFactory,
+    ProductFactory,
+    UserFactory,
+)
+
+
+def make_cart(items: list[ProductCart]) -> CartPayment:
+    return CartPayment(
+        uuid=uuid4(),
+        cart_items=items,
+        subtotal=sum(item.price * item.quantity for item in items),
+        user_data=UserData(
+            name='Jane',
+            email='jane@example.com',
+            document='12345678901',
+            phone='11999999999',
+        ),
+        shipping_is_payment=True,
+        user_address_id=1,
+        payment_method='card',
+        payment_method_id='pm_1',
+    )
+
+
+@pytest.fixture
+def products(session):
+    user = UserFactory()
+    category = CategoryFactory()
+    config = CreditCardFeeConfigFactory()
+    session.add_all([user, category, config])
+    session.flush()
+    products = [
+        ProductFactory(
+            category=category,
+            installment_config=config,
+            quantity=10,
+        )
+        for _ in range(2)
+    ]
+    session.add_all(products)
+    session.commit()
+    return user, products
+
+
+def test_write_checkouts_in_one_batch(session, products):
+    """Must write two carts and decrement stock per product."""
+
+    # Arrange
+    user, (first, second) = products
+    carts = [
+        make_cart(
+            [
+                ProductCart(
+                    product_id=first.product_id,
+                    quantity=2,
+                    price=Decimal('10.50'),
+                ),
+                ProductCart(
+                    product_id=second.product_id,
+                    quantity=1,
+                    price=Decimal('5'),
+                ),
+            ],
+        ),
+        make_cart(
+            [
+                ProductCart(
+                    product_id=first.product_id,
+                    quantity=3,
+                    price=Decimal('10.50'),
+                ),
+            ],
+        ),
+    ]
+    checkouts = [
+        (
+            CheckoutRequest(
+                cart_uuid=str(cart.uuid),
+                payment_intent=f'pi_{index}',
+                user_id=user.user_id,
+            ),
+            cart,
+        )
+        for index, cart in enumerate(carts)
+    ]
+
+    # Act
+    result = write_checkouts(session, checkouts)
+
+    # Assert
+    assert len(set(result.orders.values())) == 2
+    assert result.out_of_stock == {}
+    assert session.scalar(select(func.count(OrderItems.order_items_id))) == 3
+    assert session.scalars(select(Payment.amount)).all() == [2600, 3150]
+    assert session.scalars(
+        select(Transaction.amount).order_by(Transaction.transaction_id),
+    ).all() == [2100, 500, 3150]
+    stock = dict(
+        session.execute(select(Product.product_id, Product.quantity)).all(),
+    )
+    assert stock == {first.product_id: 5, second.product_id: 9}
+
+
+def test_write_checkouts_is_idempotent(session, products):
+    """Must return the existing order when a checkout is written again."""
+
+    # Arrange
+    user, (product, _) = products
+    cart = make_cart(
+        [
+            ProductCart(
+                product_id=product.product_id,
+                quantity=1,
+                price=Decimal(1),
+            ),
+        ],
+    )
+    request = CheckoutRequest(
+        cart_uuid=str(cart.uuid),
+        payment_intent='pi_1',
+        user_id=user.user_id,
+    )
+    first = write_checkouts(session, [(request, cart)])
+
+    # Act
+    again = write_checkouts(session, [(request, cart), (request, cart)])
+
+    # Assert
+    assert again.orders == first.orders
+    assert session.scalar(select(func.count(Order.order_id))) == 1
+    assert session.scalar(
+        select(Product.quantity).where(
+            Product.product_id == product.product_id,
+        ),
+    ) == 9
+
+
+def test_write_checkouts_cancels_cart_without_stock(session, products):
+    """Must write the other carts and cancel the one out of stock."""
+
+    # Arrange
+    user, (product, other) = products
+    carts = [
+        make_cart(
+            [
+                ProductCart(
+                    product_id=product.product_id,
+                    quantity=quantity,
+                    price=Decimal(1),
+                ),
+                ProductCart(
+                    product_id=other.product_id,
+                    quantity=1,
+                    price=Decimal(1),
+                ),
+            ],
+        )
+        for quantity in (4, 20)
+    ]
+    requests = [
+        CheckoutRequest(
+            cart_uuid=str(cart.uuid),
+            payment_intent='pi_1',
+            user_id=user.user_id,
+        )
+        for cart in carts
+    ]
+
+    # Act
+    result = write_checkouts(session, list(zip(requests, carts)))
+
+    # Assert
+    assert list(result.orders) == [requests[0].key, requests[1].key]
+    assert result.out_of_stock == {requests[1].key: [product.product_id]}
+    assert session.scalar(
+        select(Order.order_status).where(
+            Order.order_id == result.orders[requests[1].key],
+        ),
+    ) == 'cancelled'
+    assert session.scalars(
+        select(OrderStatusSteps.status).order_by(
+            OrderStatusSteps.order_status_steps_id,
+        ),
+    ).all() == ['PAYMENT_PENDING', 'ORDER_CANCELLED']
+    stock = dict(
+        session.execute(select(Product.product_id, Product.quantity)).all(),
+    )
+    assert stock == {product.product_id: 6, other.product_id: 9}
+
+
+def test_write_checkouts_reports_cancelled_checkout_again(session, products):
+    """Must not sell a cancelled checkout when its task is retried."""
+
+    # Arrange
+    user, (product, _) = products
+    cart = make_cart(
+        [
+            ProductCart(
+                product_id=product.product_id,
+                quantity=20,
+                price=Decimal(1),
+            ),
+        ],
+    )
+    request = CheckoutRequest(
+        cart_uuid=str(cart.uuid),
+        payment_intent='pi_1',
+        user_id=user.user_id,
+    )
+    first = write_checkouts(session, [(request, cart)])
+    session.execute(
+        update(Product)
+        .where(Product.product_id == product.product_id)
+        .values(quantity=50),
+    )
+    session.commit()
+
+    # Act
+    again = write_checkouts(session, [(request, cart)])
+
+    # Assert
+    assert first.out_of_stock == {request.key: [product.product_id]}
+    assert again == first
+    assert session.scalar(select(func.count(Order.order_id))) == 1
+    assert session.scalar(
+        select(Product.quantity).where(
+            Product.product_id == product.product_id,
+        ),
+    ) == 50
@@ -0,0 +1,170 @@
+from collections import Counter
+
+import pytest
+from sqlalchemy import select
+
+from app.infra.models.order import Product
+from app.infra.models.transaction import Payment, Transaction
+from app.product.inventory import release_stock, reserve_stock
+from domains.domain_payment import cancel_payment, charge_reserved_stock
+from tests.factories_db import (
+    CategoryFactory,
+    CreditCardFeeConfigFactory,
+    PaymentFactory,
+    ProductFactory,
+    UserFactory,
+)
+
+
+def add_products(session, *quantities):
+    category = CategoryFactory()
+    config = CreditCardFeeConfigFactory()
+    session.add_all([category, config])
+    session.flush()
+    products = [
+        ProductFactory(
+            category=category,
+            installment_config=config,
+            quantity=quantity,
+        )
+        for quantity in quantities
+    ]
+    session.add_all(products)
+    session.commit()
+    return [product.product_id for product in products]
+
+
+def stock(session):
+    return dict(
+        session.execute(select(Product.product_id, Product.quantity)).all(),
+    )
+
+
+def test_reserve_stock_returns_products_without_stock(session):
+    """Must decrement only products with enough stock."""
+
+    # Arrange
+    first, second, third = add_products(session, 5, 1, 3)
+
+    # Act
+    failed = reserve_stock(session, {first: 2, second: 2, third: 3})
+
+    # Assert
+    assert failed == [second]
+    assert stock(session) == {first: 3, second: 1, third: 0}
+
+
+def test_release_stock_gives_quantities_back(session):
+    """Must add the reserved quantities back."""
+
+    # Arrange
+    first, second = add_products(session, 5, 1)
+    reserve_stock(session, {first: 2, second: 1})
+
+    # Act
+    release_stock(session, {first: 2, second: 1})
+
+    # Assert
+    assert stock(session) == {first: 5, second: 1}
+
+
+def test_reserve_stock_skips_products_without_tracked_stock(session):
+    """Must always reserve products created before stock was tracked."""
+
+    # Arrange
+    untracked, tracked = add_products(session, None, 1)
+
+    # Act
+    failed = reserve_stock(session, {untracked: 5, tracked: 2})
+    release_stock(session, {untracked: 5})
+
+    # Assert
+    assert failed == [tracked]
+    assert stock(session) == {untracked: None, tracked: 1}
+
+
+def test_charge_keeps_stock_of_paid_payment(session):
+    """Must keep the reservation when the gateway accepts the payment."""
+
+    # Arrange
+    (product_id,) = add_products(session, 5)
+
+    # Act
+    result = charge_reserved_stock(
+        session,
+        Counter({product_id: 2}),
+        lambda: {'status': 'paid', 'errors': None},
+    )
+
+    # Assert
+    assert result['status'] == 'paid'
+    assert stock(session) == {product_id: 3}
+
+
+def test_charge_releases_stock_of_refused_payment(session):
+    """Must give the stock back when the gateway refuses the payment."""
+
+    # Arrange
+    (product_id,) = add_products(session, 5)
+
+    # Act
+    result = charge_reserved_stock(
+        session,
+        Counter({product_id: 2}),
+        lambda: {'status': 'refused', 'errors': None},
+    )
+
+    # Assert
+    assert result['status'] == 'refused'
+    assert stock(session) == {product_id: 5}
+
+
+def test_charge_releases_stock_when_gateway_fails(session):
+    """Must give the stock back when the gateway call raises."""
+
+    # Arrange
+    (product_id,) = add_products(session, 5)
+
+    def charge():
+        session.add(CategoryFactory())
+        raise ConnectionError
+
+    # Act
+    with pytest.raises(ConnectionError):
+        charge_reserved_stock(session, Counter({product_id: 2}), charge)
+
+    # Assert
+    assert stock(session) == {product_id: 5}
+
+
+def test_cancel_payment_cancels_its_pending_rows(session):
+    """Must not leave pending rows behind a failed gateway call."""
+
+    # Arrange
+    (product_id,) = add_products(session, 5)
+    user = UserFactory()
+    session.add(user)
+    session.flush()
+    payment = PaymentFactory(user=user, status='pending')
+    session.add(payment)
+    session.flush()
+    session.add(
+        Transaction(
+            user_id=user.user_id,
+            amount=100,
+            order_id=1,
+            qty=1,
+            payment_id=payment.payment_id,
+            status='pending',
+            product_id=product_id,
+        ),
+    )
+    session.commit()
+    session.add(CategoryFactory())
+
+    # Act
+    cancel_payment(session, payment.payment_id)
+
+    # Assert
+    assert session.scalars(select(Payment.status)).all() == ['cancelled']
+    assert session.scalars(select(Transaction.status)).all() == ['cancelled']
@@ -1,12 +1,21 @@
+import csv
+import json
 from datetime import datetime
 
+import pytest
 from sqlalchemy import select
 
-from constants import StepsOrder
+from constants import ExportFormat, StepsOrder
 from app.infra.models.order import Order, OrderStatusSteps
+from app.infra.models.transaction import Transaction
+from domains import domain_order
 from tests.factories_db import (
+    CategoryFactory,
+    CreditCardFeeConfigFactory,
     OrderFactory,
     OrderStatusStepsFactory,
+    PaymentFactory,
+    ProductFactory,
     UserFactory,
 )
 
@@ -57,3 +66,86 @@ def test_order_status_steps(session):
     # assert
     assert order_status_steps.order_id == 1
     assert order_status_steps == new_order_status_steps
+
+
+@pytest.fixture
+def paid_orders(session):
+    user = UserFactory()
+    category = CategoryFactory()
+    config_fee = CreditCardFeeConfigFactory()
+    session.add_all([user, category, config_fee])
+    session.flush()
+    product = ProductFactory(category=category, installment_config=config_fee)
+    session.add(product)
+    for quantity in (1, 2, 3):
+        payment = PaymentFactory(user=user)
+        session.add(payment)
+        session.flush()
+        order = OrderFactory(
+            user=user,
+            payment_id=payment.payment_id,
+            order_date=datetime(2023, 1, quantity),
+        )
+        session.add(order)
+        session.flush()
+        session.add_all(
+            Transaction(
+                user_id=user.user_id,
+                amount=100,
+                order_id=order.order_id,
+                qty=quantity,
+                payment_id=payment.payment_id,
+                status='paid',
+                product_id=product.product_id,
+            )
+            for _ in range(quantity)
+        )
+    session.commit()
+    return session
+
+
+def test_orders_paid_groups_products_per_order(paid_orders):
+    """Must return each order with only its own product lines."""
+
+    # Arrange
+    session = paid_orders
+
+    # Act
+    first = domain_order.get_orders_paid(session, limit=2)
+    second = domain_order.get_orders_paid(
+        session,
+        cursor=first['next_cursor'],
+        limit=2,
+    )
+    dated = domain_order.get_orders_paid(
+        session,
+        dates='{"date_start": "2023-01-02", "date_end": "2023-01-03"}',
+    )
+
+    # Assert
+    orders = first['orders'] + second['orders']
+    assert [order.order_id for order in orders] == [1, 2, 3]
+    assert [len(order.products) for order in orders] == [1, 2, 3]
+    assert second['next_cursor'] is None
+    assert [order.order_id for order in dated['orders']] == [2, 3]
+
+
+@pytest.mark.parametrize('export_format', list(ExportFormat))
+def test_export_orders_paid_streams_every_line(paid_orders, export_format):
+    """Must emit one row per product line in the requested format."""
+
+    # Act
+    chunks = list(
+        domain_order.export_orders_paid(
+            export_format,
+            session_factory=lambda: paid_orders,
+        ),
+    )
+
+    # Assert
+    lines = ''.join(chunks).splitlines()
+    if export_format == ExportFormat.CSV:
+        rows = list(csv.DictReader(lines))
+    else:
+        rows = [json.loads(line) for line in lines]
+    assert [int(row['order_id']) for row in rows] == [1, 2, 2, 3, 3, 3]
@@ -0,0 +1,67 @@
+import json
+
+import httpx
+import pytest
+from sqlalchemy import select
+
+from app.infra.models.order import OrderStatusSteps
+from job_service.service import dispatch
+from tests.factories_db import OrderFactory, OrderStatusStepsFactory, UserFactory
+
+
+@pytest.mark.asyncio()
+async def test_dispatch_marks_delivered_steps_as_sent(session):
+    """Must send each unsent step once and keep failures for the next run."""
+
+    # Arrange
+    user = UserFactory()
+    session.add(user)
+    session.flush()
+    orders = [OrderFactory(user=user) for _ in range(5)]
+    session.add_all(orders)
+    session.flush()
+    for order in orders:
+        session.add(
+            OrderStatusStepsFactory(
+                order_id=order.order_id,
+                sending=False,
+                active=True,
+            ),
+        )
+    session.add(
+        OrderStatusStepsFactory(
+            order_id=orders[0].order_id,
+            sending=True,
+            active=True,
+        ),
+    )
+    session.commit()
+    failing = orders[1].order_id
+    received = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        if body['order_id'] == failing:
+            return httpx.Response(503)
+        received.append(request.headers['Idempotency-Key'])
+        return httpx.Response(200)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    # Act
+    report = await dispatch(
+        session_factory=lambda: session,
+        client=client,
+        batch_size=2,
+        concurrency=2,
+    )
+
+    # Assert
+    unsent = session.scalars(
+        select(OrderStatusSteps.order_id).where(
+            OrderStatusSteps.sending.is_(False),
+        ),
+    ).all()
+    assert (report.batches, report.delivered, report.failed) == (3, 4, 1)
+    assert len(received) == len(set(received)) == 4
+    assert unsent == [failing]
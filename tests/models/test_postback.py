@@ -0,0 +1,100 @@
+from sqlalchemy import select
+
+from app.infra.models.order import Order
+from app.infra.models.transaction import Payment
+from app.payment.postback import PaymentUpdate, apply_payment_updates
+from tests.factories_db import OrderFactory, PaymentFactory, UserFactory
+
+
+def test_apply_payment_updates_keeps_latest_status(session):
+    """Must write the last update of each transaction to payment and order."""
+
+    # Arrange
+    user = UserFactory()
+    session.add(user)
+    session.flush()
+    for gateway_id in (1, 2):
+        payment = PaymentFactory(
+            user=user,
+            gateway_id=gateway_id,
+            status='waiting_payment',
+            authorization='',
+        )
+        session.add(payment)
+        session.flush()
+        session.add(
+            OrderFactory(
+                user=user,
+                payment_id=payment.payment_id,
+                order_status='waiting_payment',
+            ),
+        )
+    session.commit()
+    updates = [
+        PaymentUpdate(gateway_id=1, status='authorized'),
+        PaymentUpdate(gateway_id=2, status='refused'),
+        PaymentUpdate(gateway_id=1, status='paid', authorization_code='A1'),
+    ]
+
+    # Act
+    applied = apply_payment_updates(session, updates)
+
+    # Assert
+    session.expire_all()
+    payments = session.execute(
+        select(Payment.status, Payment.authorization, Payment.processed)
+        .order_by(Payment.gateway_id),
+    ).all()
+    statuses = session.scalars(
+        select(Order.order_status).order_by(Order.order_id),
+    ).all()
+    assert applied == 2
+    assert payments == [('paid', 'A1', True), ('refused', '', True)]
+    assert statuses == ['paid', 'refused']
+
+
+def test_apply_payment_updates_never_downgrades_final_status(session):
+    """Must ignore late deliveries of earlier statuses but apply refunds."""
+
+    # Arrange
+    user = UserFactory()
+    session.add(user)
+    session.flush()
+    for gateway_id in (1, 2):
+        payment = PaymentFactory(
+            user=user,
+            gateway_id=gateway_id,
+            status='paid',
+            authorization='A1',
+        )
+        session.add(payment)
+        session.flush()
+        session.add(
+            OrderFactory(
+                user=user,
+                payment_id=payment.payment_id,
+                order_status='paid',
+            ),
+        )
+    session.commit()
+
+    # Act
+    apply_payment_updates(
+        session,
+        [
+            PaymentUpdate(gateway_id=1, status='waiting_payment'),
+            PaymentUpdate(gateway_id=2, status='refunded'),
+            PaymentUpdate(gateway_id=2, status='processing'),
+        ],
+    )
+
+    # Assert
+    session.expire_all()
+    payments = session.scalars(
+        select(Payment.status).order_by(Payment.gateway_id),
+    ).all()
+    statuses = session.scalars(
+        select(Order.order_status).order_by(Order.order_id),
+    ).all()
+    assert payments == ['paid', 'refunded']
+    assert statuses == ['paid', 'refunded']
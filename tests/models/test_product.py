@@ -0,0 +1,201 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.infra.models.order import ImageGallery, Product
+from app.infra.models.transaction import CreditCardFeeConfig
+from app.payment.installments import InstallmentEngine, InstallmentTable
+from app.product.cache import ProductCache
+from domains import domain_order
+from tests.factories_db import (
+    CategoryFactory,
+    CreditCardFeeConfigFactory,
+    ProductFactory,
+)
+
+
+@pytest.fixture
+def catalog(session, mocker):
+    mocker.patch.object(domain_order, 'product_cache', ProductCache())
+    mocker.patch.object(
+        domain_order,
+        'installment_engine',
+        InstallmentEngine(),
+    )
+    category = CategoryFactory(path='shoes')
+    other_category = CategoryFactory(path='hats')
+    config_fee = CreditCardFeeConfigFactory()
+    session.add_all([category, other_category, config_fee])
+    session.flush()
+    for _ in range(5):
+        session.add(
+            ProductFactory(category=category, installment_config=config_fee),
+        )
+    session.add(
+        ProductFactory(category=other_category, installment_config=config_fee),
+    )
+    session.commit()
+    return session
+
+
+@pytest.mark.asyncio()
+async def test_catalog_pages_follow_cursor(catalog):
+    """Must return every product once across keyset pages."""
+    # Act
+    first = await domain_order.get_product_all(catalog, limit=4)
+    second = await domain_order.get_product_all(
+        catalog,
+        cursor=first['next_cursor'],
+        limit=4,
+    )
+
+    # Assert
+    ids = [item['product_id'] for item in first['products']]
+    ids += [item['product_id'] for item in second['products']]
+    assert ids == [1, 2, 3, 4, 5, 6]
+    assert first['next_cursor'] == 4
+    assert second['next_cursor'] is None
+    assert first['total'] == 6
+
+
+@pytest.mark.asyncio()
+async def test_catalog_page_projects_fields(catalog):
+    """Must ship only the requested fields and skip heavy ones."""
+    # Act
+    default = await domain_order.get_product_all(catalog)
+    projected = await domain_order.get_product_all(catalog, fields='name')
+
+    # Assert
+    assert 'description' not in default['products'][0]
+    assert 'installments_list' not in default['products'][0]
+    assert 'quantity' not in default['products'][0]
+    assert set(projected['products'][0]) == {'product_id', 'name'}
+
+
+@pytest.mark.asyncio()
+async def test_catalog_page_does_not_project_stock(catalog):
+    """Must refuse to ship the stock quantity when asked for it."""
+    # Act
+    with pytest.raises(HTTPException) as error:
+        await domain_order.get_product_all(catalog, fields='name,quantity')
+
+    # Assert
+    assert error.value.status_code == 400
+
+
+@pytest.mark.asyncio()
+async def test_category_page_counts_category_only(catalog):
+    """Must page and count only the products of the category."""
+    # Act
+    page = await domain_order.get_products_category(catalog, 'shoes', limit=2)
+
+    # Assert
+    assert len(page['products']) == 2
+    assert page['next_cursor'] == 2
+    assert page['total'] == 5
+
+
+@pytest.mark.asyncio()
+async def test_catalog_legacy_shape(catalog):
+    """Must keep the unpaginated shape behind the legacy flag."""
+    # Act
+    products = await domain_order.get_products_category(
+        catalog,
+        'shoes',
+        legacy=True,
+    )
+
+    # Assert
+    assert list(products) == ['product']
+    assert len(products['product']) == 5
+
+
+@pytest.mark.asyncio()
+async def test_galleries_load_in_one_batch_and_refresh(catalog):
+    """Must return galleries by id or uri and refresh them on delete."""
+    # Arrange
+    catalog.add_all(
+        [
+            ImageGallery(url='a.jpg', product_id=1),
+            ImageGallery(url='b.jpg', product_id=1),
+            ImageGallery(url='c.jpg', product_id=2),
+        ],
+    )
+    catalog.get(Product, 3).uri = 'red-shoe'
+    catalog.commit()
+
+    # Act
+    galleries = await domain_order.get_galleries(
+        catalog,
+        [2, 1, 99],
+        ['red-shoe'],
+    )
+    cached = await domain_order.get_galleries(catalog, [1])
+    await domain_order.delete_image_gallery(1, catalog)
+    refreshed = await domain_order.get_galleries(catalog, [1])
+
+    # Assert
+    assert [gallery['product_id'] for gallery in galleries] == [2, 1, 3]
+    assert [image['url'] for image in galleries[1]['images']] == [
+        'a.jpg',
+        'b.jpg',
+    ]
+    assert galleries[2]['images'] == []
+    assert cached == [galleries[1]]
+    assert [image['url'] for image in refreshed[0]['images']] == ['b.jpg']
+    assert domain_order.product_cache.stats()['misses'] == 4
+
+
+@pytest.mark.asyncio()
+async def test_catalog_page_attaches_installments(catalog):
+    """Must price every product of the page with its fee config."""
+    # Act
+    page = await domain_order.get_product_all(catalog, limit=3)
+
+    # Assert
+    for product in page['products']:
+        config = catalog.get(
+            CreditCardFeeConfig,
+            product['installments_config'],
+        )
+        table = InstallmentTable.from_config(config)
+        plan = product['installments']
+        assert len(plan) == config.max_installments
+        assert plan[-1]['total'] == table.total(
+            int(product['price']),
+            config.max_installments,
+        )
+
+
+@pytest.mark.parametrize('config_id', [None, 999])
+def test_installments_without_fee_config_use_the_default_plan(
+    session,
+    config_id,
+):
+    """Must price a product with no known fee config with the 1.99% plan."""
+    # Arrange
+    category = CategoryFactory()
+    config = CreditCardFeeConfigFactory()
+    session.add_all([category, config])
+    session.flush()
+    product = ProductFactory(category=category, installment_config=config)
+    session.add(product)
+    session.commit()
+    product_id = product.product_id if config_id else 999
+    if config_id:
+        product.installments_config = config_id
+        session.commit()
+    cart = SimpleNamespace(
+        dict=lambda: {
+            'cart': [{'product_id': product_id, 'amount': 5000, 'qty': 2}],
+        },
+    )
+
+    # Act
+    installments = domain_order.get_installments(session, cart)
+
+    # Assert
+    assert len(installments) == 12
+    assert installments[2] == {'name': '3 x R$33.33', 'value': '3'}
+    assert installments[3] == {'name': '4 x R$27.05', 'value': '4'}
@@ -0,0 +1,153 @@
+import pytest
+from sqlalchemy import select, update
+
+from app.infra.models.order import Order
+from app.payment.pagarme import PagarMeClient
+from job_service.reconcile import gateway_statuses, reconcile
+from tests.factories_db import OrderFactory, PaymentFactory, UserFactory
+from tests.fake_pagarme import FakePagarMe
+
+
+@pytest.mark.asyncio()
+async def test_reconcile_updates_pending_orders_in_pages(session):
+    """Must apply gateway statuses and refuse orders without payment.
+
+    A payment still waiting for its gateway id is left pending and
+    counted as failed.
+    """
+
+    # Arrange
+    user = UserFactory()
+    session.add(user)
+    session.flush()
+    pagarme = FakePagarMe()
+    gateway = {1: 'paid', 2: 'waiting_payment', 3: 'refused'}
+    for gateway_id, status in gateway.items():
+        pagarme.transactions[gateway_id] = {'tid': gateway_id, 'status': status}
+        payment = PaymentFactory(
+            user=user,
+            gateway_id=gateway_id,
+            payment_gateway='PagarMe',
+        )
+        session.add(payment)
+        session.flush()
+        session.add(
+            OrderFactory(
+                user=user,
+                payment_id=payment.payment_id,
+                order_status='waiting_payment',
+            ),
+        )
+    session.add(OrderFactory(user=user, payment_id=None))
+    in_flight = PaymentFactory(
+        user=user,
+        gateway_id=0,
+        payment_gateway='PagarMe',
+    )
+    session.add(in_flight)
+    session.flush()
+    session.add(
+        OrderFactory(
+            user=user,
+            payment_id=in_flight.payment_id,
+            order_status='waiting_payment',
+        ),
+    )
+    session.add(OrderFactory(user=user, order_status='paid'))
+    session.commit()
+    client = PagarMeClient(
+        url='https://pagarme.test/1/transactions',
+        transport=pagarme.transport(),
+    )
+
+    # Act
+    report = await reconcile(
+        session_factory=lambda: session,
+        client=client,
+        concurrency=2,
+        page_size=2,
+    )
+
+    # Assert
+    statuses = session.scalars(
+        select(Order.order_status).order_by(Order.order_id),
+    ).all()
+    assert statuses == [
+        'paid',
+        'waiting_payment',
+        'refused',
+        'refused',
+        'waiting_payment',
+        'paid',
+    ]
+    assert report.processed == 5
+    assert report.pages == 3
+    assert report.updated == 3
+    assert report.failed == 1
+
+
+@pytest.mark.asyncio()
+async def test_reconcile_keeps_status_written_by_a_postback(session):
+    """Must not overwrite an order a postback moved after the page read."""
+
+    # Arrange
+    user = UserFactory()
+    session.add(user)
+    session.flush()
+    payment = PaymentFactory(
+        user=user,
+        gateway_id=1,
+        payment_gateway='PagarMe',
+    )
+    session.add(payment)
+    session.flush()
+    order = OrderFactory(
+        user=user,
+        payment_id=payment.payment_id,
+        order_status='processing',
+    )
+    session.add(order)
+    session.commit()
+
+    class RacingClient:
+        async def get_transaction(self, gateway_id):
+            session.execute(update(Order).values(order_status='paid'))
+            session.commit()
+            return {'tid': gateway_id, 'status': 'waiting_payment'}
+
+    # Act
+    report = await reconcile(
+        session_factory=lambda: session,
+        client=RacingClient(),
+        page_size=10,
+    )
+
+    # Assert
+    assert session.scalar(select(Order.order_status)) == 'paid'
+    assert report.updated == 0
+
+
+@pytest.mark.asyncio()
+async def test_gateway_statuses_keeps_the_status_read():
+    """Must return the status read next to the gateway one."""
+    # Arrange
+    pagarme = FakePagarMe()
+    pagarme.transactions[7] = {'tid': 7, 'status': 'paid'}
+    client = PagarMeClient(
+        url='https://pagarme.test/1/transactions',
+        transport=pagarme.transport(),
+    )
+
+    # Act
+    statuses, failed = await gateway_statuses(
+        client,
+        [(1, 'waiting_payment', 10, 7), (2, 'pending', None, None)],
+        concurrency=1,
+    )
+
+    # Assert
+    assert statuses == {
+        1: ('waiting_payment', 'paid'),
+        2: ('pending', 'refused'),
+    }
+    assert failed == 0
@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+from domains import domain_shipping
+from tests.factories_db import (
+    CategoryFactory,
+    CreditCardFeeConfigFactory,
+    ProductFactory,
+)
+
+
+@pytest.mark.asyncio()
+async def test_shipping_loads_products_off_the_event_loop(session, mocker):
+    """Must query the products in a worker thread and quote the package."""
+
+    # Arrange
+    category = CategoryFactory()
+    config = CreditCardFeeConfigFactory()
+    session.add_all([category, config])
+    session.flush()
+    product = ProductFactory(category=category, installment_config=config)
+    session.add(product)
+    session.commit()
+    quote = mocker.patch.object(
+        domain_shipping.correios,
+        'quote',
+        return_value=[{'service': 'PAC', 'price': 10}],
+    )
+    load_package = domain_shipping.load_package
+    threads = []
+
+    def spy(*args):
+        threads.append(threading.get_ident())
+        return load_package(*args)
+
+    mocker.patch.object(domain_shipping, 'load_package', spy)
+
+    # Act
+    result = await domain_shipping.shipping_zip_code(
+        db=session,
+        shipping_data=domain_shipping.ShippingCalc(
+            shipping='01001000',
+            cart=[{'product_id': product.product_id, 'qty': 2}],
+        ),
+    )
+
+    # Assert
+    assert result == {'shipping': [{'service': 'PAC', 'price': 10}]}
+    assert threads
+    assert threads[0] != threading.get_ident()
+    quote.assert_awaited_once()
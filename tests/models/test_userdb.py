@@ -1,5 +1,8 @@
+import pytest
 from sqlalchemy import select
 from app.infra.models.users import User
+from app.user.password import PasswordHasher
+from domains import domain_user
 from tests.factories_db import UserFactory
 
 
@@ -18,3 +21,26 @@ def test_create_user(session):
     assert user.user_id == 1
     assert user.role_id == 2
     assert user == new_user
+
+
+@pytest.mark.asyncio()
+async def test_login_rehashes_password_with_new_cost(session, monkeypatch):
+    """Must replace the stored hash when BCRYPT_ROUNDS changed."""
+
+    # Arrange
+    old_hash = await PasswordHasher(rounds=4).hash('secret')
+    new_user = UserFactory(password=old_hash)
+    session.add(new_user)
+    session.commit()
+    monkeypatch.setattr(
+        domain_user,
+        'password_hasher',
+        PasswordHasher(rounds=5),
+    )
+
+    # Act
+    await domain_user.get_user(session, new_user.document, 'secret')
+
+    # Assert
+    user = session.scalar(select(User).where(User.user_id == new_user.user_id))
+    assert user.password.startswith('$2b$05$')
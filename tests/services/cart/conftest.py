@@ -1,9 +1,11 @@
 import pytest
 from app.cart.uow import MemoryUnitOfWork
 
+from app.freight.freight_gateway import MemoryFreight
 from app.infra.bootstrap import Command, bootstrap
 from app.infra.queue import MemoryPublish
 from app.infra.redis import MemoryCache
+from app.payment.provider import MemoryPaymentProvider
 
 
 @pytest.fixture(name='memory_bootstrap')
@@ -12,4 +14,6 @@ async def memory_bootstrap() -> Command:
         uow=MemoryUnitOfWork(),
         cache=MemoryCache(),
         publish=MemoryPublish(),
+        freight=MemoryFreight(),
+        payment=MemoryPaymentProvider(),
     )
@@ -0,0 +1,66 @@
+from decimal import Decimal
+
+import pytest
+
+from app.cart import codec
+from app.entities.cart import CartBase, CartUser
+from app.entities.product import ProductCart
+from app.entities.user import UserData
+from tests.fake_functions import fake
+
+
+def create_cart_user() -> CartUser:
+    return CartUser(
+        uuid=fake.uuid4(),
+        cart_items=[
+            ProductCart(product_id=1, quantity=2, price=Decimal('10.50')),
+            ProductCart(product_id=2, quantity=1, price=Decimal('0.333')),
+        ],
+        coupon='code',
+        subtotal=Decimal('21.33'),
+        user_data=UserData(
+            name=fake.name(),
+            email=fake.email(),
+            document='12345678900',
+            phone='11999999999',
+        ),
+    )
+
+
+def test_msgpack_payload_round_trip() -> None:
+    """Must decode the same cart that was encoded."""
+    # Arrange
+    cart = create_cart_user()
+
+    # Act
+    payload = codec.dumps(cart, codec=codec.MSGPACK_CODEC)
+    output = codec.loads(payload, CartUser)
+
+    # Assert
+    assert payload[0] == codec.CODEC_VERSION
+    assert output == cart
+    assert len(payload) < len(cart.model_dump_json())
+
+
+def test_loads_should_read_legacy_json_payload() -> None:
+    """Must keep reading carts stored as JSON."""
+    # Arrange
+    cart = create_cart_user()
+
+    # Act
+    output_str = codec.loads(cart.model_dump_json(), CartBase)
+    output_bytes = codec.loads(cart.model_dump_json().encode(), CartBase)
+
+    # Assert
+    assert output_str.uuid == cart.uuid
+    assert output_bytes.cart_items == cart.cart_items
+
+
+def test_loads_with_unknown_version_raise_error() -> None:
+    """Must refuse payloads from a newer codec."""
+    # Arrange
+    payload = bytes((99,)) + b'\x80'
+
+    # Act/Assert
+    with pytest.raises(codec.UnknownCartCodecError):
+        codec.loads(payload, CartBase)
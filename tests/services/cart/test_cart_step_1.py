@@ -1,11 +1,16 @@
 from decimal import Decimal
 from uuid import UUID
 import pytest
+from fastapi import HTTPException
 from pytest_mock import MockerFixture
 from app.entities.cart import CartBase
 
 from app.entities.product import ProductCart
-from app.cart.services import add_product_to_cart, calculate_cart
+from app.cart.services import (
+    add_product_to_cart,
+    calculate_cart,
+    update_cart_items,
+)
 from app.infra.bootstrap import Command
 from app.infra.redis import MemoryCache
 from tests.fake_functions import fake
@@ -82,7 +87,7 @@ async def test_add_product_to_current_cart_should_add_new_product_should_calcula
         subtotal=Decimal(10),
     )
     cache = bootstrap.cache
-    cache.set(str(uuid), cart.model_dump_json())
+    await cache.set(str(uuid), cart.model_dump_json())
 
     # Act
     cart_response = await add_product_to_cart(
@@ -126,7 +131,7 @@ async def test_given_cart_with_items_need_calculate_to_preview(
         subtotal=Decimal(10),
     )
     cache = bootstrap.cache
-    cache.set(str(uuid), cart.model_dump_json())
+    await cache.set(str(uuid), cart.model_dump_json())
 
     # Act
     cart_response = await calculate_cart(
@@ -137,3 +142,151 @@ async def test_given_cart_with_items_need_calculate_to_preview(
 
     # Assert
     assert str(cart_response.uuid) == str(uuid)
+
+
+@pytest.mark.asyncio()
+async def test_update_cart_items_applies_every_change_in_one_write(
+    memory_bootstrap: Command,
+    mocker: MockerFixture,
+) -> None:
+    """Must set, add and remove lines with a single cache update."""
+    # Arrange
+    bootstrap = await memory_bootstrap
+    uuid = fake.uuid4()
+    cart = CartBase(
+        uuid=uuid,
+        cart_items=[
+            ProductCart(product_id=1, quantity=1),
+            ProductCart(product_id=2, quantity=1),
+        ],
+        subtotal=Decimal(10),
+    )
+    await bootstrap.cache.set(str(uuid), cart.model_dump_json())
+    update_spy = mocker.spy(bootstrap.cache, 'update')
+
+    # Act
+    cart_response = await update_cart_items(
+        str(uuid),
+        [
+            ProductCart(product_id=2, quantity=0),
+            ProductCart(product_id=1, quantity=3),
+        ],
+        bootstrap,
+    )
+
+    # Assert
+    lines = [(item.product_id, item.quantity) for item in cart_response.cart_items]
+    assert lines == [(1, 3)]
+    assert cart_response.cart_items[0].price == Decimal(100)
+    assert cart_response.subtotal == Decimal(300)
+    update_spy.assert_called_once()
+
+
+@pytest.mark.asyncio()
+async def test_update_cart_items_adds_products_and_reprices(
+    memory_bootstrap: Command,
+) -> None:
+    """Must add new lines and recompute the subtotal in the same write."""
+    # Arrange
+    bootstrap = await memory_bootstrap
+    uuid = fake.uuid4()
+    cart = CartBase(
+        uuid=uuid,
+        cart_items=[ProductCart(product_id=1, quantity=1)],
+        subtotal=Decimal(10),
+    )
+    await bootstrap.cache.set(str(uuid), cart.model_dump_json())
+
+    # Act
+    cart_response = await update_cart_items(
+        str(uuid),
+        [ProductCart(product_id=2, quantity=2)],
+        bootstrap,
+    )
+
+    # Assert
+    lines = [(item.product_id, item.quantity) for item in cart_response.cart_items]
+    assert lines == [(1, 1), (2, 2)]
+    assert cart_response.subtotal == Decimal(500)
+    cached = CartBase.model_validate_json(await bootstrap.cache.get(str(uuid)))
+    assert cached.subtotal == Decimal(500)
+
+
+@pytest.mark.asyncio()
+async def test_update_cart_items_rejects_unknown_products_before_writing(
+    memory_bootstrap: Command,
+) -> None:
+    """Must raise 404 for products not in the catalog, leaving the cart."""
+    # Arrange
+    bootstrap = await memory_bootstrap
+    uuid = fake.uuid4()
+    cart = CartBase(
+        uuid=uuid,
+        cart_items=[ProductCart(product_id=1, quantity=1)],
+        subtotal=Decimal(10),
+    )
+    await bootstrap.cache.set(str(uuid), cart.model_dump_json())
+
+    # Act
+    with pytest.raises(HTTPException) as error:
+        await update_cart_items(
+            str(uuid),
+            [
+                ProductCart(product_id=2, quantity=1),
+                ProductCart(product_id=3, quantity=2),
+            ],
+            bootstrap,
+        )
+
+    # Assert
+    assert error.value.status_code == 404
+    assert '3' in error.value.detail
+    assert await bootstrap.cache.get(str(uuid)) == cart.model_dump_json()
+
+
+@pytest.mark.asyncio()
+async def test_update_cart_items_reprices_a_cart_changed_meanwhile(
+    memory_bootstrap: Command,
+    mocker: MockerFixture,
+) -> None:
+    """Must price the lines of the cart written, not of a stale read."""
+    # Arrange
+    bootstrap = await memory_bootstrap
+    uuid = fake.uuid4()
+    cart = CartBase(
+        uuid=uuid,
+        cart_items=[ProductCart(product_id=1, quantity=1)],
+        subtotal=Decimal(10),
+    )
+    await bootstrap.cache.set(str(uuid), cart.model_dump_json())
+    concurrent = cart.model_copy(deep=True).add_product(2, 1)
+    get_products = bootstrap.uow.get_products
+    calls = []
+
+    async def add_product_meanwhile(products: list) -> list:
+        calls.append([product.product_id for product in products])
+        if len(calls) == 1:
+            await bootstrap.cache.set(
+                str(uuid),
+                concurrent.model_dump_json(),
+            )
+        return await get_products(products)
+
+    mocker.patch.object(
+        bootstrap.uow,
+        'get_products',
+        side_effect=add_product_meanwhile,
+    )
+
+    # Act
+    cart_response = await update_cart_items(
+        str(uuid),
+        [ProductCart(product_id=1, quantity=2)],
+        bootstrap,
+    )
+
+    # Assert
+    assert calls == [[1], [1, 2]]
+    lines = [(item.product_id, item.quantity) for item in cart_response.cart_items]
+    assert lines == [(1, 2), (2, 1)]
+    assert cart_response.subtotal == Decimal(400)
@@ -0,0 +1,45 @@
+from decimal import Decimal
+
+import pytest
+
+from app.entities.cart import CartBase
+from app.infra.redis import MemoryClient
+from tests.fake_functions import fake
+
+
+@pytest.mark.asyncio()
+async def test_update_should_apply_mutation_to_stored_cart() -> None:
+    """Must store the payload returned by the mutation."""
+    # Arrange
+    store = MemoryClient()
+    uuid = str(fake.uuid4())
+    cart = CartBase(uuid=uuid, cart_items=[], subtotal=Decimal(0))
+    await store.set(uuid, cart.model_dump_json())
+
+    def add_product(payload: str) -> str:
+        cart = CartBase.model_validate_json(payload)
+        cart.add_product(product_id=1, quantity=2)
+        return cart.model_dump_json()
+
+    # Act
+    await store.update(uuid, add_product)
+
+    # Assert
+    output = CartBase.model_validate_json(await store.get(uuid))
+    assert output.cart_items[0].product_id == 1
+    assert output.cart_items[0].quantity == 2
+
+
+@pytest.mark.asyncio()
+async def test_update_should_not_write_when_mutation_returns_none() -> None:
+    """Must leave missing keys untouched."""
+    # Arrange
+    store = MemoryClient()
+    uuid = str(fake.uuid4())
+
+    # Act
+    output = await store.update(uuid, lambda _: None)
+
+    # Assert
+    assert output is None
+    assert await store.get(uuid) is None
@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+from app.freight.correios import CorreiosClient, Package
+from tests.fake_correios import FakeCorreios
+
+PACKAGE = Package(weight=1.2, length=16, height=4, width=11)
+
+
+@pytest.mark.asyncio()
+async def test_quote_services_concurrently():
+    """Must quote every service in about the time of one."""
+    # Arrange
+    correios = FakeCorreios(delay=0.2)
+    client = CorreiosClient(transport=correios.transport())
+
+    # Act
+    started = time.perf_counter()
+    quotes = await client.quote('47590000', '07171140', PACKAGE)
+    elapsed = time.perf_counter() - started
+
+    # Assert
+    assert quotes == [
+        {'serviço': 'PAC', 'frete': 6130, 'prazo': '9'},
+        {'serviço': 'SEDEX', 'frete': 9510, 'prazo': '3'},
+    ]
+    assert elapsed < 0.35
+
+
+@pytest.mark.asyncio()
+async def test_quote_is_cached_by_prefix_and_bucket():
+    """Must reuse a quote for the same CEP prefix and package bucket."""
+    # Arrange
+    correios = FakeCorreios()
+    client = CorreiosClient(transport=correios.transport())
+    await client.quote('47590000', '07171140', PACKAGE)
+
+    # Act
+    quotes = await client.quote(
+        '47590000',
+        '07171999',
+        Package(weight=1.9, length=20, height=5, width=15),
+    )
+
+    # Assert
+    assert len(quotes) == 2
+    assert len(correios.requests) == 2
+    assert '<tem:nVlPeso>2</tem:nVlPeso>' in correios.requests[0]
+
+
+@pytest.mark.asyncio()
+async def test_quote_skips_failed_service_without_caching():
+    """Must return the services that answered and retry the rest later."""
+    # Arrange
+    correios = FakeCorreios(fail=('4014',))
+    client = CorreiosClient(transport=correios.transport())
+
+    # Act
+    quotes = await client.quote('47590000', '07171140', PACKAGE)
+    await client.quote('47590000', '07171140', PACKAGE)
+
+    # Assert
+    assert [quote['serviço'] for quote in quotes] == ['PAC']
+    assert len(correios.requests) == 4
+
+
+@pytest.mark.asyncio()
+async def test_quote_times_out():
+    """Must give up on a service slower than the timeout."""
+    # Arrange
+    correios = FakeCorreios(delay=1)
+    client = CorreiosClient(transport=correios.transport(), timeout=0.1)
+
+    # Act
+    quotes = await client.quote('47590000', '07171140', PACKAGE)
+
+    # Assert
+    assert quotes == []
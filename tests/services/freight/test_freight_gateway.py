@@ -0,0 +1,114 @@
+from decimal import Decimal
+
+import pytest
+
+from app.entities.product import ProductCart, ProductInDB
+from app.freight.correios import CorreiosClient
+from app.freight.freight_gateway import (
+    CorreiosFreight,
+    FreightUnavailableError,
+    consolidate_package,
+)
+from tests.fake_correios import FakeCorreios
+
+
+def build_product(product_id: int, **dimensions) -> ProductInDB:
+    return ProductInDB(
+        product_id=product_id,
+        name='product',
+        uri='/product',
+        price=1000,
+        active=True,
+        direct_sales=False,
+        description='',
+        image_path=None,
+        installments_config=1,
+        installments_list=None,
+        discount=None,
+        category_id=1,
+        showcase=False,
+        show_discount=False,
+        diameter=None,
+        sku='sku',
+        **dimensions,
+    )
+
+
+def test_consolidate_package_stacks_and_clamps():
+    """Must stack items, clamp dimensions and bill the cubic weight."""
+    # Arrange
+    products = [
+        build_product(1, height=10, width=30, length=40, weight=1),
+        build_product(2, height=None, width=5, length=120, weight=None),
+    ]
+
+    # Act
+    package = consolidate_package(products, {1: 3, 2: 1})
+
+    # Assert
+    assert package.length == 99
+    assert package.width == 30
+    assert package.height == 31
+    assert package.volume == 99 * 30 * 31
+    assert package.weight == pytest.approx(99 * 30 * 31 / 6000)
+
+
+def test_consolidate_package_caps_weight():
+    """Must not quote a package heavier than the carrier limit."""
+    # Arrange
+    products = [build_product(1, height=1, width=1, length=1, weight=20)]
+
+    # Act
+    package = consolidate_package(products, {1: 2})
+
+    # Assert
+    assert package.weight == 29
+    assert package.height == 2
+    assert package.width == 10
+    assert package.length == 15
+
+
+@pytest.mark.asyncio()
+async def test_correios_freight_quotes_once_per_cart():
+    """Must quote the whole cart once and return the cheapest service."""
+    # Arrange
+    correios = FakeCorreios()
+    freight = CorreiosFreight(
+        client=CorreiosClient(transport=correios.transport()),
+        zip_code_source='47590000',
+    )
+    products = [
+        build_product(product_id, height=2, width=11, length=16, weight=0.3)
+        for product_id in range(1, 6)
+    ]
+    cart_items = [
+        ProductCart(product_id=product_id, quantity=2)
+        for product_id in range(1, 6)
+    ]
+
+    # Act
+    freight_cart = await freight.calculate_volume_weight(products, cart_items)
+    price = await freight.get_freight(freight_cart, '07171140')
+
+    # Assert
+    assert price == Decimal('61.30')
+    assert len(correios.requests) == 2
+    assert '<tem:nVlPeso>3</tem:nVlPeso>' in correios.requests[0]
+
+
+@pytest.mark.asyncio()
+async def test_correios_freight_unavailable_on_non_xml_responses():
+    """Must raise FreightUnavailableError when Correios answers HTML."""
+    # Arrange
+    correios = FakeCorreios(malformed=('4510', '4014'))
+    freight = CorreiosFreight(
+        client=CorreiosClient(transport=correios.transport()),
+        zip_code_source='47590000',
+    )
+    products = [build_product(1, height=2, width=11, length=16, weight=0.3)]
+    cart_items = [ProductCart(product_id=1, quantity=1)]
+    freight_cart = await freight.calculate_volume_weight(products, cart_items)
+
+    # Act / Assert
+    with pytest.raises(FreightUnavailableError):
+        await freight.get_freight(freight_cart, '07171140')
@@ -0,0 +1,53 @@
+from decimal import Decimal
+
+import pytest
+
+from app.payment.installments import InstallmentError, InstallmentTable
+
+
+def test_plan_matches_compound_fee_in_cents():
+    """Must charge (1 + fee) ** n from min_installment_with_fee on."""
+
+    # Arrange
+    table = InstallmentTable(
+        fee=Decimal('0.0199'),
+        min_installment_with_fee=4,
+        max_installments=12,
+    )
+
+    # Act
+    plan = table.plan(10000)
+
+    # Assert
+    assert len(plan) == 12
+    assert [option['total'] for option in plan[:3]] == [10000] * 3
+    assert not plan[2]['with_fee']
+    assert plan[3]['with_fee']
+    for option in plan:
+        n = option['installments']
+        factor = Decimal('1.0199') ** n if option['with_fee'] else 1
+        expected = (Decimal(10000) * factor).to_integral_value()
+        assert option['total'] == int(expected)
+        assert option['first_value'] + option['value'] * (n - 1) == (
+            option['total']
+        )
+
+
+def test_plans_price_many_totals_and_total_checks_range():
+    """Must price every amount and reject counts the config lacks."""
+
+    # Arrange
+    table = InstallmentTable(
+        fee=Decimal('0.03'),
+        min_installment_with_fee=2,
+        max_installments=6,
+    )
+
+    # Act
+    plans = table.plans([100, 999, 123456])
+
+    # Assert
+    assert [len(plan) for plan in plans] == [6, 6, 6]
+    assert plans[2][5]['total'] == table.total(123456, 6) == 147413
+    with pytest.raises(InstallmentError):
+        table.total(100, 7)
@@ -0,0 +1,160 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.payment.pagarme import (
+    CircuitBreaker,
+    CircuitOpenError,
+    PagarMeClient,
+    PaymentGatewayError,
+    _BackgroundLoop,
+)
+from tests.fake_pagarme import FakePagarMe
+
+
+def make_client(pagarme: FakePagarMe, **kwargs) -> PagarMeClient:
+    return PagarMeClient(
+        url='https://pagarme.test/1/transactions',
+        api_key='key',
+        transport=pagarme.transport(),
+        backoff=0,
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio()
+async def test_create_and_get_transaction_on_one_client():
+    """Must create a transaction and read it back."""
+    # Arrange
+    pagarme = FakePagarMe()
+    client = make_client(pagarme)
+
+    # Act
+    created = await client.create_transaction({'amount': 1000})
+    transaction = await client.get_transaction(created['id'])
+
+    # Assert
+    assert transaction['status'] == 'paid'
+    assert transaction['tid'] == created['id']
+    await client.close()
+
+
+@pytest.mark.asyncio()
+async def test_get_transaction_retries_server_errors():
+    """Must retry idempotent calls until the gateway answers."""
+    # Arrange
+    pagarme = FakePagarMe()
+    client = make_client(pagarme, retries=2)
+    created = await client.create_transaction({'amount': 1000})
+    pagarme.fail = 2
+
+    # Act
+    transaction = await client.get_transaction(created['id'])
+
+    # Assert
+    assert transaction['tid'] == created['id']
+    assert len(pagarme.requests) == 4
+
+
+@pytest.mark.asyncio()
+async def test_create_transaction_is_not_retried():
+    """Must not send a payment twice."""
+    # Arrange
+    pagarme = FakePagarMe(fail=1)
+    client = make_client(pagarme, retries=2)
+
+    # Act / Assert
+    with pytest.raises(PaymentGatewayError):
+        await client.create_transaction({'amount': 1000})
+    assert len(pagarme.requests) == 1
+
+
+@pytest.mark.asyncio()
+async def test_call_is_bounded_by_timeout():
+    """Must give up once the deadline is over."""
+    # Arrange
+    client = make_client(FakePagarMe(delay=1), timeout=0.05, retries=0)
+
+    # Act / Assert
+    with pytest.raises(PaymentGatewayError):
+        await client.get_transaction(1)
+
+
+@pytest.mark.asyncio()
+async def test_circuit_opens_after_consecutive_failures():
+    """Must fail fast without calling the gateway while open."""
+    # Arrange
+    pagarme = FakePagarMe(fail=10)
+    breaker = CircuitBreaker(failures=2, reset_timeout=60)
+    client = make_client(pagarme, retries=0, breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(PaymentGatewayError):
+            await client.get_transaction(1)
+
+    # Act / Assert
+    with pytest.raises(CircuitOpenError):
+        await client.get_transaction(1)
+    assert breaker.state == 'open'
+    assert len(pagarme.requests) == 2
+
+
+def test_half_open_circuit_closes_after_success():
+    """Must let one trial call through and close on success."""
+    # Arrange
+    breaker = CircuitBreaker(failures=1, reset_timeout=0)
+    breaker.record_failure()
+
+    # Act
+    breaker.allow()
+
+    # Assert
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+
+
+@pytest.mark.asyncio()
+async def test_cancelled_trial_call_does_not_block_the_circuit():
+    """Must let a new trial through after the trial call was cancelled."""
+    # Arrange
+    pagarme = FakePagarMe(delay=1)
+    breaker = CircuitBreaker(failures=1, reset_timeout=0)
+    breaker.record_failure()
+    client = make_client(pagarme, retries=0, breaker=breaker)
+    trial = asyncio.ensure_future(client.get_transaction(1))
+    await asyncio.sleep(0.01)
+
+    # Act
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+
+    # Assert
+    assert breaker.trial is False
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    await client.close()
+
+
+def test_background_client_is_closed_at_shutdown():
+    """Must close the client of the sync wrappers and stop its loop."""
+    # Arrange
+    background = _BackgroundLoop()
+
+    async def open_client(client: PagarMeClient) -> httpx.AsyncClient:
+        return client.client
+
+    http = background.run(open_client)
+    thread = background.thread
+
+    # Act
+    background.close()
+
+    # Assert
+    assert http.is_closed
+    assert not thread.is_alive()
+    assert background.run(open_client) is not http
+    background.close()
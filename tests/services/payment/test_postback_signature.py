@@ -0,0 +1,93 @@
+import hashlib
+import hmac
+
+import pytest
+
+from app.payment.postback import (
+    POSTBACK_QUEUE_KEY,
+    InvalidPostbackError,
+    PaymentUpdate,
+    enqueue_postback,
+    parse_postback,
+    verify_signature,
+)
+
+BODY = (
+    b'id=42&current_status=paid&object=transaction'
+    b'&transaction%5Bauthorization_code%5D=A1'
+)
+
+
+def test_verify_signature_accepts_only_the_hub_signature():
+    """Must accept the sha1 HMAC of the body and nothing else."""
+
+    # Arrange
+    digest = hmac.new(b'secret', BODY, hashlib.sha1).hexdigest()
+
+    # Act / Assert
+    assert verify_signature(BODY, f'sha1={digest}', 'secret')
+    assert not verify_signature(BODY + b'&x=1', f'sha1={digest}', 'secret')
+    assert not verify_signature(BODY, f'md5={digest}', 'secret')
+    assert not verify_signature(BODY, None, 'secret')
+
+
+def test_parse_postback_reads_form_and_json():
+    """Must return the same update from form and JSON bodies."""
+
+    # Act
+    form = parse_postback(BODY)
+    json = parse_postback(b'{"id": 42, "current_status": "paid"}')
+
+    # Assert
+    assert (form.gateway_id, form.status) == (42, 'paid')
+    assert form.authorization_code == 'A1'
+    assert (json.gateway_id, json.status) == (42, 'paid')
+
+
+def test_parse_postback_without_status_raises():
+    """Must reject postbacks missing the status."""
+    with pytest.raises(InvalidPostbackError):
+        parse_postback(b'id=42')
+
+
+class FlakyRedis:
+    """Async redis stand-in whose first push fails."""
+
+    def __init__(self):
+        self.keys = {}
+        self.lists = {}
+        self.push_failures = 1
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.keys:
+            return None
+        self.keys[key] = value
+        return True
+
+    async def delete(self, key):
+        self.keys.pop(key, None)
+
+    async def rpush(self, key, value):
+        if self.push_failures:
+            self.push_failures -= 1
+            raise ConnectionError
+        self.lists.setdefault(key, []).append(value)
+
+
+@pytest.mark.asyncio()
+async def test_enqueue_postback_accepts_redelivery_after_failed_push():
+    """Must not mark a delivery as seen when it could not be queued."""
+
+    # Arrange
+    redis = FlakyRedis()
+    update = PaymentUpdate(gateway_id=42, status='paid')
+
+    # Act
+    with pytest.raises(ConnectionError):
+        await enqueue_postback(redis, update)
+    queued = await enqueue_postback(redis, update)
+
+    # Assert
+    assert queued is True
+    assert len(redis.lists[POSTBACK_QUEUE_KEY]) == 1
+    assert await enqueue_postback(redis, update) is False
@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import pytest
+
+from app.entities.cart import CreatePaymentMethod
+from app.infra import stripe
+from app.infra.metrics import metrics
+from app.payment.provider import MemoryPaymentProvider, StripePaymentProvider
+
+CARD = CreatePaymentMethod(
+    number='4242424242424242',
+    exp_month=12,
+    exp_year=2030,
+    cvc='123',
+    name='Jane',
+)
+
+
+@pytest.mark.asyncio()
+async def test_stripe_calls_do_not_block_the_event_loop(monkeypatch):
+    """Must run SDK calls on the pool and record their latency."""
+    # Arrange
+    def create_payment_method(payment):
+        time.sleep(0.2)
+        return {'id': 'pm_1'}
+
+    monkeypatch.setattr(stripe, 'create_payment_method', create_payment_method)
+    provider = StripePaymentProvider(workers=4)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticking = asyncio.create_task(ticker())
+    before = metrics.histogram('stripe.create_payment_method').count
+
+    # Act
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(provider.create_payment_method(CARD) for _ in range(4)),
+    )
+    elapsed = time.perf_counter() - started
+    ticking.cancel()
+
+    # Assert
+    assert results == [{'id': 'pm_1'}] * 4
+    assert elapsed < 0.35
+    assert ticks >= 10
+    assert metrics.histogram('stripe.create_payment_method').count == before + 4
+    provider.shutdown()
+
+
+@pytest.mark.asyncio()
+async def test_memory_provider_confirms_its_intents():
+    """Must keep the intents it created."""
+    # Arrange
+    provider = MemoryPaymentProvider()
+    payment_method = await provider.create_payment_method(CARD)
+
+    # Act
+    intent = await provider.create_payment_intent(
+        amount=1000,
+        currency='brl',
+        customer_id='cus_1',
+        payment_method=payment_method['id'],
+    )
+    confirmed = await provider.confirm_payment_intent(
+        intent['id'],
+        payment_method['id'],
+        'jane@example.com',
+    )
+
+    # Assert
+    assert payment_method['card'] == {'last4': '4242'}
+    assert confirmed['status'] == 'succeeded'
@@ -1,25 +1,100 @@
+from io import BytesIO
+from xml.sax.saxutils import escape
+
 from bs4 import BeautifulSoup
-from loguru import logger
+from lxml import etree
+
+ADDRESS_FIELDS = ('bairro', 'cep', 'cidade', 'complemento2', 'end', 'uf')
+SHIPPING_FIELDS = ('Valor', 'PrazoEntrega')
+
+FIND_ZIPCODE_TEMPLATE = (
+    '<x:Envelope'
+    ' xmlns:x="http://schemas.xmlsoap.org/soap/envelope/"'
+    ' xmlns:cli="http://cliente.bean.master.sigep.bsb.correios.com.br/">'
+    '<x:Header/><x:Body><cli:consultaCEP><cep>{cep}</cep>'
+    '</cli:consultaCEP></x:Body></x:Envelope>'
+)
+SHIPPING_TEMPLATE = (
+    '<x:Envelope'
+    ' xmlns:x="http://schemas.xmlsoap.org/soap/envelope/"'
+    ' xmlns:tem="http://tempuri.org/">'
+    '<x:Header/><x:Body><tem:CalcPrecoPrazo>'
+    '<tem:nCdEmpresa></tem:nCdEmpresa>'
+    '<tem:sDsSenha></tem:sDsSenha>'
+    '<tem:nCdServico>{cod_service}</tem:nCdServico>'
+    '<tem:sCepOrigem>{zip_code_source}</tem:sCepOrigem>'
+    '<tem:sCepDestino>{zip_code_target}</tem:sCepDestino>'
+    '<tem:nVlPeso>{weigth}</tem:nVlPeso>'
+    '<tem:nCdFormato>1</tem:nCdFormato>'
+    '<tem:nVlComprimento>{length}</tem:nVlComprimento>'
+    '<tem:nVlAltura>{heigth}</tem:nVlAltura>'
+    '<tem:nVlLargura>{width}</tem:nVlLargura>'
+    '<tem:nVlDiametro>0</tem:nVlDiametro>'
+    '<tem:sCdMaoPropria>n</tem:sCdMaoPropria>'
+    '<tem:nVlValorDeclarado>0</tem:nVlValorDeclarado>'
+    '<tem:sCdAvisoRecebimento>n</tem:sCdAvisoRecebimento>'
+    '</tem:CalcPrecoPrazo></x:Body></x:Envelope>'
+)
+
+
+class InvalidCorreiosResponseError(Exception):
+    """Raise when a Correios response lacks the expected elements."""
+
+    def __init__(self, missing: list) -> None:
+        super().__init__(f'Correios response without {", ".join(missing)}')
+
+
+def extract_fields(xml: bytes | str, fields: tuple) -> dict:
+    """Return the text of the first element named after each field.
+
+    The response is streamed with ``iterparse`` and parsing stops as soon
+    as every field was found, without building a full tree. Namespaces are
+    ignored and entities are not resolved. A body that is not XML (an HTML
+    error page, an empty 200) is reported as missing every field left.
+    """
+    if isinstance(xml, str):
+        xml = xml.encode()
+    wanted = set(fields)
+    found = {}
+    try:
+        for _, element in etree.iterparse(
+            BytesIO(xml),
+            events=('end',),
+            resolve_entities=False,
+            no_network=True,
+        ):
+            name = etree.QName(element).localname
+            if name in wanted:
+                found[name] = element.text or ''
+                wanted.discard(name)
+                if not wanted:
+                    break
+    except etree.XMLSyntaxError as error:
+        raise InvalidCorreiosResponseError(sorted(wanted)) from error
+    if wanted:
+        raise InvalidCorreiosResponseError(sorted(wanted))
+    return found
 
 
 class Adapter:
     def xml_find_zipcode(cep):
-        return (
-            """<x:Envelope
-        xmlns:x="http://schemas.xmlsoap.org/soap/envelope/"
-        xmlns:cli="http://cliente.bean.master.sigep.bsb.correios.com.br/">
-        <x:Header/>
-         <x:Body>
-            <cli:consultaCEP>
-                <cep>"""
-            + cep
-            + """</cep>
-            </cli:consultaCEP>
-        </x:Body>
-        </x:Envelope>"""
-        )
+        return FIND_ZIPCODE_TEMPLATE.format(cep=escape(cep))
 
     def xmltojson_consultacep(xml):
+        address = extract_fields(xml, ADDRESS_FIELDS)
+        address['unidadePostagem'] = []
+        return address
+
+    def xmltojson_shipping(xml, name):
+        shipping = extract_fields(xml, SHIPPING_FIELDS)
+        return {
+            'serviço': name,
+            'frete': shipping['Valor'],
+            'prazo': shipping['PrazoEntrega'],
+        }
+
+    def soup_consultacep(xml):
+        """Parse with BeautifulSoup, kept as the reference parser."""
         soup = BeautifulSoup(xml, 'lxml')
         return {
             'bairro': soup.bairro.text,
@@ -31,7 +106,8 @@ class Adapter:
             'unidadePostagem': [],
         }
 
-    def xmltojson_shipping(xml, name):
+    def soup_shipping(xml, name):
+        """Parse with BeautifulSoup, kept as the reference parser."""
         soup = BeautifulSoup(xml, 'xml')
         return {
             'serviço': name,
@@ -48,44 +124,12 @@ class Adapter:
         heigth,
         width,
     ):
-        body = (
-            """<x:Envelope
-        xmlns:x="http://schemas.xmlsoap.org/soap/envelope/"
-        xmlns:tem="http://tempuri.org/">
-        <x:Header/>
-        <x:Body>
-            <tem:CalcPrecoPrazo>
-                <tem:nCdEmpresa></tem:nCdEmpresa>
-                <tem:sDsSenha></tem:sDsSenha>
-                <tem:nCdServico>"""
-            + cod_service
-            + """</tem:nCdServico>
-                <tem:sCepOrigem>"""
-            + zip_code_source
-            + """</tem:sCepOrigem>
-                <tem:sCepDestino>"""
-            + zip_code_target
-            + """</tem:sCepDestino>
-                <tem:nVlPeso>"""
-            + weigth
-            + """</tem:nVlPeso>
-                <tem:nCdFormato>1</tem:nCdFormato>
-                <tem:nVlComprimento>"""
-            + length
-            + """</tem:nVlComprimento>
-                <tem:nVlAltura>"""
-            + heigth
-            + """</tem:nVlAltura>
-                <tem:nVlLargura>"""
-            + width
-            + """</tem:nVlLargura>
-                <tem:nVlDiametro>0</tem:nVlDiametro>
-                <tem:sCdMaoPropria>n</tem:sCdMaoPropria>
-                <tem:nVlValorDeclarado>0</tem:nVlValorDeclarado>
-                <tem:sCdAvisoRecebimento>n</tem:sCdAvisoRecebimento>
-            </tem:CalcPrecoPrazo>
-        </x:Body>
-        </x:Envelope>"""
+        return SHIPPING_TEMPLATE.format(
+            cod_service=escape(cod_service),
+            zip_code_source=escape(zip_code_source),
+            zip_code_target=escape(zip_code_target),
+            weigth=escape(weigth),
+            length=escape(length),
+            heigth=escape(heigth),
+            width=escape(width),
         )
-        logger.debug(body)
-        return body
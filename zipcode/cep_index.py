@@ -0,0 +1,269 @@
+"""Local CEP lookup backed by a memory-mapped sorted index.
+
+The index is compiled from a CSV with the columns ``cep_start``,
+``cep_end``, ``street``, ``neighborhood``, ``city`` and ``state``
+(``cep_end`` may be empty for a single CEP). Ranges must be nested or
+disjoint, as in the Correios DNE: a street CEP inside a city-wide range
+wins over the range.
+
+File layout, little endian::
+
+    header   MAGIC, record count, data offset
+    records  count x (start, end, data offset, data length), sorted
+    data     UTF-8 fields joined by SEPARATOR, shared between records
+
+Usage::
+
+    python -m zipcode.cep_index compile ceps.csv ceps.idx
+    python -m zipcode.cep_index lookup ceps.idx 07171140
+"""
+import csv
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import TypeVar
+
+from loguru import logger
+
+from config import settings
+
+Self = TypeVar('Self')
+
+MAGIC = b'CEPIDX1\x00'
+HEADER = struct.Struct('<8sII')
+RECORD = struct.Struct('<IIIH')
+SEPARATOR = '\x1f'
+FIELDS = ('street', 'neighborhood', 'city', 'state')
+
+
+class InvalidCepIndexError(Exception):
+    """Raise when a file is not a compiled CEP index."""
+
+    def __init__(self: Self, path: str) -> None:
+        super().__init__(f'{path} is not a CEP index')
+
+
+def _flatten(ranges: list[tuple[int, int, bytes]]) -> list:
+    """Split nested ranges into sorted, non-overlapping segments.
+
+    Each CEP is assigned to the narrowest range that contains it.
+    """
+    ranges.sort(key=lambda item: (item[0], -item[1]))
+    segments = []
+    stack = []
+    cursor = 0
+
+    def close(until: int) -> None:
+        nonlocal cursor
+        while stack and stack[-1][0] < until:
+            end, data = stack.pop()
+            if cursor <= end:
+                segments.append((cursor, end, data))
+            cursor = end + 1
+
+    for start, end, data in ranges:
+        close(start)
+        if stack and cursor < start:
+            segments.append((cursor, start - 1, stack[-1][1]))
+        stack.append((end, data))
+        cursor = start
+    close(sys.maxsize)
+    return segments
+
+
+def compile_index(rows: Iterable[dict], path: str | Path) -> int:
+    """Write the index of ``rows`` to ``path`` and return its size.
+
+    The file is written next to ``path`` and renamed over it, so readers
+    never see a partial index.
+    """
+    ranges = []
+    for row in rows:
+        start = int(row['cep_start'])
+        end = int(row.get('cep_end') or start)
+        data = SEPARATOR.join(row.get(field) or '' for field in FIELDS)
+        ranges.append((start, end, data.encode()))
+    segments = _flatten(ranges)
+
+    blobs = {}
+    data = bytearray()
+    records = bytearray()
+    for start, end, blob in segments:
+        if blob not in blobs:
+            blobs[blob] = len(data)
+            data += blob
+        records += RECORD.pack(start, end, blobs[blob], len(blob))
+    data_offset = HEADER.size + len(records)
+
+    path = Path(path)
+    tmp = path.with_name(f'.{path.name}.tmp')
+    with tmp.open('wb') as index_file:
+        index_file.write(HEADER.pack(MAGIC, len(segments), data_offset))
+        index_file.write(records)
+        index_file.write(data)
+    os.replace(tmp, path)
+    return len(segments)
+
+
+def compile_csv(source: str | Path, path: str | Path) -> int:
+    """Compile a CEP CSV file into an index."""
+    with Path(source).open(newline='', encoding='utf-8') as csv_file:
+        return compile_index(csv.DictReader(csv_file), path)
+
+
+class _Snapshot:
+    """One opened version of the index file."""
+
+    def __init__(self: Self, path: Path) -> None:
+        stat = path.stat()
+        self.version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with path.open('rb') as index_file:
+            self.buffer = mmap.mmap(
+                index_file.fileno(),
+                0,
+                access=mmap.ACCESS_READ,
+            )
+        magic, self.count, self.data_offset = HEADER.unpack_from(
+            self.buffer,
+        )
+        if magic != MAGIC:
+            raise InvalidCepIndexError(str(path))
+
+    def record(self: Self, position: int) -> tuple[int, int, int, int]:
+        return RECORD.unpack_from(
+            self.buffer,
+            HEADER.size + position * RECORD.size,
+        )
+
+    def end(self: Self, position: int) -> int:
+        return self.record(position)[1]
+
+    def first_ending_at_or_after(self: Self, cep: int) -> int:
+        """Bisect the first record whose range ends at or after ``cep``."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.end(middle) < cep:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def address(self: Self, record: tuple, cep: int) -> dict:
+        _, _, offset, length = record
+        start = self.data_offset + offset
+        values = self.buffer[start : start + length].decode().split(SEPARATOR)
+        street, neighborhood, city, state = values
+        return {
+            'bairro': neighborhood,
+            'cep': f'{cep:08d}',
+            'cidade': city,
+            'complemento2': '',
+            'end': street,
+            'uf': state,
+            'unidadePostagem': [],
+        }
+
+
+class CepIndex:
+    """Memory-mapped CEP index, reloaded when its file is replaced.
+
+    The file is checked at most every ``check_interval`` seconds; a new
+    version is mapped and swapped in without blocking readers. Until a
+    valid file is found every lookup is a miss.
+    """
+
+    def __init__(
+        self: Self,
+        path: str | Path | None,
+        check_interval: float = 5,
+    ) -> None:
+        self.path = Path(path) if path else None
+        self.check_interval = check_interval
+        self._snapshot: _Snapshot | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def reload(self: Self) -> bool:
+        """Map the file again if it changed and return whether it did."""
+        self._checked_at = time.monotonic()
+        if self.path is None:
+            return False
+        with self._lock:
+            try:
+                stat = self.path.stat()
+            except FileNotFoundError:
+                return False
+            version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if self._snapshot and self._snapshot.version == version:
+                return False
+            try:
+                self._snapshot = _Snapshot(self.path)
+            except (InvalidCepIndexError, ValueError, struct.error) as error:
+                logger.warning(f'Keeping the current CEP index: {error}')
+                return False
+            return True
+
+    def _current(self: Self) -> _Snapshot | None:
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self.reload()
+        return self._snapshot
+
+    def lookup(self: Self, cep: str) -> dict | None:
+        """Return the address of ``cep`` or None when not indexed."""
+        snapshot = self._current()
+        digits = ''.join(char for char in cep if char.isdigit())
+        if snapshot is None or len(digits) != 8:  # noqa: PLR2004
+            return None
+        number = int(digits)
+        position = snapshot.first_ending_at_or_after(number)
+        if position == snapshot.count:
+            return None
+        record = snapshot.record(position)
+        if record[0] > number:
+            return None
+        return snapshot.address(record, number)
+
+    def prefix(self: Self, prefix: str, limit: int = 50) -> Iterator[dict]:
+        """Yield the indexed ranges overlapping CEPs starting with prefix."""
+        snapshot = self._current()
+        if snapshot is None or not prefix.isdigit():
+            return
+        low = int(prefix.ljust(8, '0'))
+        high = int(prefix.ljust(8, '9'))
+        first = snapshot.first_ending_at_or_after(low)
+        for position in range(first, min(first + limit, snapshot.count)):
+            record = snapshot.record(position)
+            if record[0] > high:
+                return
+            address = snapshot.address(record, max(record[0], low))
+            address['cep_end'] = f'{record[1]:08d}'
+            yield address
+
+
+cep_index = CepIndex(
+    settings.get('CEP_INDEX_PATH'),
+    check_interval=float(settings.get('CEP_INDEX_CHECK_INTERVAL', 5)),
+)
+
+
+def main(argv: list[str]) -> None:
+    """Compile an index or look a CEP up from the command line."""
+    command, *args = argv or ['help']
+    if command == 'compile':
+        source, path = args
+        print(f'{compile_csv(source, path)} ranges written to {path}')
+    elif command == 'lookup':
+        path, cep = args
+        print(CepIndex(path).lookup(cep))
+    else:
+        print(__doc__)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,64 @@
+from pathlib import Path
+
+import pytest
+from lxml import etree
+
+from zipcode.adapter import Adapter, InvalidCorreiosResponseError
+
+SAMPLES = Path(__file__).parent / 'samples'
+
+
+def test_consultacep_matches_soup_parser():
+    """Must extract the same address as the BeautifulSoup parser."""
+    xml = (SAMPLES / 'consulta_cep.xml').read_bytes()
+
+    assert Adapter.xmltojson_consultacep(xml) == Adapter.soup_consultacep(xml)
+
+
+def test_shipping_matches_soup_parser():
+    """Must extract the same price and deadline as BeautifulSoup."""
+    xml = (SAMPLES / 'calc_preco_prazo.xml').read_bytes()
+
+    assert Adapter.xmltojson_shipping(xml, 'PAC') == {
+        'serviço': 'PAC',
+        'frete': '61,30',
+        'prazo': '9',
+    }
+    assert Adapter.xmltojson_shipping(xml, 'PAC') == Adapter.soup_shipping(
+        xml,
+        'PAC',
+    )
+
+
+def test_shipping_without_price_is_invalid():
+    """Must raise when the response has no Valor element."""
+    with pytest.raises(InvalidCorreiosResponseError):
+        Adapter.xmltojson_shipping(b'<Erro>-3</Erro>', 'PAC')
+
+
+@pytest.mark.parametrize(
+    'body',
+    [b'', b'<html><body>Servico indisponivel</body>', b'not xml'],
+)
+def test_shipping_with_non_xml_body_is_invalid(body):
+    """Must raise the Correios error, not lxml's, for a non-XML body."""
+    with pytest.raises(InvalidCorreiosResponseError):
+        Adapter.xmltojson_shipping(body, 'PAC')
+
+
+def test_body_shipping_is_valid_escaped_xml():
+    """Must fill the template with escaped values."""
+    body = Adapter.body_shipping(
+        '4510',
+        '47590000',
+        '<cep>',
+        '1',
+        '15',
+        '2',
+        '10',
+    )
+
+    tree = etree.fromstring(body.encode())
+    ns = {'tem': 'http://tempuri.org/'}
+    assert tree.findtext('.//tem:sCepDestino', namespaces=ns) == '<cep>'
+    assert tree.findtext('.//tem:nVlPeso', namespaces=ns) == '1'
@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+from zipcode.cep_index import CepIndex, compile_index
+
+ROWS = [
+    {
+        'cep_start': '47590000',
+        'cep_end': '47599999',
+        'street': '',
+        'neighborhood': '',
+        'city': 'Ibotirama',
+        'state': 'BA',
+    },
+    {
+        'cep_start': '07171140',
+        'street': 'Rua Maria Paula Motta',
+        'neighborhood': 'Jardim Presidente Dutra',
+        'city': 'Guarulhos',
+        'state': 'SP',
+    },
+    {
+        'cep_start': '47590100',
+        'street': 'Rua do Porto',
+        'neighborhood': 'Centro',
+        'city': 'Ibotirama',
+        'state': 'BA',
+    },
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = tmp_path / 'ceps.idx'
+    compile_index(ROWS, path)
+    return CepIndex(path)
+
+
+def test_lookup_exact_cep(index):
+    """Must return the street of a single CEP."""
+    address = index.lookup('07171-140')
+
+    assert address == {
+        'bairro': 'Jardim Presidente Dutra',
+        'cep': '07171140',
+        'cidade': 'Guarulhos',
+        'complemento2': '',
+        'end': 'Rua Maria Paula Motta',
+        'uf': 'SP',
+        'unidadePostagem': [],
+    }
+
+
+def test_lookup_prefers_street_inside_city_range(index):
+    """Must resolve a CEP to the narrowest range that contains it."""
+    assert index.lookup('47590100')['end'] == 'Rua do Porto'
+    assert index.lookup('47590101')['cidade'] == 'Ibotirama'
+    assert index.lookup('47590101')['end'] == ''
+    assert index.lookup('47590000')['cidade'] == 'Ibotirama'
+    assert index.lookup('47599999')['cidade'] == 'Ibotirama'
+
+
+def test_lookup_miss(index):
+    """Must return None outside every range or for invalid CEPs."""
+    assert index.lookup('47600000') is None
+    assert index.lookup('00000001') is None
+    assert index.lookup('123') is None
+
+
+def test_prefix_search(index):
+    """Must list the ranges overlapping a CEP prefix."""
+    ceps = [address['cep'] for address in index.prefix('4759')]
+
+    assert ceps == ['47590000', '47590100', '47590101']
+
+
+def test_reload_new_file_without_restart(index):
+    """Must answer from a replaced index file."""
+    assert index.lookup('01001000') is None
+
+    compile_index(
+        [*ROWS, {'cep_start': '01001000', 'city': 'São Paulo', 'state': 'SP'}],
+        index.path,
+    )
+    os.utime(index.path, ns=(0, 1))
+
+    assert index.reload() is True
+    assert index.lookup('01001000')['cidade'] == 'São Paulo'
+
+
+def test_missing_or_invalid_file_is_a_miss(tmp_path):
+    """Must not raise when the index file is absent or corrupt."""
+    path = tmp_path / 'ceps.idx'
+    index = CepIndex(path)
+
+    assert index.lookup('07171140') is None
+    path.write_bytes(b'not an index')
+    assert index.reload() is False
+    assert index.lookup('07171140') is None